@@ -6,6 +6,7 @@ import (
 
 	"github.com/spf13/cobra"
 
+	"github.com/agextract/agextract-cli/internal/api"
 	"github.com/agextract/agextract-cli/internal/config"
 	"github.com/agextract/agextract-cli/internal/queue"
 	"github.com/agextract/agextract-cli/internal/watcher"
@@ -52,6 +53,13 @@ var statusCmd = &cobra.Command{
 		} else {
 			fmt.Printf("  Sessions uploaded: %d\n", len(ledger.Hashes))
 		}
+		if cfg.IsLoggedIn() {
+			if sessions, _, err := api.NewClient(cfg).ListSessions(""); err != nil {
+				fmt.Printf("  Could not list server sessions: %v\n", err)
+			} else {
+				fmt.Printf("  Sessions on server: %d\n", len(sessions))
+			}
+		}
 
 		// Retry queue
 		fmt.Println("\n=== Retry Queue ===")
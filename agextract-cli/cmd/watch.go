@@ -3,11 +3,13 @@ package cmd
 import (
 	"crypto/sha256"
 	"encoding/hex"
+	"errors"
 	"fmt"
 	"os"
 	"os/signal"
 	"path/filepath"
 	"strings"
+	"sync"
 	"syscall"
 
 	"github.com/spf13/cobra"
@@ -122,6 +124,13 @@ func uploadFile(cfg *config.Config, filePath, tool string) error {
 
 	client := api.NewClient(cfg)
 
+	// Live Claude Code sessions grow in place: send only the new lines
+	if tool == "claudecode" {
+		if handled, err := appendFile(client, filePath, tool); handled || err != nil {
+			return err
+		}
+	}
+
 	// Try structured parsing first (Go-side parsers)
 	parser := getParser(tool)
 	if parser != nil {
@@ -131,6 +140,14 @@ func uploadFile(cfg *config.Config, filePath, tool string) error {
 			base := filepath.Base(filePath)
 			req.SourceSessionID = strings.TrimSuffix(base, filepath.Ext(base))
 
+			// The server would return its existing copy anyway: skip the push
+			if err := remote.sync(client); err != nil {
+				fmt.Printf("Warning: could not sync session list: %v\n", err)
+			} else if remote.has(req.Source, req.SourceSessionID) {
+				fmt.Printf("Already on server: %s\n", filePath)
+				return nil
+			}
+
 			resp, err := client.CreateSession(req)
 			if err != nil {
 				return err
@@ -154,6 +171,79 @@ func uploadFile(cfg *config.Config, filePath, tool string) error {
 	return nil
 }
 
+// offsetsMu serializes updates of the append offsets file between the
+// per-file quiescence timers.
+var offsetsMu sync.Mutex
+
+// appendFile syncs a session file by sending only the bytes appended since
+// its last sync. It reports false when the server's copy of the session was
+// not built from appends, so the caller falls back to a full push.
+func appendFile(client *api.Client, filePath, tool string) (bool, error) {
+	offsetsMu.Lock()
+	defer offsetsMu.Unlock()
+
+	offsets, err := config.LoadAppendOffsets()
+	if err != nil {
+		return false, fmt.Errorf("loading append offsets: %w", err)
+	}
+	base := filepath.Base(filePath)
+	sessionID := strings.TrimSuffix(base, filepath.Ext(base))
+	offset := offsets.Offsets[filePath]
+
+	resp, err := client.AppendSession(filePath, tool, sessionID, offset)
+	var conflict *api.AppendConflictError
+	if errors.As(err, &conflict) {
+		if conflict.IngestedBytes == 0 && offset == 0 {
+			return false, nil
+		}
+		// Our offset is stale (e.g. the offsets file was lost): resend from the server's
+		resp, err = client.AppendSession(filePath, tool, sessionID, conflict.IngestedBytes)
+	}
+	if err != nil {
+		return true, err
+	}
+
+	offsets.Offsets[filePath] = resp.IngestedBytes
+	if err := offsets.Save(); err != nil {
+		fmt.Printf("Warning: could not save append offsets: %v\n", err)
+	}
+	fmt.Printf("Synced: %s → session %s (+%d steps, %d total)\n", filePath, resp.ID, resp.AppendedSteps, resp.StepCount)
+	return true, nil
+}
+
+// serverIndex is the set of (source, source_session_id) pairs the server
+// already has, kept current with delta syncs of GET /api/v1/sessions/.
+type serverIndex struct {
+	mu        sync.Mutex
+	watermark string
+	known     map[string]bool
+}
+
+var remote = &serverIndex{known: make(map[string]bool)}
+
+func (idx *serverIndex) sync(client *api.Client) error {
+	idx.mu.Lock()
+	defer idx.mu.Unlock()
+
+	sessions, watermark, err := client.ListSessions(idx.watermark)
+	if err != nil {
+		return err
+	}
+	for _, s := range sessions {
+		if s.SourceSessionID != "" {
+			idx.known[s.Source+"\x00"+s.SourceSessionID] = true
+		}
+	}
+	idx.watermark = watermark
+	return nil
+}
+
+func (idx *serverIndex) has(source, sourceSessionID string) bool {
+	idx.mu.Lock()
+	defer idx.mu.Unlock()
+	return idx.known[source+"\x00"+sourceSessionID]
+}
+
 func getParser(tool string) sources.SessionSource {
 	switch tool {
 	case "claudecode":
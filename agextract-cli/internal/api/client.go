@@ -1,18 +1,38 @@
 package api
 
 import (
+	"bufio"
 	"bytes"
+	"compress/gzip"
+	"crypto/sha256"
+	"encoding/hex"
 	"encoding/json"
 	"fmt"
 	"io"
 	"mime/multipart"
 	"net/http"
+	"net/url"
 	"os"
 	"path/filepath"
+	"strconv"
+	"time"
 
 	"github.com/agextract/agextract-cli/internal/config"
 )
 
+// jobPollInterval is how often WaitForJob checks a queued upload.
+const jobPollInterval = 2 * time.Second
+
+// gzipMinBytes is the smallest session payload worth gzipping.
+const gzipMinBytes = 1024
+
+// Files from chunkedUploadMinBytes up are sent with the resumable upload
+// protocol, in chunks of uploadChunkBytes (or the server's limit, if lower).
+const (
+	chunkedUploadMinBytes = 32 * 1024 * 1024
+	uploadChunkBytes      = 4 * 1024 * 1024
+)
+
 type Client struct {
 	httpClient *http.Client
 	serverURL  string
@@ -28,12 +48,25 @@ func NewClient(cfg *config.Config) *Client {
 }
 
 func (c *Client) doJSON(method, path string, body interface{}, result interface{}) error {
+	return c.doJSONCompressed(method, path, body, result, false)
+}
+
+// doJSONCompressed is doJSON, optionally gzipping large request bodies.
+// Only the session endpoints accept compressed bodies.
+func (c *Client) doJSONCompressed(method, path string, body interface{}, result interface{}, compress bool) error {
 	var reqBody io.Reader
+	encoding := ""
 	if body != nil {
 		data, err := json.Marshal(body)
 		if err != nil {
 			return fmt.Errorf("marshaling request: %w", err)
 		}
+		if compress && len(data) >= gzipMinBytes {
+			if data, err = gzipBytes(data); err != nil {
+				return err
+			}
+			encoding = "gzip"
+		}
 		reqBody = bytes.NewReader(data)
 	}
 
@@ -45,6 +78,9 @@ func (c *Client) doJSON(method, path string, body interface{}, result interface{
 	if body != nil {
 		req.Header.Set("Content-Type", "application/json")
 	}
+	if encoding != "" {
+		req.Header.Set("Content-Encoding", encoding)
+	}
 	if c.token != "" {
 		req.Header.Set("Authorization", "Bearer "+c.token)
 	}
@@ -113,11 +149,63 @@ func (c *Client) Me() (*UserResponse, error) {
 // CreateSession creates a session from structured JSON.
 func (c *Client) CreateSession(req *SessionCreateRequest) (*SessionResponse, error) {
 	var resp SessionResponse
-	err := c.doJSON("POST", "/api/v1/sessions/", req, &resp)
+	err := c.doJSONCompressed("POST", "/api/v1/sessions/", req, &resp, true)
 	return &resp, err
 }
 
-// UploadFile uploads a raw file to the server.
+// CreateSessionsBatch pushes many sessions in one request as NDJSON. Each
+// line is encoded exactly as CreateSession would send it, so content-hash
+// dedup matches sessions pushed one at a time.
+func (c *Client) CreateSessionsBatch(reqs []*SessionCreateRequest) (*BatchResponse, error) {
+	var buf bytes.Buffer
+	for _, r := range reqs {
+		data, err := json.Marshal(r)
+		if err != nil {
+			return nil, fmt.Errorf("marshaling session: %w", err)
+		}
+		buf.Write(data)
+		buf.WriteByte('\n')
+	}
+	body, err := gzipBytes(buf.Bytes())
+	if err != nil {
+		return nil, err
+	}
+
+	req, err := http.NewRequest("POST", c.serverURL+"/api/v1/sessions/batch/", bytes.NewReader(body))
+	if err != nil {
+		return nil, fmt.Errorf("creating request: %w", err)
+	}
+	req.Header.Set("Content-Type", "application/x-ndjson")
+	req.Header.Set("Content-Encoding", "gzip")
+	req.Header.Set("Authorization", "Bearer "+c.token)
+
+	resp, err := c.httpClient.Do(req)
+	if err != nil {
+		return nil, fmt.Errorf("request failed: %w", err)
+	}
+	defer resp.Body.Close()
+
+	respBody, err := io.ReadAll(resp.Body)
+	if err != nil {
+		return nil, fmt.Errorf("reading response: %w", err)
+	}
+	if resp.StatusCode >= 400 {
+		var errResp ErrorResponse
+		if json.Unmarshal(respBody, &errResp) == nil && errResp.Error != "" {
+			return nil, fmt.Errorf("API error (%d): %s", resp.StatusCode, errResp.Error)
+		}
+		return nil, fmt.Errorf("API error (%d): %s", resp.StatusCode, string(respBody))
+	}
+
+	var batchResp BatchResponse
+	if err := json.Unmarshal(respBody, &batchResp); err != nil {
+		return nil, fmt.Errorf("decoding response: %w", err)
+	}
+	return &batchResp, nil
+}
+
+// UploadFile uploads a raw file to the server, gzip-compressed. The
+// server detects the compression and hashes the original content.
 func (c *Client) UploadFile(filePath string, source string) (*SessionResponse, error) {
 	f, err := os.Open(filePath)
 	if err != nil {
@@ -125,16 +213,27 @@ func (c *Client) UploadFile(filePath string, source string) (*SessionResponse, e
 	}
 	defer f.Close()
 
+	if info, err := f.Stat(); err == nil && info.Size() >= chunkedUploadMinBytes {
+		return c.uploadResumable(f, info, filePath, source)
+	}
+
 	var buf bytes.Buffer
 	writer := multipart.NewWriter(&buf)
 
-	part, err := writer.CreateFormFile("file", filepath.Base(filePath))
+	part, err := writer.CreateFormFile("file", filepath.Base(filePath)+".gz")
 	if err != nil {
 		return nil, fmt.Errorf("creating form file: %w", err)
 	}
-	if _, err := io.Copy(part, f); err != nil {
+	// The SHA-256 of the uncompressed content lets the server answer
+	// duplicates without parsing the upload
+	hasher := sha256.New()
+	zw := gzip.NewWriter(part)
+	if _, err := io.Copy(zw, io.TeeReader(f, hasher)); err != nil {
 		return nil, fmt.Errorf("copying file: %w", err)
 	}
+	if err := zw.Close(); err != nil {
+		return nil, fmt.Errorf("compressing file: %w", err)
+	}
 
 	if source != "" {
 		writer.WriteField("source", source)
@@ -147,24 +246,39 @@ func (c *Client) UploadFile(filePath string, source string) (*SessionResponse, e
 	}
 	req.Header.Set("Content-Type", writer.FormDataContentType())
 	req.Header.Set("Authorization", "Bearer "+c.token)
+	req.Header.Set("X-Content-SHA256", hex.EncodeToString(hasher.Sum(nil)))
 
 	resp, err := c.httpClient.Do(req)
 	if err != nil {
 		return nil, fmt.Errorf("upload failed: %w", err)
 	}
 	defer resp.Body.Close()
+	return c.ingestResult(resp)
+}
 
+// ingestResult decodes the response of an upload: the session, or a queued
+// job that it waits for.
+func (c *Client) ingestResult(resp *http.Response) (*SessionResponse, error) {
 	respBody, err := io.ReadAll(resp.Body)
 	if err != nil {
 		return nil, fmt.Errorf("reading response: %w", err)
 	}
 
 	if resp.StatusCode >= 400 {
-		var errResp ErrorResponse
-		if json.Unmarshal(respBody, &errResp) == nil && errResp.Error != "" {
-			return nil, fmt.Errorf("API error (%d): %s", resp.StatusCode, errResp.Error)
+		return nil, apiError(resp.StatusCode, respBody)
+	}
+
+	// Large uploads are parsed in the background: wait for the job to finish
+	if resp.StatusCode == http.StatusAccepted {
+		var job JobResponse
+		if err := json.Unmarshal(respBody, &job); err != nil {
+			return nil, fmt.Errorf("decoding job response: %w", err)
 		}
-		return nil, fmt.Errorf("API error (%d): %s", resp.StatusCode, string(respBody))
+		done, err := c.WaitForJob(job.JobID)
+		if err != nil {
+			return nil, err
+		}
+		return c.GetSession(*done.SessionID)
 	}
 
 	var sessionResp SessionResponse
@@ -173,3 +287,339 @@ func (c *Client) UploadFile(filePath string, source string) (*SessionResponse, e
 	}
 	return &sessionResp, nil
 }
+
+// uploadResumable sends a large file in checksummed chunks. The upload id
+// is remembered in the pending-uploads file, so a failed or interrupted
+// upload of the same file resumes from the server's next_chunk.
+func (c *Client) uploadResumable(f *os.File, info os.FileInfo, filePath, source string) (*SessionResponse, error) {
+	pending, err := config.LoadPendingUploads()
+	if err != nil {
+		return nil, fmt.Errorf("loading pending uploads: %w", err)
+	}
+	key := fmt.Sprintf("%s|%d|%d", filePath, info.Size(), info.ModTime().UnixNano())
+
+	var upload UploadResponse
+	resumed := false
+	if id, ok := pending.Uploads[key]; ok {
+		resumed = c.doJSON("GET", "/api/v1/uploads/"+id+"/", nil, &upload) == nil
+	}
+	if !resumed {
+		upload = UploadResponse{}
+		session, err := c.createUpload(f, filePath, source, &upload)
+		if err != nil || session != nil {
+			// The server already has this content: nothing to send
+			return session, err
+		}
+		pending.Uploads[key] = upload.UploadID
+		if err := pending.Save(); err != nil {
+			fmt.Printf("Warning: could not save pending uploads: %v\n", err)
+		}
+	}
+
+	if upload.Status == "open" {
+		chunkSize := int64(uploadChunkBytes)
+		if upload.ChunkMaxBytes > 0 && upload.ChunkMaxBytes < chunkSize {
+			chunkSize = upload.ChunkMaxBytes
+		}
+		if _, err := f.Seek(upload.BytesReceived, io.SeekStart); err != nil {
+			return nil, fmt.Errorf("seeking file: %w", err)
+		}
+		buf := make([]byte, chunkSize)
+		index := upload.NextChunk
+		for {
+			n, readErr := io.ReadFull(f, buf)
+			if n > 0 {
+				if err := c.putChunk(upload.UploadID, index, buf[:n]); err != nil {
+					return nil, err
+				}
+				index++
+			}
+			if readErr == io.EOF || readErr == io.ErrUnexpectedEOF {
+				break
+			}
+			if readErr != nil {
+				return nil, fmt.Errorf("reading file: %w", readErr)
+			}
+		}
+	}
+
+	req, err := http.NewRequest("POST", c.serverURL+"/api/v1/uploads/"+upload.UploadID+"/complete/", nil)
+	if err != nil {
+		return nil, fmt.Errorf("creating request: %w", err)
+	}
+	req.Header.Set("Authorization", "Bearer "+c.token)
+	resp, err := c.httpClient.Do(req)
+	if err != nil {
+		return nil, fmt.Errorf("completing upload: %w", err)
+	}
+	defer resp.Body.Close()
+
+	session, err := c.ingestResult(resp)
+	if err != nil {
+		return nil, err
+	}
+	delete(pending.Uploads, key)
+	if err := pending.Save(); err != nil {
+		fmt.Printf("Warning: could not save pending uploads: %v\n", err)
+	}
+	return session, nil
+}
+
+// createUpload starts a resumable upload of f, sending the file's SHA-256
+// so the server can skip the upload altogether. If it already has the
+// content it returns that session; otherwise upload is filled in.
+func (c *Client) createUpload(f *os.File, filePath, source string, upload *UploadResponse) (*SessionResponse, error) {
+	hasher := sha256.New()
+	if _, err := io.Copy(hasher, f); err != nil {
+		return nil, fmt.Errorf("hashing file: %w", err)
+	}
+	if _, err := f.Seek(0, io.SeekStart); err != nil {
+		return nil, fmt.Errorf("seeking file: %w", err)
+	}
+
+	payload, err := json.Marshal(map[string]string{"title": filepath.Base(filePath), "source": source})
+	if err != nil {
+		return nil, fmt.Errorf("encoding request: %w", err)
+	}
+	req, err := http.NewRequest("POST", c.serverURL+"/api/v1/uploads/", bytes.NewReader(payload))
+	if err != nil {
+		return nil, fmt.Errorf("creating request: %w", err)
+	}
+	req.Header.Set("Content-Type", "application/json")
+	req.Header.Set("Authorization", "Bearer "+c.token)
+	req.Header.Set("X-Content-SHA256", hex.EncodeToString(hasher.Sum(nil)))
+
+	resp, err := c.httpClient.Do(req)
+	if err != nil {
+		return nil, fmt.Errorf("creating upload: %w", err)
+	}
+	defer resp.Body.Close()
+	respBody, err := io.ReadAll(resp.Body)
+	if err != nil {
+		return nil, fmt.Errorf("reading response: %w", err)
+	}
+	if resp.StatusCode >= 400 {
+		return nil, apiError(resp.StatusCode, respBody)
+	}
+
+	if resp.StatusCode == http.StatusOK {
+		var session SessionResponse
+		if err := json.Unmarshal(respBody, &session); err != nil {
+			return nil, fmt.Errorf("decoding response: %w", err)
+		}
+		return &session, nil
+	}
+	if err := json.Unmarshal(respBody, upload); err != nil {
+		return nil, fmt.Errorf("decoding response: %w", err)
+	}
+	return nil, nil
+}
+
+// putChunk sends one chunk of a resumable upload with its SHA-256.
+func (c *Client) putChunk(uploadID string, index int, data []byte) error {
+	sum := sha256.Sum256(data)
+	endpoint := fmt.Sprintf("%s/api/v1/uploads/%s/chunks/%d/", c.serverURL, uploadID, index)
+	req, err := http.NewRequest("PUT", endpoint, bytes.NewReader(data))
+	if err != nil {
+		return fmt.Errorf("creating request: %w", err)
+	}
+	req.Header.Set("Content-Type", "application/octet-stream")
+	req.Header.Set("X-Chunk-SHA256", hex.EncodeToString(sum[:]))
+	req.Header.Set("Authorization", "Bearer "+c.token)
+
+	resp, err := c.httpClient.Do(req)
+	if err != nil {
+		return fmt.Errorf("uploading chunk %d: %w", index, err)
+	}
+	defer resp.Body.Close()
+	if resp.StatusCode >= 400 {
+		respBody, _ := io.ReadAll(resp.Body)
+		return apiError(resp.StatusCode, respBody)
+	}
+	return nil
+}
+
+func apiError(status int, respBody []byte) error {
+	var errResp ErrorResponse
+	if json.Unmarshal(respBody, &errResp) == nil && errResp.Error != "" {
+		return fmt.Errorf("API error (%d): %s", status, errResp.Error)
+	}
+	return fmt.Errorf("API error (%d): %s", status, string(respBody))
+}
+
+// AppendSession sends a live session file from byte offset on, gzipped,
+// to be appended to the server's copy keyed on sourceSessionID. A 409 is
+// returned as *AppendConflictError carrying the server's offset.
+func (c *Client) AppendSession(filePath, source, sourceSessionID string, offset int64) (*AppendResponse, error) {
+	f, err := os.Open(filePath)
+	if err != nil {
+		return nil, fmt.Errorf("opening file: %w", err)
+	}
+	defer f.Close()
+	if _, err := f.Seek(offset, io.SeekStart); err != nil {
+		return nil, fmt.Errorf("seeking file: %w", err)
+	}
+
+	var buf bytes.Buffer
+	writer := multipart.NewWriter(&buf)
+
+	part, err := writer.CreateFormFile("file", filepath.Base(filePath)+".gz")
+	if err != nil {
+		return nil, fmt.Errorf("creating form file: %w", err)
+	}
+	zw := gzip.NewWriter(part)
+	if _, err := io.Copy(zw, f); err != nil {
+		return nil, fmt.Errorf("copying file: %w", err)
+	}
+	if err := zw.Close(); err != nil {
+		return nil, fmt.Errorf("compressing file: %w", err)
+	}
+
+	writer.WriteField("title", filepath.Base(filePath))
+	writer.WriteField("source", source)
+	writer.WriteField("source_session_id", sourceSessionID)
+	writer.WriteField("offset", strconv.FormatInt(offset, 10))
+	writer.Close()
+
+	req, err := http.NewRequest("POST", c.serverURL+"/api/v1/sessions/append/", &buf)
+	if err != nil {
+		return nil, fmt.Errorf("creating request: %w", err)
+	}
+	req.Header.Set("Content-Type", writer.FormDataContentType())
+	req.Header.Set("Authorization", "Bearer "+c.token)
+
+	resp, err := c.httpClient.Do(req)
+	if err != nil {
+		return nil, fmt.Errorf("append failed: %w", err)
+	}
+	defer resp.Body.Close()
+
+	respBody, err := io.ReadAll(resp.Body)
+	if err != nil {
+		return nil, fmt.Errorf("reading response: %w", err)
+	}
+	if resp.StatusCode == http.StatusConflict {
+		conflict := &AppendConflictError{}
+		if err := json.Unmarshal(respBody, conflict); err != nil {
+			return nil, apiError(resp.StatusCode, respBody)
+		}
+		return nil, conflict
+	}
+	if resp.StatusCode >= 400 {
+		return nil, apiError(resp.StatusCode, respBody)
+	}
+
+	var appendResp AppendResponse
+	if err := json.Unmarshal(respBody, &appendResp); err != nil {
+		return nil, fmt.Errorf("decoding response: %w", err)
+	}
+	return &appendResp, nil
+}
+
+func gzipBytes(data []byte) ([]byte, error) {
+	var buf bytes.Buffer
+	zw := gzip.NewWriter(&buf)
+	if _, err := zw.Write(data); err != nil {
+		return nil, fmt.Errorf("compressing request: %w", err)
+	}
+	if err := zw.Close(); err != nil {
+		return nil, fmt.Errorf("compressing request: %w", err)
+	}
+	return buf.Bytes(), nil
+}
+
+// GetSession fetches a session with its steps.
+func (c *Client) GetSession(id string) (*SessionResponse, error) {
+	var resp SessionResponse
+	err := c.doJSON("GET", "/api/v1/sessions/"+id+"/", nil, &resp)
+	return &resp, err
+}
+
+// StreamSession fetches a session as NDJSON and calls fn for each step as
+// it arrives, so large sessions are never held in memory whole. The
+// returned SessionResponse has no Steps.
+func (c *Client) StreamSession(id string, fn func(SessionStep) error) (*SessionResponse, error) {
+	req, err := http.NewRequest("GET", c.serverURL+"/api/v1/sessions/"+id+"/", nil)
+	if err != nil {
+		return nil, fmt.Errorf("creating request: %w", err)
+	}
+	req.Header.Set("Accept", "application/x-ndjson")
+	req.Header.Set("Authorization", "Bearer "+c.token)
+
+	resp, err := c.httpClient.Do(req)
+	if err != nil {
+		return nil, fmt.Errorf("request failed: %w", err)
+	}
+	defer resp.Body.Close()
+
+	if resp.StatusCode >= 400 {
+		respBody, _ := io.ReadAll(resp.Body)
+		var errResp ErrorResponse
+		if json.Unmarshal(respBody, &errResp) == nil && errResp.Error != "" {
+			return nil, fmt.Errorf("API error (%d): %s", resp.StatusCode, errResp.Error)
+		}
+		return nil, fmt.Errorf("API error (%d): %s", resp.StatusCode, string(respBody))
+	}
+
+	dec := json.NewDecoder(bufio.NewReader(resp.Body))
+	var session SessionResponse
+	if err := dec.Decode(&session); err != nil {
+		return nil, fmt.Errorf("decoding session: %w", err)
+	}
+	for dec.More() {
+		var step SessionStep
+		if err := dec.Decode(&step); err != nil {
+			return nil, fmt.Errorf("decoding step: %w", err)
+		}
+		if err := fn(step); err != nil {
+			return nil, err
+		}
+	}
+	return &session, nil
+}
+
+// ListSessions fetches every session uploaded after since (all sessions
+// when since is empty) in compact form, following pagination. It returns
+// the sessions and the watermark to pass as since on the next call.
+func (c *Client) ListSessions(since string) ([]SessionSummary, string, error) {
+	var all []SessionSummary
+	params := url.Values{"compact": {"1"}, "limit": {"1000"}}
+	if since != "" {
+		params.Set("since", since)
+	}
+	watermark := since
+	for {
+		var page SessionListResponse
+		if err := c.doJSON("GET", "/api/v1/sessions/?"+params.Encode(), nil, &page); err != nil {
+			return nil, since, err
+		}
+		all = append(all, page.Sessions...)
+		if page.Watermark != nil {
+			watermark = *page.Watermark
+		}
+		if page.NextCursor == nil {
+			return all, watermark, nil
+		}
+		params.Set("cursor", *page.NextCursor)
+	}
+}
+
+// WaitForJob polls an ingestion job until it has finished.
+func (c *Client) WaitForJob(jobID string) (*JobResponse, error) {
+	for {
+		var job JobResponse
+		if err := c.doJSON("GET", "/api/v1/jobs/"+jobID+"/", nil, &job); err != nil {
+			return nil, err
+		}
+		switch job.Status {
+		case "done":
+			if job.SessionID == nil {
+				return nil, fmt.Errorf("job %s finished without a session", jobID)
+			}
+			return &job, nil
+		case "failed":
+			return nil, fmt.Errorf("server failed to parse upload: %s", job.Error)
+		}
+		time.Sleep(jobPollInterval)
+	}
+}
@@ -1,5 +1,7 @@
 package api
 
+import "fmt"
+
 // TokenResponse is returned from POST /api/v1/oauth/token/
 type TokenResponse struct {
 	AccessToken  string `json:"access_token"`
@@ -47,7 +49,84 @@ type SessionResponse struct {
 	Steps           []SessionStep `json:"steps"`
 }
 
+// BatchResult is the per-session outcome of POST /api/v1/sessions/batch/.
+// Status is "created", "existing" or "error".
+type BatchResult struct {
+	Index           int    `json:"index"`
+	Status          string `json:"status"`
+	ID              string `json:"id"`
+	Source          string `json:"source"`
+	SourceSessionID string `json:"source_session_id"`
+	Error           string `json:"error"`
+}
+
+// BatchResponse is returned from POST /api/v1/sessions/batch/
+type BatchResponse struct {
+	Created int           `json:"created"`
+	Results []BatchResult `json:"results"`
+}
+
+// JobResponse is returned when an upload is queued for background parsing
+// (202 from POST /api/v1/sessions/upload/) and from GET /api/v1/jobs/<id>/.
+type JobResponse struct {
+	JobID     string  `json:"job_id"`
+	Status    string  `json:"status"`
+	SessionID *string `json:"session_id"`
+	Error     string  `json:"error"`
+	StatusURL string  `json:"status_url"`
+}
+
+// SessionSummary is one entry of GET /api/v1/sessions/. In compact mode
+// only Source, SourceSessionID and ContentHash are set.
+type SessionSummary struct {
+	ID              string `json:"id,omitempty"`
+	Title           string `json:"title,omitempty"`
+	Source          string `json:"source"`
+	SourceSessionID string `json:"source_session_id"`
+	ContentHash     string `json:"content_hash"`
+	UploadedAt      string `json:"uploaded_at,omitempty"`
+	StepCount       int    `json:"step_count,omitempty"`
+}
+
+// SessionListResponse is one page of GET /api/v1/sessions/.
+type SessionListResponse struct {
+	Sessions   []SessionSummary `json:"sessions"`
+	NextCursor *string          `json:"next_cursor"`
+	Watermark  *string          `json:"watermark"`
+}
+
+// UploadResponse is the state of a resumable upload
+// (POST /api/v1/uploads/ and GET /api/v1/uploads/<id>/).
+type UploadResponse struct {
+	UploadID      string `json:"upload_id"`
+	Status        string `json:"status"`
+	NextChunk     int    `json:"next_chunk"`
+	BytesReceived int64  `json:"bytes_received"`
+	ChunkMaxBytes int64  `json:"chunk_max_bytes"`
+	CompleteURL   string `json:"complete_url"`
+}
+
+// AppendResponse is returned from POST /api/v1/sessions/append/.
+// IngestedBytes is the offset to send the next append from.
+type AppendResponse struct {
+	ID            string `json:"id"`
+	StepCount     int    `json:"step_count"`
+	IngestedBytes int64  `json:"ingested_bytes"`
+	AppendedSteps int    `json:"appended_steps"`
+}
+
 // ErrorResponse is returned on API errors.
 type ErrorResponse struct {
 	Error string `json:"error"`
 }
+
+// AppendConflictError is a 409 from POST /api/v1/sessions/append/: the
+// offset sent does not match what the server has ingested.
+type AppendConflictError struct {
+	Message       string `json:"error"`
+	IngestedBytes int64  `json:"ingested_bytes"`
+}
+
+func (e *AppendConflictError) Error() string {
+	return fmt.Sprintf("API error (409): %s", e.Message)
+}
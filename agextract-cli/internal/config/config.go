@@ -12,6 +12,8 @@ const (
 	ConfigDirName    = ".agextract"
 	ConfigFileName   = "config.json"
 	UploadedFileName = "uploaded.json"
+	PendingFileName  = "pending_uploads.json"
+	OffsetsFileName  = "append_offsets.json"
 )
 
 type Config struct {
@@ -26,6 +28,19 @@ type UploadedLedger struct {
 	Hashes map[string]time.Time `json:"hashes"`
 }
 
+// PendingUploads maps a file (path, size and mtime) to the id of its
+// unfinished resumable upload on the server, so an interrupted upload
+// resumes where it stopped, even after a restart.
+type PendingUploads struct {
+	Uploads map[string]string `json:"uploads"`
+}
+
+// AppendOffsets records, per live session file, how many bytes the server
+// has ingested, so the next sync only sends what was appended since.
+type AppendOffsets struct {
+	Offsets map[string]int64 `json:"offsets"`
+}
+
 func Dir() string {
 	home, _ := os.UserHomeDir()
 	return filepath.Join(home, ConfigDirName)
@@ -123,3 +138,73 @@ func (l *UploadedLedger) HasHash(hash string) bool {
 func (l *UploadedLedger) AddHash(hash string) {
 	l.Hashes[hash] = time.Now()
 }
+
+func PendingPath() string {
+	return filepath.Join(Dir(), PendingFileName)
+}
+
+func LoadPendingUploads() (*PendingUploads, error) {
+	pending := &PendingUploads{Uploads: make(map[string]string)}
+
+	data, err := os.ReadFile(PendingPath())
+	if err != nil {
+		if os.IsNotExist(err) {
+			return pending, nil
+		}
+		return nil, err
+	}
+
+	if err := json.Unmarshal(data, pending); err != nil {
+		return nil, err
+	}
+	if pending.Uploads == nil {
+		pending.Uploads = make(map[string]string)
+	}
+	return pending, nil
+}
+
+func (p *PendingUploads) Save() error {
+	if err := EnsureDir(); err != nil {
+		return err
+	}
+	data, err := json.MarshalIndent(p, "", "  ")
+	if err != nil {
+		return err
+	}
+	return os.WriteFile(PendingPath(), data, 0600)
+}
+
+func OffsetsPath() string {
+	return filepath.Join(Dir(), OffsetsFileName)
+}
+
+func LoadAppendOffsets() (*AppendOffsets, error) {
+	offsets := &AppendOffsets{Offsets: make(map[string]int64)}
+
+	data, err := os.ReadFile(OffsetsPath())
+	if err != nil {
+		if os.IsNotExist(err) {
+			return offsets, nil
+		}
+		return nil, err
+	}
+
+	if err := json.Unmarshal(data, offsets); err != nil {
+		return nil, err
+	}
+	if offsets.Offsets == nil {
+		offsets.Offsets = make(map[string]int64)
+	}
+	return offsets, nil
+}
+
+func (o *AppendOffsets) Save() error {
+	if err := EnsureDir(); err != nil {
+		return err
+	}
+	data, err := json.MarshalIndent(o, "", "  ")
+	if err != nil {
+		return err
+	}
+	return os.WriteFile(OffsetsPath(), data, 0600)
+}
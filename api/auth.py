@@ -1,7 +1,47 @@
+"""
+Bearer-token authentication for the API.
+
+Validated tokens are cached in-process, keyed by a SHA-256 of the token,
+so the CLI's steady stream of push/status/me calls runs no authentication
+query at all. An entry holds the token id, the user fields views read
+(CACHED_USER_FIELDS) and the token's expiry, and is trusted for
+AGEXTRACT_TOKEN_CACHE_TTL seconds. On a hit request.api_user is rebuilt
+from those fields; any other field is loaded from the database when first
+read, like a deferred field. A change to a cached user field is seen by
+this worker at once (see api.signals) and by others within the TTL.
+
+Saving or deleting a token (revoke, refresh grant) drops its entry here
+and writes a revocation marker to Django's cache framework, which other
+workers check on every cache hit. With a shared cache backend (Redis,
+Memcached, database) revocation therefore takes effect everywhere at
+once; with the default per-process LocMemCache other workers notice
+within the TTL.
+"""
 import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
 from .models import APIToken
 
+REVOKED_KEY_PREFIX = 'agextract:api-token-revoked:'
+
+# Loaded into request.api_user on a cache hit
+CACHED_USER_FIELDS = ('id', 'username', 'email')
+
+# token hash -> (token_id, user field values, expires_at, cached_at), least recent first
+_tokens = OrderedDict()
+_tokens_lock = threading.Lock()
+
 
 def get_token_from_request(request):
     """Extract Bearer token from Authorization header."""
@@ -11,8 +51,89 @@ def get_token_from_request(request):
     return None
 
 
+def hash_token(token_str):
+    return hashlib.sha256(token_str.encode('utf-8')).hexdigest()
+
+
+def _cache_ttl():
+    return getattr(settings, 'AGEXTRACT_TOKEN_CACHE_TTL', 300)
+
+
+def _user_field_names():
+    """CACHED_USER_FIELDS in model field order, as Model.from_db() expects."""
+    return [
+        field.attname for field in get_user_model()._meta.concrete_fields
+        if field.attname in CACHED_USER_FIELDS
+    ]
+
+
+def _cached_token(token_hash):
+    """Return the cached (token_id, user field values) for a hash, or None."""
+    with _tokens_lock:
+        entry = _tokens.get(token_hash)
+        if entry is None:
+            return None
+        token_id, user_values, expires_at, cached_at = entry
+        if expires_at <= timezone.now() or time.monotonic() - cached_at > _cache_ttl():
+            del _tokens[token_hash]
+            return None
+        _tokens.move_to_end(token_hash)
+
+    # Revoked by another worker since we cached it
+    if cache.get(REVOKED_KEY_PREFIX + token_hash):
+        forget_token(token_hash)
+        return None
+    return token_id, user_values
+
+
+def _remember_token(token_hash, token):
+    max_size = getattr(settings, 'AGEXTRACT_TOKEN_CACHE_SIZE', 1024)
+    if not max_size:
+        return
+    with _tokens_lock:
+        user_values = tuple(getattr(token.user, name) for name in _user_field_names())
+        _tokens[token_hash] = (token.id, user_values, token.expires_at, time.monotonic())
+        _tokens.move_to_end(token_hash)
+        while len(_tokens) > max_size:
+            _tokens.popitem(last=False)
+
+
+def forget_token(token_hash):
+    """Drop a token from this worker's cache."""
+    with _tokens_lock:
+        _tokens.pop(token_hash, None)
+
+
+def invalidate_token(token):
+    """
+    Drop ``token`` from the cache in every worker. Called from the APIToken
+    save/delete signals, so revoking a token never needs to call this itself.
+    """
+    token_hash = hash_token(token.access_token)
+    forget_token(token_hash)
+    # The marker only has to outlive entries cached before the revocation
+    cache.set(REVOKED_KEY_PREFIX + token_hash, True, timeout=_cache_ttl())
+
+
+def forget_user(user_id):
+    """Drop this worker's cached tokens of a user whose fields changed."""
+    id_index = _user_field_names().index('id')
+    with _tokens_lock:
+        for token_hash in [h for h, entry in _tokens.items() if entry[1][id_index] == user_id]:
+            del _tokens[token_hash]
+
+
+def clear_token_cache():
+    with _tokens_lock:
+        _tokens.clear()
+
+
 def require_api_auth(view_func):
-    """Decorator that validates Bearer token and sets request.api_user."""
+    """
+    Decorator that validates Bearer token and sets request.api_user and
+    request.api_token. On a cache hit the user is built from the cached
+    fields and the token is loaded lazily, on first use.
+    """
     @functools.wraps(view_func)
     def wrapper(request, *args, **kwargs):
         token_str = get_token_from_request(request)
@@ -21,6 +142,15 @@ def require_api_auth(view_func):
                 {'error': 'Authentication required. Provide Bearer token.'},
                 status=401,
             )
+
+        token_hash = hash_token(token_str)
+        cached = _cached_token(token_hash)
+        if cached is not None:
+            token_id, user_values = cached
+            request.api_user = get_user_model().from_db(DEFAULT_DB_ALIAS, _user_field_names(), user_values)
+            request.api_token = SimpleLazyObject(lambda: APIToken.objects.get(pk=token_id))
+            return view_func(request, *args, **kwargs)
+
         try:
             token = APIToken.objects.select_related('user').get(
                 access_token=token_str,
@@ -31,6 +161,7 @@ def require_api_auth(view_func):
         if not token.is_valid():
             return JsonResponse({'error': 'Token expired or revoked.'}, status=401)
 
+        _remember_token(token_hash, token)
         request.api_user = token.user
         request.api_token = token
         return view_func(request, *args, **kwargs)
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .auth import forget_user, invalidate_token
+from .models import APIToken
+
+
+@receiver(post_save, sender=APIToken)
+def invalidate_saved_token(sender, instance, created, **kwargs):
+    # Covers revoke and the refresh grant, which both save revoked=True
+    if not created:
+        invalidate_token(instance)
+
+
+@receiver(post_delete, sender=APIToken)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_saved_user(sender, instance, created, **kwargs):
+    # Cached tokens carry a copy of the user's fields (see auth.CACHED_USER_FIELDS)
+    if not created:
+        forget_user(instance.pk)
@@ -0,0 +1,668 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Session
+
+from .models import APIToken
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('builder', password='pw')
+        self.token = APIToken.objects.create(
+            user=self.user, expires_at=timezone.now() + timedelta(days=30),
+        )
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {self.token.access_token}'}
+
+
+class SessionUploadJobTest(APITestCase):
+    def test_large_upload_returns_job_and_completes(self):
+        import tempfile
+        from core.jobs import run_pending_jobs
+
+        upload = SimpleUploadedFile(
+            "session.jsonl", b'{"type": "user", "message": {"content": "hello"}}\n',
+        )
+        with tempfile.TemporaryDirectory() as spool, \
+                override_settings(AGEXTRACT_INLINE_UPLOAD_MAX_BYTES=0, AGEXTRACT_SPOOL_DIR=spool):
+            response = self.client.post(
+                reverse('api:session_upload'), {'file': upload, 'source': 'claudecode'}, **self.auth,
+            )
+            self.assertEqual(response.status_code, 202)
+            job = response.json()
+            self.assertEqual(job['status'], 'queued')
+            self.assertIsNone(job['session_id'])
+
+            run_pending_jobs()
+
+        response = self.client.get(job['status_url'], **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'done')
+
+        session_id = response.json()['session_id']
+        response = self.client.get(reverse('api:session_detail', args=[session_id]), **self.auth)
+        self.assertEqual(response.json()['source'], 'claudecode')
+        self.assertEqual(len(response.json()['steps']), 1)
+
+    def test_small_upload_is_parsed_inline(self):
+        upload = SimpleUploadedFile("session.md", b"# User\nHello\n")
+        response = self.client.post(reverse('api:session_upload'), {'file': upload}, **self.auth)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['steps']), 1)
+
+    def test_job_detail_is_scoped_to_owner(self):
+        from core.models import IngestionJob
+        other = User.objects.create_user('other')
+        job = IngestionJob.objects.create(user=other, title="x", spool_path="/nonexistent")
+        response = self.client.get(reverse('api:job_detail', args=[job.id]), **self.auth)
+        self.assertEqual(response.status_code, 404)
+
+
+class CompressedUploadTest(APITestCase):
+    def test_gzip_session_create_dedups_with_plain_body(self):
+        import gzip
+        body = json.dumps({'title': 'Zipped', 'steps': [{'content': 'hi'}]}).encode()
+        created = self.client.post(
+            reverse('api:sessions'), gzip.compress(body),
+            content_type='application/json', HTTP_CONTENT_ENCODING='gzip', **self.auth,
+        )
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(created.json()['steps'][0]['content'], 'hi')
+
+        again = self.client.post(reverse('api:sessions'), body, content_type='application/json', **self.auth)
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['id'], created.json()['id'])
+
+    def test_gzip_file_upload(self):
+        import gzip
+        raw = b'{"type": "user", "message": {"content": "hello"}}\n'
+        upload = SimpleUploadedFile("session.jsonl.gz", gzip.compress(raw))
+        response = self.client.post(reverse('api:session_upload'), {'file': upload}, **self.auth)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['title'], 'session.jsonl')
+        self.assertEqual(response.json()['steps'][0]['content'], 'hello')
+
+        import hashlib
+        self.assertTrue(Session.objects.filter(content_hash=hashlib.sha256(raw).hexdigest()).exists())
+
+    def test_rejects_bombs_and_unknown_encodings(self):
+        import gzip
+        body = gzip.compress(json.dumps({'title': 'x' * 10000}).encode())
+        with override_settings(AGEXTRACT_MAX_DECOMPRESSED_BYTES=1000):
+            response = self.client.post(
+                reverse('api:sessions'), body,
+                content_type='application/json', HTTP_CONTENT_ENCODING='gzip', **self.auth,
+            )
+        self.assertEqual(response.status_code, 413)
+
+        response = self.client.post(
+            reverse('api:sessions'), b'{}',
+            content_type='application/json', HTTP_CONTENT_ENCODING='br', **self.auth,
+        )
+        self.assertEqual(response.status_code, 415)
+
+        response = self.client.post(
+            reverse('api:sessions'), b'not gzip',
+            content_type='application/json', HTTP_CONTENT_ENCODING='gzip', **self.auth,
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class UploadDedupTest(APITestCase):
+    RAW = b'{"type": "user", "message": {"content": "hello"}}\n'
+
+    def _upload(self, data, name="session.jsonl", **extra):
+        upload = SimpleUploadedFile(name, data)
+        return self.client.post(reverse('api:session_upload'), {'file': upload}, **self.auth, **extra)
+
+    def test_duplicate_is_rolled_back_after_the_single_pass(self):
+        import gzip
+        from core.models import Step
+        created = self._upload(self.RAW)
+        self.assertEqual(created.status_code, 201)
+
+        again = self._upload(gzip.compress(self.RAW), name="session.jsonl.gz")
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['id'], created.json()['id'])
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertEqual(Step.objects.count(), 1)
+
+    def test_queued_duplicate_is_not_queued(self):
+        import gzip
+        import os
+        import tempfile
+        from core.models import IngestionJob
+        created = self._upload(self.RAW)
+        with tempfile.TemporaryDirectory() as spool, \
+                override_settings(AGEXTRACT_INLINE_UPLOAD_MAX_BYTES=10, AGEXTRACT_SPOOL_DIR=spool):
+            for data, name in ((self.RAW, "session.jsonl"), (gzip.compress(self.RAW), "session.jsonl.gz")):
+                with self.subTest(name):
+                    again = self._upload(data, name=name)
+                    self.assertEqual(again.status_code, 200)
+                    self.assertEqual(again.json()['id'], created.json()['id'])
+            self.assertEqual(os.listdir(spool), [])
+        self.assertFalse(IngestionJob.objects.exists())
+
+    def test_content_hash_header_answers_before_the_body(self):
+        import hashlib
+        created = self._upload(self.RAW)
+        header = {'HTTP_X_CONTENT_SHA256': hashlib.sha256(self.RAW).hexdigest().upper()}
+
+        response = self.client.post(reverse('api:session_upload'), **self.auth, **header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], created.json()['id'])
+
+        response = self.client.post(
+            reverse('api:upload_create'), {'title': 'big'}, content_type='application/json',
+            **self.auth, **header,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], created.json()['id'])
+
+        # An unknown hash is just a miss; the server hashes what it is sent
+        response = self._upload(b"# User\nHi\n", HTTP_X_CONTENT_SHA256='0' * 64)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            Session.objects.get(id=response.json()['id']).content_hash,
+            hashlib.sha256(b"# User\nHi\n").hexdigest(),
+        )
+
+
+class ChunkedUploadTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        import tempfile
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        spool_settings = override_settings(AGEXTRACT_SPOOL_DIR=spool.name)
+        spool_settings.enable()
+        self.addCleanup(spool_settings.disable)
+
+    def _put(self, upload, index, data, checksum=None):
+        import hashlib
+        return self.client.put(
+            reverse('api:upload_chunk', args=[upload['upload_id'], index]), data,
+            content_type='application/octet-stream',
+            HTTP_X_CHUNK_SHA256=checksum or hashlib.sha256(data).hexdigest(), **self.auth,
+        )
+
+    def test_resumes_after_interruption_and_completes(self):
+        import hashlib
+        raw = b"".join(
+            b'{"type": "user", "message": {"content": "line %d"}}\n' % i for i in range(50)
+        )
+        chunks = [raw[i:i + 500] for i in range(0, len(raw), 500)]
+        upload = self.client.post(
+            reverse('api:upload_create'), json.dumps({'title': 'Big', 'source': 'claudecode'}),
+            content_type='application/json', **self.auth,
+        ).json()
+        self.assertEqual(upload['next_chunk'], 0)
+
+        self.assertEqual(self._put(upload, 0, chunks[0]).status_code, 200)
+        # A corrupted chunk is rejected and not acknowledged
+        self.assertEqual(self._put(upload, 1, b'garbage', hashlib.sha256(chunks[1]).hexdigest()).status_code, 422)
+        # Out of order
+        self.assertEqual(self._put(upload, 2, chunks[2]).status_code, 409)
+        # Retrying an acknowledged chunk is harmless
+        self.assertEqual(self._put(upload, 0, chunks[0]).status_code, 200)
+
+        state = self.client.get(reverse('api:upload_detail', args=[upload['upload_id']]), **self.auth).json()
+        self.assertEqual(state['next_chunk'], 1)
+        for index in range(state['next_chunk'], len(chunks)):
+            self.assertEqual(self._put(upload, index, chunks[index]).status_code, 200)
+
+        response = self.client.post(upload['complete_url'], **self.auth)
+        self.assertEqual(response.status_code, 201)
+        session = response.json()
+        self.assertEqual(len(session['steps']), 50)
+        self.assertEqual(session['source'], 'claudecode')
+        self.assertEqual(Session.objects.get(id=session['id']).content_hash, hashlib.sha256(raw).hexdigest())
+
+        # Completing again returns the same session
+        again = self.client.post(upload['complete_url'], **self.auth)
+        self.assertEqual(again.json()['id'], session['id'])
+
+    def test_large_upload_is_queued_from_the_spool_file(self):
+        from core.jobs import run_pending_jobs
+        upload = self.client.post(reverse('api:upload_create'), '{}', content_type='application/json', **self.auth).json()
+        self._put(upload, 0, b"# User\nHello\n")
+        with override_settings(AGEXTRACT_INLINE_UPLOAD_MAX_BYTES=0):
+            response = self.client.post(upload['complete_url'], **self.auth)
+        self.assertEqual(response.status_code, 202)
+        run_pending_jobs()
+        job = self.client.get(response.json()['status_url'], **self.auth).json()
+        self.assertEqual(job['status'], 'done')
+
+    def test_chunks_are_written_into_the_spool_file_once(self):
+        import glob
+        from unittest import mock
+        from core.models import ChunkedUpload
+        lines = [b'{"type": "user", "message": {"content": "line %d"}}\n' % i for i in range(3)]
+        upload = self.client.post(reverse('api:upload_create'), '{}', content_type='application/json', **self.auth).json()
+        spool_path = ChunkedUpload.objects.get(id=upload['upload_id']).spool_path
+
+        self._put(upload, 0, lines[0])
+        self._put(upload, 1, lines[1])
+        with open(spool_path, 'rb') as spooled:
+            self.assertEqual(spooled.read(), lines[0] + lines[1])
+        self.assertEqual(glob.glob(f"{spool_path}.*"), [])
+
+        # A chunk acknowledged but not yet written (a crash) is written on completion
+        with mock.patch('core.uploads.settle_chunks'):
+            self._put(upload, 2, lines[2])
+        self.assertEqual(len(glob.glob(f"{spool_path}.*")), 1)
+        response = self.client.post(upload['complete_url'], **self.auth)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['steps']), 3)
+
+    def test_chunk_body_is_read_outside_a_transaction(self):
+        import hashlib
+        import io
+        from core import uploads
+        data = b"# User\nHello\n"
+        depth = len(connection.atomic_blocks)
+        depths = []
+
+        class Body(io.BytesIO):
+            def read(self, *args):
+                depths.append(len(connection.atomic_blocks))
+                return super().read(*args)
+
+        upload = uploads.create_upload(title='Slow', user=self.user)
+        upload = uploads.write_chunk(upload, 0, Body(data), hashlib.sha256(data).hexdigest())
+        self.assertEqual(upload.chunk_hashes, [hashlib.sha256(data).hexdigest()])
+        self.assertTrue(depths)
+        self.assertEqual(set(depths), {depth})
+
+
+class SessionAppendTest(APITestCase):
+    LINES = [
+        b'{"type": "user", "message": {"content": "first"}}\n',
+        b'{"type": "assistant", "message": {"content": "second"}}\n',
+        b'{"type": "user", "message": {"content": "third"}}\n',
+    ]
+
+    def _append(self, data, offset=0):
+        return self.client.post(reverse('api:session_append'), {
+            'file': SimpleUploadedFile('live.jsonl', data),
+            'offset': offset,
+            'source': 'claudecode',
+            'source_session_id': 'live-1',
+        }, **self.auth)
+
+    def test_appends_only_new_complete_lines(self):
+        partial = self.LINES[1][:20]
+        response = self._append(self.LINES[0] + partial)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['appended_steps'], 1)
+        # The half-written line is left for the next sync
+        offset = response.json()['ingested_bytes']
+        self.assertEqual(offset, len(self.LINES[0]))
+
+        response = self._append(self.LINES[1] + self.LINES[2], offset=offset)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['appended_steps'], 2)
+        self.assertEqual(response.json()['ingested_bytes'], sum(map(len, self.LINES)))
+
+        session = Session.objects.get(source_session_id='live-1')
+        self.assertEqual(
+            list(session.steps.values_list('order', 'content')),
+            [(1, 'first'), (2, 'second'), (3, 'third')],
+        )
+        self.assertEqual(session.step_count, 3)
+        self.assertEqual(session.user_step_count, 2)
+
+    def test_overlapping_resend_is_skipped(self):
+        self._append(self.LINES[0] + self.LINES[1])
+        response = self._append(b''.join(self.LINES))
+        self.assertEqual(response.json()['appended_steps'], 1)
+        session = Session.objects.get(source_session_id='live-1')
+        self.assertEqual(session.steps.count(), 3)
+
+    def test_gap_is_a_conflict(self):
+        self._append(self.LINES[0])
+        response = self._append(self.LINES[2], offset=len(self.LINES[0]) + len(self.LINES[1]))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['ingested_bytes'], len(self.LINES[0]))
+
+    def test_whole_file_session_cannot_be_appended_to(self):
+        Session.objects.create(
+            user=self.user, source='claudecode', source_session_id='live-1', step_count=4,
+        )
+        response = self._append(self.LINES[0])
+        self.assertEqual(response.status_code, 409)
+
+
+class SessionBatchTest(APITestCase):
+    def _payload(self, source_session_id, steps=1):
+        return {
+            'title': f'Session {source_session_id}',
+            'source': 'claudecode',
+            'source_session_id': source_session_id,
+            'steps': [
+                {'role': 'user', 'step_type': 'prompt', 'content': f'step {i}', 'order': i + 1}
+                for i in range(steps)
+            ],
+        }
+
+    def test_json_array_creates_and_dedups(self):
+        import json
+        from core.models import Session
+
+        self.client.post(
+            reverse('api:sessions'), json.dumps(self._payload('a')),
+            content_type='application/json', **self.auth,
+        )
+        batch = [self._payload('a'), self._payload('b', steps=3), self._payload('b'), 'junk']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('api:session_batch'), json.dumps(batch),
+                content_type='application/json', **self.auth,
+            )
+        # One dedup lookup per key, regardless of batch size
+        lookups = [q for q in queries if q['sql'].startswith('SELECT') and 'FROM "core_session"' in q['sql']]
+        self.assertEqual(len(lookups), 2)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['created'], 1)
+        statuses = [r['status'] for r in data['results']]
+        self.assertEqual(statuses, ['existing', 'created', 'existing', 'error'])
+        self.assertEqual(data['results'][1]['id'], data['results'][2]['id'])
+        self.assertEqual(Session.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Session.objects.get(source_session_id='b').steps.count(), 3)
+
+    def test_ndjson_hash_matches_single_push(self):
+        import json
+        line = json.dumps(self._payload('')).encode()
+
+        single = self.client.post(
+            reverse('api:sessions'), line, content_type='application/json', **self.auth,
+        ).json()
+        response = self.client.post(
+            reverse('api:session_batch'), line + b'\n' + json.dumps(self._payload('c')).encode() + b'\n',
+            content_type='application/x-ndjson', **self.auth,
+        )
+        results = response.json()['results']
+        self.assertEqual(results[0], {**results[0], 'status': 'existing', 'id': single['id']})
+        self.assertEqual(results[1]['status'], 'created')
+
+    def test_array_items_dedup_against_single_pushes(self):
+        import hashlib
+        import json
+        from core.models import Session
+
+        # Any encoding of the same payload hashes the same
+        single = self.client.post(
+            reverse('api:sessions'), json.dumps(self._payload(''), indent=2),
+            content_type='application/json', **self.auth,
+        ).json()
+        response = self.client.post(
+            reverse('api:session_batch'), json.dumps([self._payload('')]),
+            content_type='application/json', **self.auth,
+        )
+        self.assertEqual(response.json()['results'][0]['status'], 'existing')
+        self.assertEqual(response.json()['results'][0]['id'], single['id'])
+
+        # Sessions stored with the hash of their raw body still dedup
+        raw = json.dumps({**self._payload(''), 'title': 'legacy'}).encode()
+        legacy = Session.objects.create(user=self.user, title='legacy', content_hash=hashlib.sha256(raw).hexdigest())
+        response = self.client.post(reverse('api:sessions'), raw, content_type='application/json', **self.auth)
+        self.assertEqual(response.json()['id'], str(legacy.id))
+
+    def test_malformed_items_fail_alone(self):
+        import json
+        from core.models import Session
+
+        bad_step = self._payload('d')
+        bad_step['steps'][0]['content'] = None
+        batch = [
+            {**self._payload('a'), 'title': None},
+            {**self._payload('b'), 'duration_seconds': '12'},
+            bad_step,
+            self._payload('c'),
+        ]
+        response = self.client.post(
+            reverse('api:session_batch'), json.dumps(batch), content_type='application/json', **self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([r['status'] for r in results], ['error', 'error', 'error', 'created'])
+        self.assertEqual(results[0]['error'], 'title must be a string')
+        self.assertEqual(results[1]['error'], 'duration_seconds must be an integer or null')
+        self.assertEqual(results[2]['error'], 'steps[0].content must be a string')
+        self.assertEqual(list(Session.objects.values_list('source_session_id', flat=True)), ['c'])
+
+        response = self.client.post(
+            reverse('api:sessions'), json.dumps({**self._payload('e'), 'file_count': True}),
+            content_type='application/json', **self.auth,
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_malformed_body(self):
+        response = self.client.post(
+            reverse('api:session_batch'), '{"not": "a list"}',
+            content_type='application/json', **self.auth,
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class SessionListTest(APITestCase):
+    def _push(self, source_session_id):
+        return self.client.post(
+            reverse('api:sessions'),
+            json.dumps({'title': source_session_id, 'source': 'claudecode', 'source_session_id': source_session_id}),
+            content_type='application/json', **self.auth,
+        ).json()
+
+    def test_pages_through_sessions_in_upload_order(self):
+        ids = [self._push(name)['id'] for name in 'abcde']
+        User.objects.create_user('other').sessions.create(title='not mine')
+
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            data = self.client.get(reverse('api:sessions'), params, **self.auth).json()
+            seen += [session['id'] for session in data['sessions']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, ids)
+
+    def test_since_watermark_returns_only_new_sessions(self):
+        self._push('a')
+        data = self.client.get(reverse('api:sessions'), {'compact': '1'}, **self.auth).json()
+        self.assertEqual(data['sessions'], [{
+            'source': 'claudecode', 'source_session_id': 'a',
+            'content_hash': Session.objects.get().content_hash,
+        }])
+
+        self._push('b')
+        data = self.client.get(
+            reverse('api:sessions'), {'compact': '1', 'since': data['watermark']}, **self.auth,
+        ).json()
+        self.assertEqual([s['source_session_id'] for s in data['sessions']], ['b'])
+
+    def test_naive_since_is_utc(self):
+        import warnings
+        from datetime import timezone as dt_timezone
+        self._push('a')
+        uploaded_at = Session.objects.get().uploaded_at.astimezone(dt_timezone.utc)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            for since, expected in ((uploaded_at - timedelta(seconds=1), 1), (uploaded_at, 0)):
+                data = self.client.get(
+                    reverse('api:sessions'), {'since': since.replace(tzinfo=None).isoformat()}, **self.auth,
+                ).json()
+                self.assertEqual(len(data['sessions']), expected)
+
+    def test_rejects_bad_parameters(self):
+        for params in ({'cursor': 'nope'}, {'since': 'yesterday'}, {'limit': 'x'}):
+            response = self.client.get(reverse('api:sessions'), params, **self.auth)
+            self.assertEqual(response.status_code, 400)
+
+
+class SessionDetailTest(APITestCase):
+    def test_returns_full_out_of_line_content(self):
+        import json
+        big = "x" * 10000
+        payload = {'title': 'Big', 'steps': [{'role': 'agent', 'step_type': 'text', 'content': big, 'order': 1}]}
+        created = self.client.post(
+            reverse('api:sessions'), json.dumps(payload), content_type='application/json', **self.auth,
+        ).json()
+        self.assertEqual(created['steps'][0]['content'], big)
+        self.assertEqual(set(created['steps'][0]), {'id', 'role', 'step_type', 'content', 'order', 'timestamp'})
+
+
+    def test_streams_ndjson(self):
+        payload = {'title': 'Streamed', 'steps': [
+            {'role': 'user', 'step_type': 'prompt', 'content': 'hi', 'order': 1},
+            {'role': 'agent', 'step_type': 'text', 'content': 'y' * 10000, 'order': 2},
+        ]}
+        created = self.client.post(
+            reverse('api:sessions'), json.dumps(payload), content_type='application/json', **self.auth,
+        ).json()
+        url = reverse('api:session_detail', args=[created['id']])
+
+        for kwargs in ({'HTTP_ACCEPT': 'application/x-ndjson'}, {'data': {'stream': '1'}}):
+            response = self.client.get(url, **kwargs, **self.auth)
+            self.assertTrue(response.streaming)
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+            self.assertEqual(lines[0]['title'], 'Streamed')
+            self.assertEqual(lines[0]['step_count'], 2)
+            self.assertEqual(lines[1:], created['steps'])
+
+
+    def test_conditional_get(self):
+        created = self.client.post(
+            reverse('api:sessions'), json.dumps({'title': 'x', 'steps': [{'content': 'hi'}]}),
+            content_type='application/json', **self.auth,
+        ).json()
+        url = reverse('api:session_detail', args=[created['id']])
+        etag = self.client.get(url, **self.auth)['ETag']
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([q for q in ctx.captured_queries if 'core_step' in q['sql']])
+
+        # The NDJSON representation has its own ETag
+        response = self.client.get(url, {'stream': '1'}, HTTP_IF_NONE_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class SearchTest(APITestCase):
+    def test_search_returns_ranked_snippets(self):
+        self.client.post(
+            '/api/v1/sessions/',
+            data=json.dumps({'title': 'Search me', 'steps': [
+                {'role': 'user', 'step_type': 'prompt', 'content': 'migrate the billing tables'},
+                {'role': 'agent', 'step_type': 'text', 'content': 'unrelated'},
+            ]}),
+            content_type='application/json', **self.auth,
+        )
+        response = self.client.get('/api/v1/search/', {'q': 'billing'}, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['session_title'], 'Search me')
+        self.assertIn('<mark>billing</mark>', results[0]['snippet'])
+
+        self.assertEqual(self.client.get('/api/v1/search/', **self.auth).status_code, 400)
+        response = self.client.get('/api/v1/search/?q=a%00b', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+
+
+class TokenCacheTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        from .auth import clear_token_cache
+        clear_token_cache()
+
+    def _me(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('api:me'), **self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(ctx.captured_queries)
+
+    def test_steady_state_runs_no_query(self):
+        # One query (token joined with its user) to fill the cache, then none
+        self.assertEqual(self._me(), ({'id': self.user.id, 'username': 'builder', 'email': ''}, 1))
+        self.assertEqual(self._me(), ({'id': self.user.id, 'username': 'builder', 'email': ''}, 0))
+
+    def test_user_changes_refresh_the_cache(self):
+        self._me()
+        self.user.email = 'builder@example.com'
+        self.user.save()
+        body, queries = self._me()
+        self.assertEqual(body['email'], 'builder@example.com')
+        self.assertEqual(queries, 1)
+
+    def test_revoke_invalidates_cached_token(self):
+        self.client.get(reverse('api:me'), **self.auth)
+        response = self.client.post(reverse('api:oauth_revoke'), **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse('api:me'), **self.auth).status_code, 401)
+
+    def test_refresh_grant_invalidates_cached_token(self):
+        self.client.get(reverse('api:me'), **self.auth)
+        response = self.client.post(
+            reverse('api:oauth_token'),
+            json.dumps({'grant_type': 'refresh_token', 'refresh_token': self.token.refresh_token}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse('api:me'), **self.auth).status_code, 401)
+
+    def test_revocation_in_another_worker_is_seen(self):
+        from .auth import REVOKED_KEY_PREFIX, hash_token
+        from django.core.cache import cache
+
+        self.client.get(reverse('api:me'), **self.auth)
+        # Another worker revoked the token: the row changed and the marker
+        # is in the shared cache, but this worker's entry is untouched.
+        APIToken.objects.filter(pk=self.token.pk).update(revoked=True)
+        cache.set(REVOKED_KEY_PREFIX + hash_token(self.token.access_token), True)
+        self.assertEqual(self.client.get(reverse('api:me'), **self.auth).status_code, 401)
+
+
+class QueryBudgetTest(APITestCase):
+    def test_endpoints_stay_within_budget(self):
+        from core.jobs import enqueue_spooled
+        from core.profiling import assert_within_query_budget
+        from core.uploads import create_upload
+        from .auth import clear_token_cache
+
+        steps = [{'role': 'user', 'step_type': 'prompt', 'content': f'migrate table {n}'} for n in range(50)]
+        session = self.client.post(
+            reverse('api:sessions'), json.dumps({'title': 'Budget', 'steps': steps}),
+            content_type='application/json', **self.auth,
+        ).json()
+        upload = create_upload(title='Chunked', user=self.user)
+        job = enqueue_spooled('unused', title='Queued', user=self.user)
+
+        requests = [
+            (reverse('api:me'), {}),
+            (reverse('api:session_detail', args=[session['id']]), {}),
+            (reverse('api:search_steps'), {'q': 'migrate'}),
+            (reverse('api:upload_detail', args=[upload.id]), {}),
+            (reverse('api:job_detail', args=[job.id]), {}),
+        ]
+        for url, data in requests:
+            with self.subTest(url=url):
+                # Budgets include the token lookup of a cold cache
+                clear_token_cache()
+                response = self.client.get(url, data, **self.auth)
+                self.assertEqual(response.status_code, 200)
+                assert_within_query_budget(response)
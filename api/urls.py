@@ -13,7 +13,22 @@ urlpatterns = [
     path('me/', views.me, name='me'),
 
     # Sessions
-    path('sessions/', views.session_create, name='session_create'),
+    # GET lists sessions and POST creates one
+    path('sessions/', views.sessions, name='sessions'),
     path('sessions/upload/', views.session_upload, name='session_upload'),
+    path('sessions/batch/', views.session_batch, name='session_batch'),
+    path('sessions/append/', views.session_append, name='session_append'),
     path('sessions/<uuid:session_id>/', views.session_detail, name='session_detail'),
+
+    # Resumable uploads
+    path('uploads/', views.upload_create, name='upload_create'),
+    path('uploads/<uuid:upload_id>/', views.upload_detail, name='upload_detail'),
+    path('uploads/<uuid:upload_id>/chunks/<int:index>/', views.upload_chunk, name='upload_chunk'),
+    path('uploads/<uuid:upload_id>/complete/', views.upload_complete, name='upload_complete'),
+
+    # Search
+    path('search/', views.search_steps, name='search_steps'),
+
+    # Ingestion jobs
+    path('jobs/<uuid:job_id>/', views.job_detail, name='job_detail'),
 ]
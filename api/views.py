@@ -1,17 +1,36 @@
+import base64
+import binascii
 import hashlib
+import io
 import json
-from datetime import timedelta
+import os
+import uuid
+from datetime import timedelta, timezone as dt_timezone
 from string import Template
 
+from django.conf import settings
 from django.contrib.auth import authenticate, login
-from django.http import JsonResponse, HttpResponse
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import redirect
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_GET, require_POST
+from django.views.decorators.http import condition, require_GET, require_http_methods, require_POST
+from django.views.decorators.vary import vary_on_headers
 
-from core.models import Session, Step
-from core.parser import TranscriptParser
+from core import compression, etags, search, uploads
+from core.blobs import decompress
+from core.ingest import StepWriter
+from core.jobs import enqueue_upload, should_queue, should_queue_stream
+from core.models import ChunkedUpload, IngestionJob, Session
+from core.parser import (
+    AppendConflict, DuplicateContent, HashingStream, TranscriptParser, find_duplicate, iter_lines,
+)
+from core.profiling import query_budget
 
 from .auth import require_api_auth, get_token_from_request
 from .models import APIToken, OAuthCode
@@ -188,6 +207,7 @@ def oauth_revoke(request):
 
 @require_GET
 @require_api_auth
+@query_budget(1)
 def me(request):
     """GET /api/v1/me/ — current user info."""
     user = request.api_user
@@ -202,19 +222,125 @@ def me(request):
 # Session Endpoints
 # ---------------------------------------------------------------------------
 
+# Sessions per page of GET /api/v1/sessions/ (default and maximum)
+SESSION_PAGE_SIZE = 100
+MAX_SESSION_PAGE_SIZE = 1000
+
+
+@csrf_exempt
+def sessions(request):
+    """/api/v1/sessions/ — GET lists sessions, POST creates one."""
+    if request.method == 'GET':
+        return session_list(request)
+    return session_create(request)
+
+
+@require_GET
+@require_api_auth
+def session_list(request):
+    """
+    GET /api/v1/sessions/?limit=100&cursor=...&since=...&compact=1
+    List the user's sessions, oldest first, keyset-paginated on
+    (uploaded_at, id). Pass ``next_cursor`` back as ``cursor`` for the next
+    page. ``since`` (ISO 8601, UTC unless it has an offset) returns only
+    sessions uploaded after it; the response's ``watermark`` is the value to
+    send as ``since`` next time.
+    ``compact=1`` returns only source, source_session_id and content_hash,
+    enough for the CLI to skip pushes the server would dedup anyway.
+    """
+    try:
+        limit = min(max(int(request.GET.get('limit', SESSION_PAGE_SIZE)), 1), MAX_SESSION_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+
+    sessions = Session.objects.filter(user=request.api_user).order_by('uploaded_at', 'id')
+
+    since = request.GET.get('since')
+    if since:
+        since_dt = parse_datetime(since)
+        if since_dt is None:
+            return JsonResponse({'error': 'since must be an ISO 8601 datetime'}, status=400)
+        if timezone.is_naive(since_dt):
+            since_dt = timezone.make_aware(since_dt, dt_timezone.utc)
+        sessions = sessions.filter(uploaded_at__gt=since_dt)
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            uploaded_at, session_id = _decode_cursor(cursor)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+        sessions = sessions.filter(
+            Q(uploaded_at__gt=uploaded_at) | Q(uploaded_at=uploaded_at, id__gt=session_id),
+        )
+
+    compact = request.GET.get('compact') in ('1', 'true')
+    if compact:
+        fields = ('uploaded_at', 'id', 'source', 'source_session_id', 'content_hash')
+    else:
+        fields = ('uploaded_at', 'id', 'title', 'source', 'source_session_id', 'content_hash',
+                  'duration_seconds', 'token_usage', 'file_count', 'step_count')
+    page = list(sessions.values(*fields)[:limit + 1])
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = _encode_cursor(page[-1]['uploaded_at'], page[-1]['id'])
+    watermark = page[-1]['uploaded_at'].isoformat() if page else since
+
+    results = []
+    for row in page:
+        uploaded_at = row.pop('uploaded_at')
+        session_id = row.pop('id')
+        if not compact:
+            row = {'id': str(session_id), 'uploaded_at': uploaded_at.isoformat(), **row}
+        results.append(row)
+
+    return JsonResponse({
+        'sessions': results,
+        'next_cursor': next_cursor,
+        'watermark': watermark,
+    })
+
+
+def _encode_cursor(uploaded_at, session_id):
+    raw = f"{uploaded_at.isoformat()}|{session_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    """Return the (uploaded_at, id) of a list cursor; raises ValueError if malformed."""
+    try:
+        uploaded_at, session_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+    except (binascii.Error, UnicodeError):
+        raise ValueError('malformed cursor')
+    uploaded_at = parse_datetime(uploaded_at)
+    if uploaded_at is None:
+        raise ValueError('malformed cursor')
+    return uploaded_at, uuid.UUID(session_id)
+
+
 @csrf_exempt
 @require_POST
 @require_api_auth
 def session_create(request):
     """
     POST /api/v1/sessions/
-    Create a session from structured JSON (pre-parsed by CLI).
+    Create a session from structured JSON (pre-parsed by CLI). The body
+    may be sent with ``Content-Encoding: gzip`` (or ``zstd``).
     Idempotent on source + source_session_id per user.
     """
     try:
-        body = json.loads(request.body)
+        raw = _request_body(request)
+    except compression.DecompressionError as exc:
+        return _decompression_error(exc)
+    try:
+        body = json.loads(raw)
     except (json.JSONDecodeError, ValueError):
         return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    error = _payload_error(body)
+    if error:
+        return JsonResponse({'error': error}, status=400)
 
     source = body.get('source', 'upload')
     source_session_id = body.get('source_session_id', '')
@@ -229,38 +355,251 @@ def session_create(request):
         if existing:
             return _session_to_json(existing, status=200)
 
-    # Content hash dedup: hash the JSON body for structured uploads
-    content_hash = hashlib.sha256(request.body).hexdigest()
+    # Content hash dedup over the canonical payload, so the same session
+    # matches whether it was pushed alone or in a batch
+    content_hash = _payload_hash(body)
     existing = Session.objects.filter(
         user=request.api_user,
-        content_hash=content_hash,
+        content_hash__in=[content_hash, hashlib.sha256(raw).hexdigest()],
     ).first()
     if existing:
         return _session_to_json(existing, status=200)
 
-    session = Session.objects.create(
-        user=request.api_user,
+    # Steps (and blob compression) are prepared before the transaction opens
+    session = _build_session(request.api_user, body, content_hash)
+    writer = StepWriter()
+    writer.add_session(session)
+    _add_steps(writer, session, body)
+    with writer:
+        session.save(force_insert=True)
+
+    return _session_to_json(session, status=201)
+
+
+@csrf_exempt
+@require_POST
+@require_api_auth
+def session_batch(request):
+    """
+    POST /api/v1/sessions/batch/
+    Create many sessions in one request, e.g. when the CLI backfills
+    history. The body is either a JSON array of session payloads (same shape
+    as POST /api/v1/sessions/) or, with Content-Type application/x-ndjson,
+    one payload per line. Dedup works as for single creates, but takes one
+    query per key for the whole batch, and everything new is inserted in
+    one transaction. Returns a result per item, in request order; items
+    that are not valid payloads get status 'error' and the others are still
+    created.
+
+    Items are hashed like single pushes (see _payload_hash), so a session
+    dedups against the same session pushed either way.
+    """
+    try:
+        items = _read_batch(request)
+    except compression.DecompressionError as exc:
+        return _decompression_error(exc)
+    except (json.JSONDecodeError, UnicodeDecodeError, ValueError) as exc:
+        return JsonResponse({'error': f'Invalid batch body: {exc}'}, status=400)
+
+    max_items = getattr(settings, 'AGEXTRACT_MAX_BATCH_SESSIONS', 1000)
+    if len(items) > max_items:
+        return JsonResponse(
+            {'error': f'Batch too large: {len(items)} sessions (max {max_items})'},
+            status=413,
+        )
+
+    user = request.api_user
+    results = [None] * len(items)
+    payloads = []
+    for index, (raw, body) in enumerate(items):
+        error = _payload_error(body)
+        if error:
+            results[index] = {'index': index, 'status': 'error', 'error': error}
+            continue
+        raw_hash = hashlib.sha256(raw).hexdigest() if raw is not None else None
+        payloads.append((index, body, _payload_hash(body), raw_hash))
+
+    # One query per dedup key for the whole batch
+    source_session_ids = {body.get('source_session_id') for _, body, _, _ in payloads} - {'', None}
+    by_source_id = {
+        (s.source, s.source_session_id): s
+        for s in Session.objects.filter(user=user, source_session_id__in=source_session_ids)
+    } if source_session_ids else {}
+    hashes = {h for _, _, content_hash, raw_hash in payloads for h in (content_hash, raw_hash) if h}
+    by_hash = {
+        s.content_hash: s
+        for s in Session.objects.filter(user=user, content_hash__in=hashes)
+    } if payloads else {}
+
+    new_sessions = []
+    for index, body, content_hash, raw_hash in payloads:
+        source = body.get('source', 'upload')
+        source_session_id = body.get('source_session_id', '')
+        key = (source, source_session_id)
+        existing = (
+            (by_source_id.get(key) if source_session_id else None)
+            or by_hash.get(content_hash) or by_hash.get(raw_hash)
+        )
+        if existing:
+            results[index] = _batch_result(index, existing, 'existing')
+            continue
+
+        session = _build_session(user, body, content_hash)
+        new_sessions.append((session, body))
+        # Later duplicates within the same batch resolve to this session
+        by_hash[content_hash] = session
+        if source_session_id:
+            by_source_id[key] = session
+        results[index] = _batch_result(index, session, 'created')
+
+    writer = StepWriter()
+    for session, body in new_sessions:
+        writer.add_session(session)
+        _add_steps(writer, session, body)
+    with writer:
+        Session.objects.bulk_create([session for session, _ in new_sessions])
+
+    return JsonResponse({
+        'created': len(new_sessions),
+        'results': results,
+    })
+
+
+def _read_batch(request):
+    """
+    Return (raw_bytes, payload) pairs from a JSON-array or NDJSON batch
+    body; raw_bytes is None for array items, which have no bytes of their own.
+    """
+    if request.content_type == 'application/x-ndjson':
+        encoding = compression.request_encoding(request)
+        source = compression.DecompressingReader(request, encoding) if encoding else request
+        items = []
+        for line in iter_lines(source):
+            if line.strip():
+                items.append((line.encode('utf-8'), json.loads(line)))
+        return items
+
+    body = json.loads(_request_body(request))
+    if not isinstance(body, list):
+        raise ValueError('expected a JSON array')
+    return [(None, item) for item in body]
+
+
+def _payload_hash(body):
+    """
+    The content hash of a session-create payload: SHA-256 of its canonical
+    JSON (sorted keys, no whitespace), independent of how it was encoded.
+    Sessions pushed before this hashed their raw request bytes, so lookups
+    also try that hash where the bytes are known.
+    """
+    canonical = json.dumps(body, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _request_body(request):
+    """The request body, decoded according to its Content-Encoding."""
+    encoding = compression.request_encoding(request)
+    if encoding is None:
+        return request.body
+    return compression.read_all(io.BytesIO(request.body), encoding)
+
+
+def _decompression_error(exc):
+    if isinstance(exc, compression.UnsupportedEncoding):
+        status = 415
+    elif isinstance(exc, compression.DecompressedTooLarge):
+        status = 413
+    else:
+        status = 400
+    return JsonResponse({'error': str(exc)}, status=status)
+
+
+# Type of each optional field of a session-create payload and its steps
+# (None: may also be null)
+SESSION_PAYLOAD_FIELDS = {
+    'title': (str,), 'source': (str,), 'source_session_id': (str,),
+    'duration_seconds': (int, None), 'token_usage': (int, None), 'file_count': (int, None),
+}
+STEP_PAYLOAD_FIELDS = {
+    'role': (str,), 'step_type': (str,), 'content': (str,), 'order': (int,),
+}
+
+
+def _field_error(data, fields, prefix=''):
+    for name, types in fields.items():
+        if name not in data:
+            continue
+        value = data[name]
+        if value is None and None in types:
+            continue
+        # bool is an int subclass, but true is not a duration
+        if isinstance(value, bool) or not isinstance(value, tuple(t for t in types if t is not None)):
+            kind = 'a string' if str in types else 'an integer'
+            return f"{prefix}{name} must be {kind}" + (' or null' if None in types else '')
+    return None
+
+
+def _payload_error(body):
+    """
+    Why ``body`` is not a valid session-create payload, or None. Checked
+    before anything is written, so one bad item cannot fail a whole batch.
+    """
+    if not isinstance(body, dict):
+        return 'Session payload must be an object'
+    error = _field_error(body, SESSION_PAYLOAD_FIELDS)
+    if error:
+        return error
+    for name in ('title', 'source', 'source_session_id'):
+        max_length = Session._meta.get_field(name).max_length
+        if name in body and len(body[name]) > max_length:
+            return f"{name} is longer than {max_length} characters"
+    steps = body.get('steps', [])
+    if not isinstance(steps, list):
+        return 'steps must be a list'
+    for number, step in enumerate(steps):
+        if not isinstance(step, dict):
+            return f'steps[{number}] must be an object'
+        error = _field_error(step, STEP_PAYLOAD_FIELDS, prefix=f'steps[{number}].')
+        if error:
+            return error
+    return None
+
+
+def _batch_result(index, session, status):
+    return {
+        'index': index,
+        'status': status,
+        'id': str(session.id),
+        'source': session.source,
+        'source_session_id': session.source_session_id,
+    }
+
+
+def _build_session(user, body, content_hash):
+    """Build an unsaved Session from a session-create payload."""
+    return Session(
+        user=user,
         title=body.get('title', 'Untitled Session'),
-        source=source,
-        source_session_id=source_session_id,
+        source=body.get('source', 'upload'),
+        source_session_id=body.get('source_session_id', ''),
         content_hash=content_hash,
         duration_seconds=body.get('duration_seconds'),
         token_usage=body.get('token_usage'),
         file_count=body.get('file_count'),
     )
 
-    # Create steps
+
+def _add_steps(writer, session, body):
+    """Queue the payload's steps on ``writer``."""
     for step_data in body.get('steps', []):
-        Step.objects.create(
-            session=session,
+        writer.add(
+            session,
             role=step_data.get('role', 'user'),
             step_type=step_data.get('step_type', 'text'),
             content=step_data.get('content', ''),
             order=step_data.get('order', 0),
         )
 
-    return _session_to_json(session, status=201)
-
 
 @csrf_exempt
 @require_POST
@@ -268,57 +607,377 @@ def session_create(request):
 def session_upload(request):
     """
     POST /api/v1/sessions/upload/
-    Upload a raw .md/.jsonl file for server-side parsing.
-    Deduplicates on content_hash per user.
+    Upload a raw .md/.jsonl file for server-side parsing. The file may be
+    gzip- or zstd-compressed (detected from its magic bytes).
+    Deduplicates on content_hash per user, over the decompressed content.
+    A client that sends the SHA-256 of that content in X-Content-SHA256 gets
+    a known session back before the upload is read at all.
     """
+    existing = _claimed_duplicate(request)
+    if existing is not None:
+        return _session_to_json(existing)
+
     uploaded_file = request.FILES.get('file')
     if not uploaded_file:
         return JsonResponse({'error': 'No file provided'}, status=400)
 
-    content = uploaded_file.read()
-    content_hash = hashlib.sha256(content).hexdigest()
+    try:
+        session, job, created = _ingest_upload(
+            request.api_user, uploaded_file,
+            title=request.POST.get('title'),
+            source=request.POST.get('source', 'upload'),
+            source_session_id=request.POST.get('source_session_id', ''),
+        )
+    except compression.DecompressionError as exc:
+        return _decompression_error(exc)
+    return _ingest_response(session, job, created)
 
-    # Dedup: return existing session if same content was already uploaded by this user
-    existing = Session.objects.filter(
+
+def _claimed_duplicate(request):
+    """
+    The user's session whose content hash the client sent in
+    X-Content-SHA256, if there is one. Only ever used for this lookup; the
+    hash stored with a new session is computed by the server.
+    """
+    claimed = request.META.get('HTTP_X_CONTENT_SHA256', '').strip().lower()
+    return find_duplicate(request.api_user.pk, claimed)
+
+
+def _ingest_upload(user, uploaded_file, *, title=None, source='upload', source_session_id='',
+                   spool_path=None):
+    """
+    Parse an uploaded transcript inline or queue it for the ingest worker,
+    hashing it in the same pass, and dedup on the hash. Returns (session,
+    job, created); exactly one of session and job is set. ``spool_path`` is
+    where the file already sits on local disk, if it does; a queued job then
+    takes it over instead of copying it. Raises compression.DecompressionError.
+    """
+    encoding = compression.sniff_encoding(uploaded_file)
+    if encoding:
+        # Decoded on the fly, so its size is only known once it is read
+        uploaded_file = compression.DecompressingReader(uploaded_file, encoding)
+        spool_path = None
+        chunks, queue = should_queue_stream(uploaded_file)
+    else:
+        chunks, queue = uploaded_file, should_queue(uploaded_file)
+    title = title if title is not None else uploaded_file.name
+    stream = HashingStream(chunks)
+    session_fields = {
+        'user': user,
+        'source': source,
+        'source_session_id': source_session_id,
+    }
+
+    try:
+        # Large uploads are parsed by the ingest worker; the client polls the job
+        if queue:
+            job = enqueue_upload(stream, title=title, spool_path=spool_path, **session_fields)
+            return None, job, True
+        session = TranscriptParser(stream).parse(title=title, **session_fields)
+    except DuplicateContent as exc:
+        # Same content already uploaded by this user
+        return exc.session, None, False
+    return session, None, True
+
+
+def _ingest_response(session, job, created):
+    if job is not None:
+        return _job_to_json(job, status=202)
+    return _session_to_json(session, status=201 if created else 200)
+
+
+@csrf_exempt
+@require_POST
+@require_api_auth
+def session_append(request):
+    """
+    POST /api/v1/sessions/append/
+    Sync a live JSONL transcript that is still being written. Multipart
+    fields: ``file`` (the transcript from byte ``offset`` on, optionally
+    gzip- or zstd-compressed), ``offset`` (default 0), ``source``,
+    ``source_session_id`` (required; the session is keyed on it) and
+    ``title``. Only lines the session has not ingested yet are parsed, so
+    the client can send just the tail of the file.
+
+    Responds with the session fields, ``ingested_bytes`` (the offset to send
+    from next time) and ``appended_steps``; 201 when the session was
+    created. 409 with ``ingested_bytes`` if the data does not line up.
+    """
+    uploaded_file = request.FILES.get('file')
+    if not uploaded_file:
+        return JsonResponse({'error': 'No file provided'}, status=400)
+    source_session_id = request.POST.get('source_session_id', '')
+    if not source_session_id:
+        return JsonResponse({'error': 'source_session_id is required'}, status=400)
+    try:
+        offset = int(request.POST.get('offset', 0))
+    except ValueError:
+        offset = -1
+    if offset < 0:
+        return JsonResponse({'error': 'offset must be a non-negative integer'}, status=400)
+
+    encoding = compression.sniff_encoding(uploaded_file)
+    if encoding:
+        uploaded_file = compression.DecompressingReader(uploaded_file, encoding)
+    try:
+        session, appended, created = TranscriptParser(uploaded_file).append(
+            offset,
+            title=request.POST.get('title') or uploaded_file.name,
+            user=request.api_user,
+            source=request.POST.get('source', 'upload'),
+            source_session_id=source_session_id,
+        )
+    except compression.DecompressionError as exc:
+        return _decompression_error(exc)
+    except AppendConflict as exc:
+        return JsonResponse({'error': str(exc), 'ingested_bytes': exc.ingested_bytes}, status=409)
+
+    return JsonResponse({
+        **_session_meta(session),
+        'step_count': session.step_count,
+        'ingested_bytes': session.ingested_bytes,
+        'appended_steps': appended,
+    }, status=201 if created else 200)
+
+
+# ---------------------------------------------------------------------------
+# Resumable Uploads
+# ---------------------------------------------------------------------------
+
+@csrf_exempt
+@require_POST
+@require_api_auth
+def upload_create(request):
+    """
+    POST /api/v1/uploads/
+    Start a resumable upload. Body: {"title", "source", "source_session_id"}.
+    Then PUT each chunk to ``chunk_url`` (see upload_chunk) and POST to
+    ``complete_url`` once all chunks are acknowledged. With the content's
+    SHA-256 in X-Content-SHA256, a session the user already has is returned
+    (200) instead, and nothing needs uploading.
+    """
+    try:
+        body = json.loads(request.body or b'{}')
+    except (json.JSONDecodeError, ValueError):
+        return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    if not isinstance(body, dict):
+        return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+
+    existing = _claimed_duplicate(request)
+    if existing is not None:
+        return _session_to_json(existing)
+
+    upload = uploads.create_upload(
         user=request.api_user,
-        content_hash=content_hash,
-    ).first()
-    if existing:
-        return _session_to_json(existing, status=200)
+        title=body.get('title', 'Uploaded Session'),
+        source=body.get('source', 'upload'),
+        source_session_id=body.get('source_session_id', ''),
+    )
+    return _upload_to_json(upload, status=201)
 
-    title = request.POST.get('title', uploaded_file.name)
 
-    parser = TranscriptParser(content)
-    session = parser.parse(title=title)
+@require_GET
+@require_api_auth
+@query_budget(2)
+def upload_detail(request, upload_id):
+    """GET /api/v1/uploads/<uuid>/ — upload state; resume from ``next_chunk``."""
+    try:
+        upload = ChunkedUpload.objects.get(id=upload_id, user=request.api_user)
+    except ChunkedUpload.DoesNotExist:
+        return JsonResponse({'error': 'Upload not found'}, status=404)
+    return _upload_to_json(upload)
 
-    # Attach user, source info, and content hash
-    session.user = request.api_user
-    session.source = request.POST.get('source', 'upload')
-    session.source_session_id = request.POST.get('source_session_id', '')
-    session.content_hash = content_hash
-    session.save()
 
-    return _session_to_json(session, status=201)
+@csrf_exempt
+@require_http_methods(['PUT'])
+@require_api_auth
+def upload_chunk(request, upload_id, index):
+    """
+    PUT /api/v1/uploads/<uuid>/chunks/<n>/
+    Raw chunk bytes as the body, with its hex SHA-256 in X-Chunk-SHA256.
+    Chunks are numbered from 0 and must be sent in order.
+    """
+    try:
+        upload = ChunkedUpload.objects.get(id=upload_id, user=request.api_user)
+    except ChunkedUpload.DoesNotExist:
+        return JsonResponse({'error': 'Upload not found'}, status=404)
+
+    try:
+        upload = uploads.write_chunk(upload, index, request, request.META.get('HTTP_X_CHUNK_SHA256'))
+    except uploads.ChunkError as exc:
+        upload.refresh_from_db()
+        return JsonResponse({
+            'error': str(exc),
+            'next_chunk': len(upload.chunk_hashes),
+        }, status=exc.status)
+    return _upload_to_json(upload)
+
+
+@csrf_exempt
+@require_POST
+@require_api_auth
+def upload_complete(request, upload_id):
+    """
+    POST /api/v1/uploads/<uuid>/complete/
+    Ingest the uploaded file. Responds like POST /api/v1/sessions/upload/:
+    the session (201, or 200 if deduplicated) or a queued job (202).
+    Completing an upload again returns the same outcome.
+    """
+    try:
+        upload = ChunkedUpload.objects.get(id=upload_id, user=request.api_user)
+    except ChunkedUpload.DoesNotExist:
+        return JsonResponse({'error': 'Upload not found'}, status=404)
+
+    claimed = ChunkedUpload.objects.filter(pk=upload.pk, status='open').update(status='complete')
+    if not claimed:
+        upload.refresh_from_db()
+        if upload.job_id is None and upload.session_id is None:
+            return JsonResponse({'error': 'Upload is being completed'}, status=409)
+        return _ingest_response(upload.session, upload.job, False)
+
+    try:
+        # Chunks a crash left unwritten; normally there are none
+        uploads.settle_chunks(upload)
+        with open(upload.spool_path, 'rb') as spooled:
+            session, job, created = _ingest_upload(
+                request.api_user, File(spooled, name=upload.title),
+                title=upload.title,
+                source=upload.source,
+                source_session_id=upload.source_session_id,
+                spool_path=upload.spool_path,
+            )
+    except compression.DecompressionError as exc:
+        ChunkedUpload.objects.filter(pk=upload.pk).update(status='open')
+        return _decompression_error(exc)
+    except Exception:
+        ChunkedUpload.objects.filter(pk=upload.pk).update(status='open')
+        raise
+
+    upload.status = 'complete'
+    upload.session = session
+    upload.job = job
+    upload.save(update_fields=['status', 'session', 'job', 'updated_at'])
+    uploads.remove_chunks(upload)
+    if job is None or job.spool_path != upload.spool_path:
+        os.remove(upload.spool_path)
+    return _ingest_response(session, job, created)
+
+
+def _upload_to_json(upload, status=200):
+    next_chunk = len(upload.chunk_hashes)
+    return JsonResponse({
+        'upload_id': str(upload.id),
+        'status': upload.status,
+        'next_chunk': next_chunk,
+        'bytes_received': upload.bytes_received,
+        'chunk_max_bytes': uploads.chunk_max_bytes(),
+        'session_id': str(upload.session_id) if upload.session_id else None,
+        'job_id': str(upload.job_id) if upload.job_id else None,
+        'chunk_url': reverse('api:upload_chunk', args=[upload.id, next_chunk]),
+        'complete_url': reverse('api:upload_complete', args=[upload.id]),
+    }, status=status)
+
+
+def _session_etag(request, session_id):
+    return etags.session_etag(request, session_id, 'ndjson' if _wants_stream(request) else 'json')
 
 
 @require_GET
 @require_api_auth
+@vary_on_headers('Accept')
+@condition(etag_func=_session_etag, last_modified_func=etags.session_last_modified)
+@query_budget(5)
 def session_detail(request, session_id):
-    """GET /api/v1/sessions/<uuid>/ — retrieve session + steps as JSON."""
+    """
+    GET /api/v1/sessions/<uuid>/ — retrieve session + steps as JSON.
+    With ``Accept: application/x-ndjson`` or ``?stream=1`` the session is
+    streamed as NDJSON instead (see _session_to_ndjson). Supports
+    conditional GETs (see core.etags).
+    """
     try:
         session = Session.objects.get(id=session_id, user=request.api_user)
     except Session.DoesNotExist:
         return JsonResponse({'error': 'Session not found'}, status=404)
 
+    if _wants_stream(request):
+        return _session_to_ndjson(session)
     return _session_to_json(session)
 
 
-def _session_to_json(session, status=200):
-    """Helper to serialize a Session with its steps."""
-    steps = list(session.steps.all().values(
-        'id', 'role', 'step_type', 'content', 'order', 'timestamp',
-    ))
+@require_GET
+@require_api_auth
+@query_budget(5)
+def search_steps(request):
+    """
+    GET /api/v1/search/?q=...&limit=20
+    Full-text search over the user's steps, best match first. Snippets are
+    HTML-escaped with matches wrapped in <mark>.
+    """
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'error': 'q is required'}, status=400)
+    try:
+        limit = int(request.GET.get('limit', search.DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+
+    results = search.search_steps(query, request.api_user, limit=limit)
+    return JsonResponse({
+        'query': query,
+        'results': [
+            {
+                'step_id': result['step'].id,
+                'session_id': str(result['session'].id),
+                'session_title': result['session'].title,
+                'role': result['step'].role,
+                'step_type': result['step'].step_type,
+                'order': result['step'].order,
+                'snippet': result['snippet'],
+                'rank': result['rank'],
+            }
+            for result in results
+        ],
+    })
+
+
+@require_GET
+@require_api_auth
+@query_budget(2)
+def job_detail(request, job_id):
+    """GET /api/v1/jobs/<uuid>/ — poll a queued upload until its session is ready."""
+    try:
+        job = IngestionJob.objects.get(id=job_id, user=request.api_user)
+    except IngestionJob.DoesNotExist:
+        return JsonResponse({'error': 'Job not found'}, status=404)
+
+    return _job_to_json(job)
+
+
+def _job_to_json(job, status=200):
+    """Helper to serialize an IngestionJob."""
     return JsonResponse({
+        'job_id': str(job.id),
+        'status': job.status,
+        'session_id': str(job.session_id) if job.session_id else None,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'status_url': reverse('api:job_detail', args=[job.id]),
+    }, status=status)
+
+
+# Step columns returned by the session endpoints; blob__* are folded into
+# content by _resolve_blob
+STEP_FIELDS = (
+    'id', 'role', 'step_type', 'content', 'order', 'timestamp',
+    'blob__codec', 'blob__data',
+)
+
+# Steps fetched from the database per round trip when streaming a session
+STREAM_CHUNK_SIZE = 500
+
+
+def _session_meta(session):
+    return {
         'id': str(session.id),
         'title': session.title,
         'source': session.source,
@@ -327,5 +986,47 @@ def _session_to_json(session, status=200):
         'duration_seconds': session.duration_seconds,
         'token_usage': session.token_usage,
         'file_count': session.file_count,
-        'steps': steps,
-    }, status=status)
+    }
+
+
+def _session_to_json(session, status=200):
+    """Helper to serialize a Session with its steps."""
+    steps = list(session.steps.all().values(*STEP_FIELDS))
+    for step in steps:
+        _resolve_blob(step)
+    return JsonResponse({**_session_meta(session), 'steps': steps}, status=status)
+
+
+def _wants_stream(request):
+    return (
+        request.GET.get('stream') in ('1', 'true')
+        or 'application/x-ndjson' in request.META.get('HTTP_ACCEPT', '')
+    )
+
+
+def _session_to_ndjson(session):
+    """
+    Stream a Session as NDJSON: the session fields (with ``step_count``) on
+    the first line, then one step per line in order. Steps are read from
+    the database in chunks, so memory use does not grow with session size.
+    """
+    def lines():
+        yield _ndjson_line({**_session_meta(session), 'step_count': session.step_count})
+        steps = session.steps.all().values(*STEP_FIELDS).iterator(chunk_size=STREAM_CHUNK_SIZE)
+        for step in steps:
+            yield _ndjson_line(_resolve_blob(step))
+
+    return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+
+
+def _ndjson_line(obj):
+    return json.dumps(obj, cls=DjangoJSONEncoder).encode('utf-8') + b'\n'
+
+
+def _resolve_blob(step):
+    """Replace a step dict's content preview with the full out-of-line body."""
+    codec = step.pop('blob__codec')
+    data = step.pop('blob__data')
+    if codec is not None:
+        step['content'] = decompress(codec, data)
+    return step
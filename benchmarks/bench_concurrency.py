@@ -0,0 +1,232 @@
+"""
+SQLite concurrency benchmark: N parallel CLI pushers plus one reader.
+
+Each pusher is its own process (like separate web workers) posting
+--sessions sessions of --steps steps to POST /api/v1/sessions/, while a
+reader process keeps listing sessions and --slow-uploaders processes send
+resumable-upload chunks over a slow connection (each chunk's body takes
+--chunk-seconds to arrive). No transaction may wait on those bodies, or
+the pushers queue behind them. Runs against a throwaway on-disk database
+twice:
+
+  default  rollback journal, deferred transactions, 5s busy timeout and
+           no write lock (Django's SQLite defaults)
+  tuned    agextract.database.SQLITE_OPTIONS (WAL, synchronous=NORMAL,
+           mmap, IMMEDIATE transactions, 20s timeout) and core.writelock
+
+and reports pushes/s, failed pushes ("database is locked"), reader
+latency and uploaded chunks.
+
+Usage:
+    python benchmarks/bench_concurrency.py [--pushers 8] [--sessions 25] [--steps 200]
+        [--slow-uploaders 2] [--chunk-seconds 2]
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {
+    'default': {
+        'options': {'init_command': 'PRAGMA journal_mode=DELETE', 'transaction_mode': 'DEFERRED', 'timeout': 5},
+        'write_lock': False,
+    },
+    'tuned': {'options': {}, 'write_lock': True},
+}
+
+
+def setup_django(mode):
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agextract.settings')
+    import django
+
+    django.setup()
+    from django.conf import settings
+    settings.AGEXTRACT_SQLITE_WRITE_LOCK = MODES[mode]['write_lock']
+
+
+def prepare():
+    """Migrate the database and print an access token for the workers."""
+    from datetime import timedelta
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.utils import timezone
+
+    from api.models import APIToken
+
+    call_command('migrate', verbosity=0)
+    user = User.objects.create_user('bench')
+    token = APIToken.objects.create(user=user, expires_at=timezone.now() + timedelta(days=1))
+    print(token.access_token)
+
+
+def push(worker, token, sessions, steps, start_at):
+    from django.test import Client
+
+    client = Client(raise_request_exception=False, HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Bearer {token}')
+    time.sleep(max(0, start_at - time.time()))
+    ok = failed = 0
+    for i in range(sessions):
+        body = {
+            'title': f'worker {worker} session {i}',
+            'source': 'claudecode',
+            'source_session_id': f'{worker}-{i}',
+            'steps': [
+                {'role': 'user' if n % 2 == 0 else 'agent', 'content': f'step {n} of {worker}/{i}', 'order': n + 1}
+                for n in range(steps)
+            ],
+        }
+        response = client.post('/api/v1/sessions/', json.dumps(body), content_type='application/json')
+        if response.status_code == 201:
+            ok += 1
+        else:
+            failed += 1
+    return {'ok': ok, 'failed': failed}
+
+
+class SlowBody(io.BytesIO):
+    """A request body trickling in over ``seconds``."""
+    READS = 16
+
+    def __init__(self, data, seconds):
+        super().__init__(data)
+        self.read_size = max(1, len(data) // self.READS)
+        self.delay = seconds / self.READS
+
+    def read(self, size=-1):
+        time.sleep(self.delay)
+        return super().read(self.read_size)
+
+
+def upload_slowly(chunk_seconds, start_at, stop_file):
+    from django.conf import settings
+    from django.contrib.auth.models import User
+
+    from core import uploads
+
+    settings.AGEXTRACT_SPOOL_DIR = os.path.join(os.path.dirname(stop_file), 'spool')
+    user = User.objects.get(username='bench')
+    upload = uploads.create_upload(title='slow upload', user=user)
+    time.sleep(max(0, start_at - time.time()))
+    ok = failed = 0
+    data = b'{"type": "user", "message": {"content": "slow"}}\n' * 2000
+    digest = hashlib.sha256(data).hexdigest()
+    while not os.path.exists(stop_file):
+        try:
+            upload = uploads.write_chunk(upload, ok, SlowBody(data, chunk_seconds), digest)
+            ok += 1
+        except Exception:
+            failed += 1
+    return {'ok': ok, 'failed': failed}
+
+
+def read(token, start_at, stop_file):
+    from django.test import Client
+
+    client = Client(raise_request_exception=False, HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Bearer {token}')
+    time.sleep(max(0, start_at - time.time()))
+    latencies = []
+    failed = 0
+    while not os.path.exists(stop_file):
+        start = time.perf_counter()
+        response = client.get('/api/v1/sessions/', {'limit': 50})
+        latencies.append(time.perf_counter() - start)
+        failed += response.status_code != 200
+    latencies.sort()
+    return {
+        'reads': len(latencies), 'failed': failed,
+        'p50': latencies[len(latencies) // 2] if latencies else 0,
+        'max': latencies[-1] if latencies else 0,
+    }
+
+
+def run_mode(mode, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        if MODES[mode]['options']:
+            url += '?' + urlencode(MODES[mode]['options'])
+        env = {**os.environ, 'DATABASE_URL': url}
+        script = [sys.executable, os.path.abspath(__file__), '--mode', mode]
+
+        token = subprocess.run(script + ['--role', 'prepare'], env=env, check=True,
+                               capture_output=True, text=True).stdout.split()[-1]
+        start_at = time.time() + 2
+        stop_file = os.path.join(tmp, 'stop')
+        common = ['--token', token, '--start-at', str(start_at)]
+        pushers = [
+            subprocess.Popen(script + common + ['--role', 'push', '--worker', str(w),
+                                                '--sessions', str(args.sessions), '--steps', str(args.steps)],
+                             env=env, stdout=subprocess.PIPE, text=True)
+            for w in range(args.pushers)
+        ]
+        reader = subprocess.Popen(script + common + ['--role', 'read', '--stop-file', stop_file],
+                                  env=env, stdout=subprocess.PIPE, text=True)
+        uploaders = [
+            subprocess.Popen(script + common + ['--role', 'upload', '--stop-file', stop_file,
+                                                '--chunk-seconds', str(args.chunk_seconds)],
+                             env=env, stdout=subprocess.PIPE, text=True)
+            for _ in range(args.slow_uploaders)
+        ]
+
+        results = [json.loads(p.communicate()[0].splitlines()[-1]) for p in pushers]
+        elapsed = time.time() - start_at
+        open(stop_file, 'w').close()
+        reads = json.loads(reader.communicate()[0].splitlines()[-1])
+        chunks = [json.loads(p.communicate()[0].splitlines()[-1]) for p in uploaders]
+
+    ok = sum(r['ok'] for r in results)
+    failed = sum(r['failed'] for r in results)
+    print(
+        f"{mode:>8}: {ok} pushes ok, {failed} failed in {elapsed:.1f}s ({ok / elapsed:.1f} pushes/s); "
+        f"reader {reads['reads']} lists, {reads['failed']} failed, "
+        f"p50 {reads['p50'] * 1000:.0f}ms, max {reads['max'] * 1000:.0f}ms; "
+        f"{sum(c['ok'] for c in chunks)} slow chunks ok, {sum(c['failed'] for c in chunks)} failed"
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument('--pushers', type=int, default=8)
+    arg_parser.add_argument('--sessions', type=int, default=25)
+    arg_parser.add_argument('--steps', type=int, default=200)
+    arg_parser.add_argument('--slow-uploaders', type=int, default=2)
+    arg_parser.add_argument('--chunk-seconds', type=float, default=2.0)
+    # Internal: the worker processes
+    arg_parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    arg_parser.add_argument('--role', choices=('prepare', 'push', 'read', 'upload'), help=argparse.SUPPRESS)
+    arg_parser.add_argument('--token', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    arg_parser.add_argument('--start-at', type=float, help=argparse.SUPPRESS)
+    arg_parser.add_argument('--stop-file', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.role is None:
+        print(
+            f"{args.pushers} pushers x {args.sessions} sessions x {args.steps} steps, 1 reader, "
+            f"{args.slow_uploaders} uploaders at {args.chunk_seconds}s per chunk"
+        )
+        for mode in MODES:
+            run_mode(mode, args)
+        return
+
+    setup_django(args.mode)
+    if args.role == 'prepare':
+        prepare()
+    elif args.role == 'upload':
+        print(json.dumps(upload_slowly(args.chunk_seconds, args.start_at, args.stop_file)))
+    elif args.role == 'push':
+        print(json.dumps(push(args.worker, args.token, args.sessions, args.steps, args.start_at)))
+    else:
+        print(json.dumps(read(args.token, args.start_at, args.stop_file)))
+
+
+if __name__ == '__main__':
+    main()
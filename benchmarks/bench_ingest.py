@@ -0,0 +1,87 @@
+"""
+Ingest-rate benchmark: per-row Step INSERTs vs. batched StepWriter.
+
+Generates a synthetic Claude Code JSONL transcript and persists it twice
+into a throwaway on-disk SQLite database:
+
+  per-row  one autocommitted Step.objects.create() per step (the old path)
+  batched  TranscriptParser.parse(), i.e. bulk_create inside one transaction
+
+Usage:
+    python benchmarks/bench_ingest.py [--steps 50000] [--batch-size 1000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agextract.settings')
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+
+from core.models import Session, Step
+from core.parser import TranscriptParser
+
+
+def synthetic_transcript(steps):
+    lines = []
+    for i in range(steps):
+        if i % 2 == 0:
+            entry = {'type': 'user', 'message': {'content': f'Prompt number {i}: please refactor module {i % 97}.'}}
+        else:
+            entry = {'type': 'assistant', 'message': {'content': [
+                {'type': 'text', 'text': f'Working on step {i}.'},
+                {'type': 'tool_use', 'name': 'Edit', 'input': {'path': f'src/mod_{i % 97}.py'}},
+            ]}}
+        lines.append(json.dumps(entry))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def bench_per_row(data):
+    session = Session.objects.create(title='per-row', file_count=1)
+    for step in TranscriptParser(data).iter_steps():
+        Step.objects.create(session=session, **step)
+    return session
+
+
+def bench_batched(data):
+    return TranscriptParser(data).parse(title='batched')
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument('--steps', type=int, default=50000)
+    arg_parser.add_argument('--batch-size', type=int, default=None)
+    args = arg_parser.parse_args()
+    if args.batch_size:
+        settings.AGEXTRACT_STEP_BATCH_SIZE = args.batch_size
+
+    data = synthetic_transcript(args.steps)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tmp, 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            results = {}
+            for name, fn in (('per-row', bench_per_row), ('batched', bench_batched)):
+                start = time.perf_counter()
+                session = fn(data)
+                elapsed = time.perf_counter() - start
+                count = session.steps.count()
+                results[name] = elapsed
+                print(f"{name:>8}: {count} steps in {elapsed:.2f}s ({count / elapsed:,.0f} steps/s)")
+            print(f" speedup: {results['per-row'] / results['batched']:.1f}x")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+JSONL decoding benchmark: ClaudeCodeParser with each installed JSON backend.
+
+Builds a Claude Code log of about --mb megabytes: prompts, replies, tool
+calls whose inputs are small commands or whole files being written (the
+case where rendering used to encode megabytes to keep 500 characters), and
+tool results. Each backend parses it without touching the database.
+
+Usage:
+    python benchmarks/bench_jsonl.py [--mb 100]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agextract.settings')
+
+import django
+
+django.setup()
+
+from django.test import override_settings
+
+from core.parser import ClaudeCodeParser, iter_lines
+from core.parser.jsoncodec import BACKENDS, _LOADS
+
+
+def entry(kind, content, n):
+    message = {'id': f'msg_{n}', 'role': kind, 'content': content}
+    if kind == 'assistant':
+        message['usage'] = {'input_tokens': 1200, 'output_tokens': 300, 'cache_read_input_tokens': 9000}
+    return json.dumps({
+        'type': kind, 'sessionId': 'bench', 'timestamp': f'2025-06-01T09:{n // 60 % 60:02d}:{n % 60:02d}.000Z',
+        'message': message,
+    })
+
+
+def build_log(size):
+    source = ('def handler(request):\n    return JsonResponse({"ok": True})\n' * 1500)
+    lines = []
+    total = 0
+    n = 0
+    while total < size:
+        batch = [
+            entry('user', 'Add a health check endpoint and a test for it.', n),
+            entry('assistant', [{'type': 'text', 'text': "I'll look at the URL configuration first. " * 8}], n),
+            entry('assistant', [{'type': 'tool_use', 'id': f't{n}', 'name': 'Bash',
+                                 'input': {'command': 'grep -rn healthz .', 'description': 'Find routes'}}], n),
+            entry('user', [{'type': 'tool_result', 'tool_use_id': f't{n}', 'content': 'urls.py:12: path(...)\n' * 40}], n),
+            entry('assistant', [{'type': 'tool_use', 'id': f'w{n}', 'name': 'Write',
+                                 'input': {'file_path': 'app/views.py', 'content': source}}], n),
+        ]
+        lines.extend(batch)
+        total += sum(len(line) + 1 for line in batch)
+        n += 1
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument('--mb', type=int, default=100)
+    args = arg_parser.parse_args()
+
+    data = build_log(args.mb * 1024 * 1024)
+    print(f"{len(data) / 1e6:.0f} MB Claude Code log")
+    results = {}
+    for name in BACKENDS:
+        if name not in _LOADS:
+            print(f"{name:>8}: not installed")
+            continue
+        with override_settings(AGEXTRACT_JSON_BACKEND=name):
+            gc.collect()
+            start = time.perf_counter()
+            count = sum(1 for _ in ClaudeCodeParser().iter_steps(iter_lines(data)))
+            results[name] = time.perf_counter() - start
+        print(f"{name:>8}: {count} steps in {results[name]:.2f}s ({len(data) / results[name] / 1e6:.1f} MB/s)")
+    for name, elapsed in results.items():
+        if name != 'json':
+            print(f"{name:>8} speedup over json: {results['json'] / elapsed:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Markdown parsing benchmark: the old line-by-line engine vs. the block engine.
+
+Repeats s.md (a Windsurf export) until the transcript is --mb megabytes and
+counts the steps produced by:
+
+  legacy    re.match() with two patterns per line, steps joined from lines
+            (the engine before core.parser.markdown)
+  markdown  MarkdownParser: one MARKER_RE.finditer() per 1 MB text block,
+            step bodies sliced out of the block
+  sniffed   TranscriptParser.iter_steps(), i.e. what an upload of s.md uses
+            (the Windsurf parser, also block based)
+
+Usage:
+    python benchmarks/bench_markdown.py [--mb 100]
+"""
+import argparse
+import gc
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agextract.settings')
+
+import django
+
+django.setup()
+
+from core.parser import MarkdownParser, TranscriptParser, iter_lines, iter_text_blocks
+from core.parser.base import build_step
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 's.md')
+
+
+def legacy_steps(data):
+    current_role = None
+    current_buffer = []
+    step_counter = 1
+    for line in iter_lines(data):
+        line_stripped = line.strip()
+        user_match = re.match(r'^\s*(#+\s*)?(User|Human)(\s*Input)?:?', line, re.IGNORECASE)
+        agent_match = re.match(r'^\s*(#+\s*)?(Agent|Assistant|AI):?', line, re.IGNORECASE)
+        is_tool_line = line_stripped.startswith('*') and line_stripped.endswith('*') and len(line_stripped) > 2
+        if user_match or agent_match:
+            if current_role and current_buffer:
+                content = '\n'.join(current_buffer).strip()
+                if content:
+                    yield build_step(current_role, content, step_counter)
+                    step_counter += 1
+                current_buffer = []
+            current_role = 'user' if user_match else 'agent'
+        elif is_tool_line:
+            if current_role and current_buffer:
+                content = '\n'.join(current_buffer).strip()
+                if content:
+                    yield build_step(current_role, content, step_counter)
+                    step_counter += 1
+                current_buffer = []
+            yield build_step('agent', line_stripped, step_counter)
+            step_counter += 1
+            current_role = 'agent'
+        else:
+            current_buffer.append(line)
+    if current_role and current_buffer:
+        content = '\n'.join(current_buffer).strip()
+        if content:
+            yield build_step(current_role, content, step_counter)
+
+
+def markdown_steps(data):
+    return MarkdownParser().iter_block_steps(iter_text_blocks(data))
+
+
+def sniffed_steps(data):
+    return TranscriptParser(data).iter_steps()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument('--mb', type=int, default=100)
+    args = arg_parser.parse_args()
+
+    with open(SAMPLE, 'rb') as f:
+        sample = f.read()
+    data = sample * (args.mb * 1024 * 1024 // len(sample) + 1)
+    print(f"s.md x {len(data) // len(sample)}: {len(data) / 1e6:.0f} MB")
+
+    results = {}
+    for name, fn in (('legacy', legacy_steps), ('markdown', markdown_steps), ('sniffed', sniffed_steps)):
+        gc.collect()
+        start = time.perf_counter()
+        count = sum(1 for _ in fn(data))
+        elapsed = time.perf_counter() - start
+        results[name] = elapsed
+        print(f"{name:>8}: {count} steps in {elapsed:.2f}s ({len(data) / elapsed / 1e6:.1f} MB/s)")
+    for name in ('markdown', 'sniffed'):
+        print(f"{name:>8} speedup: {results['legacy'] / results[name]:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
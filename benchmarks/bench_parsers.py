@@ -0,0 +1,79 @@
+"""
+Parser throughput benchmark: steps/s and MB/s for every registered source
+parser, plus the generic markdown fallback on the markdown fixtures.
+
+Each fixture in core/testdata/ is repeated until the transcript holds
+--copies conversations, then streamed through the parser without touching
+the database. With --min-steps-per-second the run fails (exit status 1)
+if any parser is slower; 5000 is far below what every parser does on a
+laptop (>50k/s), so it only trips on a quadratic or per-line regression.
+
+Usage:
+    python benchmarks/bench_parsers.py [--copies 5000] [--min-steps-per-second 5000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agextract.settings')
+
+import django
+
+django.setup()
+
+from core.parser import MarkdownParser, TranscriptParser, iter_lines
+
+TESTDATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core', 'testdata')
+
+
+def scaled_fixture(name, copies):
+    with open(os.path.join(TESTDATA, name), 'rb') as f:
+        data = f.read()
+    if name.endswith('.json'):
+        doc = json.loads(data)
+        doc['requests'] = doc['requests'] * copies
+        return json.dumps(doc).encode('utf-8')
+    return data * copies
+
+
+def report(label, data, count, elapsed):
+    print(
+        f"{label:>22}: {count} steps in {elapsed:.2f}s "
+        f"({count / elapsed:,.0f} steps/s, {len(data) / elapsed / 1e6:.1f} MB/s)"
+    )
+    return count / elapsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument('--copies', type=int, default=5000)
+    arg_parser.add_argument('--min-steps-per-second', type=float, default=None)
+    args = arg_parser.parse_args()
+
+    slow = []
+
+    for name in sorted(os.listdir(TESTDATA)):
+        data = scaled_fixture(name, args.copies)
+
+        start = time.perf_counter()
+        parser = TranscriptParser(data)
+        count = sum(1 for _ in parser.iter_steps())
+        label = f"{name} ({parser.parser.source})"
+        if report(label, data, count, time.perf_counter() - start) < (args.min_steps_per_second or 0):
+            slow.append(label)
+
+        if name.endswith('.md'):
+            start = time.perf_counter()
+            count = sum(1 for _ in MarkdownParser().iter_steps(iter_lines(data)))
+            report(f"{name} (generic)", data, count, time.perf_counter() - start)
+
+    if slow:
+        print(f"below {args.min_steps_per_second:,.0f} steps/s: {', '.join(slow)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
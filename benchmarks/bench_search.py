@@ -0,0 +1,124 @@
+"""
+Search latency benchmark: FTS5 search vs. an icontains table scan.
+
+Fills a throwaway on-disk SQLite database with synthetic steps spread over
+several users, then times core.search.search_steps() against the substring
+scan it replaces. Words follow a Zipf distribution like natural text, so
+the queries cover very common, mid-frequency and rare terms. Every
+--large-every'th step is long enough to be offloaded to a blob; the on-disk
+size of the index is reported next to the steps and blobs it covers.
+
+Usage:
+    python benchmarks/bench_search.py [--steps 1000000] [--users 20] [--large-every 50]
+        [--rank-window 1000|all]
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agextract.settings')
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+
+from core.ingest import StepWriter
+from core.models import Session, Step
+from core.search import search_steps
+
+WORDS = (
+    "refactor module parser test fixture migrate database index query cache "
+    "render template session upload token websocket reconnect retry timeout "
+    "error traceback import function class method variable config settings "
+    "deploy docker build lint format commit branch merge review diff patch"
+).split()
+VOCABULARY = WORDS + [f"sym{i}" for i in range(20000)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+QUERIES = ["refactor", "websocket reconnect", "sym500", "sym15000", "sym150*", "zebra"]
+
+
+def populate(steps, users, large_every, steps_per_session=500):
+    rng = random.Random(42)
+    # Sample one long token stream up front and slice step bodies from it
+    tokens = rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=1000000)
+    owners = [User.objects.create(username=f'user{i}') for i in range(users)]
+    with StepWriter() as writer:
+        for start in range(0, steps, steps_per_session):
+            session = Session.objects.create(title=f'session {start}', user=owners[start // steps_per_session % users])
+            writer.add_session(session)
+            for order in range(min(steps_per_session, steps - start)):
+                offset = rng.randrange(len(tokens) - 60)
+                content = ' '.join(tokens[offset:offset + rng.randint(8, 60)])
+                if large_every and order % large_every == 0:
+                    content = ' '.join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=2000))
+                writer.add(session, role='agent', step_type='text', content=content, order=order)
+    return owners[0]
+
+
+def table_bytes(pattern):
+    """Bytes of the pages of the tables matching a GLOB pattern and their indexes."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+            "(SELECT name FROM sqlite_master WHERE tbl_name GLOB %s)",
+            [pattern],
+        )
+        return cursor.fetchone()[0] or 0
+
+
+def timed(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument('--steps', type=int, default=1000000)
+    arg_parser.add_argument('--users', type=int, default=20)
+    arg_parser.add_argument('--large-every', type=int, default=50)
+    arg_parser.add_argument('--rank-window', default=None, help="matches ranked per query, or 'all'")
+    args = arg_parser.parse_args()
+    if args.rank_window is not None:
+        settings.AGEXTRACT_SEARCH_RANK_WINDOW = None if args.rank_window == 'all' else int(args.rank_window)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tmp, 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            start = time.perf_counter()
+            user = populate(args.steps, args.users, args.large_every)
+            print(f"indexed {args.steps} steps in {time.perf_counter() - start:.1f}s")
+            print(
+                f"size: index {table_bytes('core_step_fts*') / 1e6:.1f} MB, "
+                f"steps {table_bytes('core_step') / 1e6:.1f} MB, "
+                f"blobs {table_bytes('core_stepblob') / 1e6:.1f} MB"
+            )
+
+            for query in QUERIES:
+                fts, results = timed(lambda: search_steps(query, user))
+                term = query.split()[0].rstrip('*')
+                scan, _ = timed(lambda: list(
+                    Step.objects.filter(session__user=user, content__icontains=term)[:20]
+                ), repeat=1)
+                print(f"{query!r:>22}: fts {fts * 1000:7.1f} ms ({len(results)} hits)   scan {scan * 1000:7.1f} ms")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Content-addressed storage for large step bodies.
+
+Step bodies longer than AGEXTRACT_STEP_INLINE_MAX_CHARS are stored once in
+a StepBlob keyed by the SHA-256 of their text, and their Step rows keep
+only the first AGEXTRACT_STEP_PREVIEW_CHARS characters in ``content``. Blobs are compressed with zstd when the optional
+``zstandard`` package is installed and zlib otherwise (or as configured by
+AGEXTRACT_BLOB_CODEC).
+"""
+import hashlib
+import zlib
+
+from django.conf import settings
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+# Steps longer than this are offloaded to a blob
+DEFAULT_INLINE_MAX_CHARS = 4000
+# and keep a preview of this many characters inline. Templates truncate
+# bodies to at most 3000 characters, so previews render exactly like the
+# full content.
+DEFAULT_PREVIEW_CHARS = 3000
+
+
+def inline_max_chars():
+    return getattr(settings, 'AGEXTRACT_STEP_INLINE_MAX_CHARS', DEFAULT_INLINE_MAX_CHARS)
+
+
+def preview_chars():
+    """Length of an offloaded step's inline preview; never above inline_max_chars()."""
+    preview = getattr(settings, 'AGEXTRACT_STEP_PREVIEW_CHARS', DEFAULT_PREVIEW_CHARS)
+    return min(preview, inline_max_chars())
+
+
+def default_codec():
+    codec = getattr(settings, 'AGEXTRACT_BLOB_CODEC', None)
+    if codec is None:
+        codec = 'zstd' if zstandard is not None else 'zlib'
+    if codec == 'zstd' and zstandard is None:
+        raise RuntimeError("AGEXTRACT_BLOB_CODEC is 'zstd' but the zstandard package is not installed")
+    return codec
+
+
+def compress(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor().compress(data)
+    if codec == 'zlib':
+        return zlib.compress(data)
+    return data
+
+
+def decompress(codec, data):
+    """Return the text stored in a blob's ``data``."""
+    data = bytes(data)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("This blob is zstd-compressed but the zstandard package is not installed")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == 'zlib':
+        data = zlib.decompress(data)
+    return data.decode('utf-8')
+
+
+def content_hash(raw):
+    return hashlib.sha256(raw).hexdigest()
+
+
+def make_blob(raw, digest=None):
+    """Build an unsaved StepBlob holding the UTF-8 bytes ``raw``."""
+    from .models import StepBlob
+
+    codec = default_codec()
+    return StepBlob(
+        hash=digest or content_hash(raw),
+        codec=codec,
+        size=len(raw),
+        data=compress(raw, codec),
+    )
@@ -0,0 +1,148 @@
+"""
+Decompression of gzip- and zstd-encoded uploads.
+
+Transcripts compress 10-20x, so clients may send them compressed. The
+decoded stream is read incrementally, never buffered whole, and reading
+more than AGEXTRACT_MAX_DECOMPRESSED_BYTES raises DecompressedTooLarge,
+which guards against decompression bombs. zstd needs the optional
+``zstandard`` package (see core.blobs).
+
+Content hashes are always taken over the decoded bytes, so dedup does not
+depend on whether or how a payload was compressed.
+"""
+import gzip
+import zlib
+
+from django.conf import settings
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+DEFAULT_MAX_DECOMPRESSED_BYTES = 512 * 1024 * 1024
+
+# Leading bytes of each supported format, for sniffing uploaded files
+MAGIC = {
+    'gzip': b'\x1f\x8b',
+    'zstd': b'\x28\xb5\x2f\xfd',
+}
+SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+class DecompressionError(ValueError):
+    """The payload is not valid data in its declared encoding."""
+
+
+class UnsupportedEncoding(DecompressionError):
+    pass
+
+
+class DecompressedTooLarge(DecompressionError):
+    pass
+
+
+def supported_encodings():
+    return ['gzip', 'zstd'] if zstandard is not None else ['gzip']
+
+
+def max_decompressed_bytes():
+    return getattr(settings, 'AGEXTRACT_MAX_DECOMPRESSED_BYTES', DEFAULT_MAX_DECOMPRESSED_BYTES)
+
+
+def request_encoding(request):
+    """
+    The request's Content-Encoding, or None for an unencoded body. Raises
+    UnsupportedEncoding for anything other than gzip or (if available) zstd.
+    """
+    encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+    if encoding in ('', 'identity'):
+        return None
+    if encoding == 'x-gzip':
+        encoding = 'gzip'
+    if encoding not in supported_encodings():
+        raise UnsupportedEncoding(f"Unsupported Content-Encoding: {encoding}")
+    return encoding
+
+
+def sniff_encoding(uploaded_file):
+    """Detect a compressed upload from its magic bytes, and rewind it."""
+    head = uploaded_file.read(4)
+    uploaded_file.seek(0)
+    for encoding, magic in MAGIC.items():
+        if head.startswith(magic):
+            if encoding not in supported_encodings():
+                raise UnsupportedEncoding(f"{encoding} uploads need the zstandard package")
+            return encoding
+    return None
+
+
+def read_all(source, encoding):
+    """Decode a whole (bounded) payload into bytes."""
+    reader = DecompressingReader(source, encoding)
+    return b''.join(iter(lambda: reader.read(64 * 1024), b''))
+
+
+class DecompressingReader:
+    """
+    Read-only binary file object over the decoded contents of ``source``.
+
+    ``size`` is the number of decoded bytes seen so far, so it is the full
+    decoded size only once the stream has been read to the end (see
+    jobs.should_queue_stream). Seeking back to the start re-reads
+    ``source`` from the beginning when it is seekable.
+    """
+
+    def __init__(self, source, encoding, name=None, limit=None):
+        self.source = source
+        self.encoding = encoding
+        self.limit = max_decompressed_bytes() if limit is None else limit
+        self.name = name if name is not None else _strip_suffix(getattr(source, 'name', ''), encoding)
+        self.size = 0
+        self._open()
+
+    def _open(self):
+        if self.encoding == 'gzip':
+            self._reader = gzip.GzipFile(fileobj=self.source, mode='rb')
+        elif self.encoding == 'zstd':
+            self._reader = zstandard.ZstdDecompressor().stream_reader(self.source, read_across_frames=True)
+        else:
+            raise UnsupportedEncoding(f"Unsupported encoding: {self.encoding}")
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return b''.join(iter(lambda: self.read(64 * 1024), b''))
+        try:
+            data = self._reader.read(size)
+        except (OSError, EOFError, zlib.error) as exc:
+            raise DecompressionError(f"Invalid {self.encoding} data: {exc}") from exc
+        except Exception as exc:
+            if zstandard is not None and isinstance(exc, zstandard.ZstdError):
+                raise DecompressionError(f"Invalid {self.encoding} data: {exc}") from exc
+            raise
+        self._position += len(data)
+        if self.limit is not None and self._position > self.limit:
+            raise DecompressedTooLarge(f"Decompressed payload exceeds {self.limit} bytes")
+        self.size = max(self.size, self._position)
+        return data
+
+    def seek(self, offset, whence=0):
+        if (offset, whence) != (0, 0):
+            raise OSError("DecompressingReader can only seek to the start")
+        self.source.seek(0)
+        self._open()
+        return 0
+
+    def close(self):
+        self._reader.close()
+
+
+def _strip_suffix(name, encoding):
+    suffix = SUFFIXES.get(encoding, '')
+    if suffix and name.endswith(suffix):
+        return name[:-len(suffix)]
+    return name
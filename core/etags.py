@@ -0,0 +1,83 @@
+"""
+Validators for conditional GETs on sessions and profiles.
+
+Sessions are immutable once ingested except for tags and appended steps,
+which bump ``Session.version``; a session's ETag is its content hash plus
+that version. Profiles render from UserProfileStats, whose ``version`` is
+bumped on every rollup change. Both validators are computed from a single
+row, so a request with a matching If-None-Match is answered with a 304
+without touching the Step table.
+
+Views wire these up with django.views.decorators.http.condition.
+
+HTML pages also vary with the signed-in user (navigation, CSRF token), so
+their ETags include the viewer's id.
+"""
+from django.utils import timezone
+
+from .models import Session, UserProfileStats
+
+
+def _session_row(request, session_id):
+    """The session's validator fields, fetched once per request."""
+    cache = request.__dict__.setdefault('_etag_rows', {})
+    key = ('session', session_id)
+    if key not in cache:
+        sessions = Session.objects.filter(id=session_id)
+        api_user = getattr(request, 'api_user', None)
+        if api_user is not None:
+            sessions = sessions.filter(user=api_user)
+        cache[key] = sessions.values('content_hash', 'version', 'uploaded_at', 'modified_at').first()
+    return cache[key]
+
+
+def _profile_row(request, username):
+    cache = request.__dict__.setdefault('_etag_rows', {})
+    key = ('profile', username)
+    if key not in cache:
+        cache[key] = UserProfileStats.objects.filter(user__username=username).values(
+            'user_id', 'version', 'updated_at',
+        ).first()
+    return cache[key]
+
+
+def _viewer(request):
+    user = getattr(request, 'user', None)
+    return str(user.pk) if user is not None and user.is_authenticated else 'anon'
+
+
+def session_etag(request, session_id, representation):
+    """
+    ETag for one representation of a session ('json', 'ndjson', 'html').
+    HTML pages also include the viewer.
+    """
+    row = _session_row(request, session_id)
+    if row is None:
+        return None
+    if representation == 'html':
+        representation = f"html-{_viewer(request)}"
+    return f"{row['content_hash'] or session_id}-{row['version']}-{representation}"
+
+
+def session_last_modified(request, session_id):
+    row = _session_row(request, session_id)
+    if row is None:
+        return None
+    return row['modified_at'] or row['uploaded_at']
+
+
+def profile_etag(request, username):
+    """
+    ETag for a public profile. The activity heatmap is relative to today,
+    so the date is part of it too.
+    """
+    row = _profile_row(request, username)
+    if row is None:
+        return None
+    return f"u{row['user_id']}-{row['version']}-{timezone.localdate().isoformat()}-{_viewer(request)}"
+
+
+def profile_last_modified(request, username):
+    row = _profile_row(request, username)
+    return row['updated_at'] if row is not None else None
+
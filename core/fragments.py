@@ -0,0 +1,81 @@
+"""
+Cache of rendered session timeline pages.
+
+Rendering a page of the timeline (step_page.html, with its per-step
+branching, truncation and tag includes) is the bulk of the work behind
+session_detail and its infinite-scroll pages, and it only changes when the
+session does. Rendered pages are stored in the AGEXTRACT_FRAGMENT_CACHE
+cache alias, keyed on the session id, Session.version and the page cursor;
+anything that changes a session (tags, appended steps, hero moment) bumps
+its version, so stale pages are simply never looked up again and expire
+with the cache's TIMEOUT.
+
+The tag forms need the viewer's CSRF token, so pages are rendered with a
+placeholder that is swapped for the real token on every request.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CSRF_PLACEHOLDER = '__agextract_csrf_token__'
+
+# Bump when step_page.html (or a template it includes) changes
+TEMPLATE_VERSION = 1
+
+
+def page_size():
+    return getattr(settings, 'AGEXTRACT_TIMELINE_PAGE_SIZE', 50)
+
+
+def fragment_cache():
+    return caches[getattr(settings, 'AGEXTRACT_FRAGMENT_CACHE', 'default')]
+
+
+def timeline_page(session, after=None):
+    """
+    Return one page of a session's timeline and the cursor for the next.
+
+    Pages are keyset-paginated on (order, id) so every page costs the same
+    indexed range scan however deep into the session it is; ``after`` is
+    the (order, id) of the last step already shown.
+    """
+    size = page_size()
+    steps = session.steps.order_by('order', 'id')
+    if after is not None:
+        order, step_id = after
+        steps = steps.filter(Q(order__gt=order) | Q(order=order, id__gt=step_id))
+    steps = list(steps.prefetch_related('tags')[:size + 1])
+
+    next_cursor = None
+    if len(steps) > size:
+        steps = steps[:size]
+        next_cursor = (steps[-1].order, steps[-1].id)
+    return steps, next_cursor
+
+
+def _cache_key(session, after):
+    cursor = f"{after[0]}.{after[1]}" if after is not None else 'start'
+    return f"agextract:timeline:{TEMPLATE_VERSION}:{session.pk}:{session.version}:{page_size()}:{cursor}"
+
+
+def render_timeline_page(request, session, after=None):
+    """Return the rendered HTML of a timeline page and the next page's cursor."""
+    cache = fragment_cache()
+    key = _cache_key(session, after)
+    cached = cache.get(key)
+    if cached is None:
+        steps, next_cursor = timeline_page(session, after=after)
+        html = render_to_string('core/partials/step_page.html', {
+            'session': session,
+            'steps': steps,
+            'next_cursor': next_cursor,
+            'csrf_token': CSRF_PLACEHOLDER,
+        })
+        cached = (html, next_cursor)
+        cache.set(key, cached)
+
+    html, next_cursor = cached
+    return mark_safe(html.replace(CSRF_PLACEHOLDER, get_token(request))), next_cursor
@@ -0,0 +1,235 @@
+import pickle
+import tempfile
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import blobs, rollups
+from .models import Session, Step, StepBlob
+from .writelock import serialized_writes
+
+# Number of Step rows buffered before a bulk INSERT is issued.
+DEFAULT_STEP_BATCH_SIZE = 1000
+
+
+class SessionStats:
+    """
+    Running step statistics for one session, matching the denormalized
+    counters on Session. Starts from the session's stored values, so steps
+    appended later extend the existing counts and flow chart.
+
+    ``role_counts``/``step_type_counts`` only cover the steps added through
+    this object; they are the delta fed into the user's profile rollups.
+    """
+
+    FIELDS = [
+        'step_count', 'user_step_count', 'agent_step_count',
+        'tool_call_count', 'conversation_flow',
+    ]
+
+    def __init__(self, session):
+        self.session = session
+        self.step_count = session.step_count
+        self.user_step_count = session.user_step_count
+        self.agent_step_count = session.agent_step_count
+        self.tool_call_count = session.tool_call_count
+        self.conversation_flow = [list(chunk) for chunk in session.conversation_flow]
+        self.new = False
+        self.role_counts = Counter()
+        self.step_type_counts = Counter()
+
+    def add(self, role, step_type):
+        chunk_index = self.step_count // Session.FLOW_CHUNK_SIZE
+        if chunk_index == len(self.conversation_flow):
+            self.conversation_flow.append([0, 0, 0, 0])
+        chunk = self.conversation_flow[chunk_index]
+
+        self.step_count += 1
+        self.role_counts[role] += 1
+        self.step_type_counts[step_type] += 1
+        if role == 'user':
+            self.user_step_count += 1
+            chunk[0] += 1
+        elif role == 'agent':
+            self.agent_step_count += 1
+            if step_type != 'tool_call':
+                chunk[1] += 1
+        elif role == 'system':
+            chunk[3] += 1
+        if step_type == 'tool_call':
+            self.tool_call_count += 1
+            chunk[2] += 1
+
+    def apply(self):
+        """Copy the counters onto the Session instance (without saving)."""
+        for field in self.FIELDS:
+            setattr(self.session, field, getattr(self, field))
+        return self.session
+
+
+class StepWriter:
+    """
+    Buffers Step rows and writes them with ``bulk_create``.
+
+    Used as a context manager, the writer opens a single
+    ``transaction.atomic()`` block: everything created inside it (the
+    Session included) is committed together, and pending steps are flushed
+    on a clean exit. If the block raises, nothing is written.
+
+        with StepWriter() as writer:
+            session = Session.objects.create(title=title)
+            writer.add_session(session)
+            for step in steps:
+                writer.add(session, **step)
+
+    Steps can also be added before the block is entered, for sessions that
+    are saved inside it. Parsing then happens outside the transaction, and
+    on SQLite (IMMEDIATE transactions) without holding the database's write
+    lock. Full batches are spilled to a temporary file until the block
+    writes them:
+
+        session = Session(title=title)
+        writer = StepWriter()
+        writer.add_session(session)
+        for step in parse(transcript):
+            writer.add(session, **step)
+        with writer:
+            session.save()
+
+    On SQLite, writers take turns (see core.writelock) rather than contend
+    for the database's write lock.
+
+    Per-session statistics (see SessionStats) are accumulated as steps are
+    added and saved on the Session rows when the block exits, together with
+    the owners' profile rollups. Register new sessions with add_session()
+    so they are counted even if they have no steps.
+    """
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or getattr(
+            settings, 'AGEXTRACT_STEP_BATCH_SIZE', DEFAULT_STEP_BATCH_SIZE,
+        )
+        self.pending = []
+        self.pending_blobs = {}
+        self.inline_max_chars = blobs.inline_max_chars()
+        self.preview_chars = blobs.preview_chars()
+        self.written = 0
+        self.stats = {}
+        self._atomic = None
+        self._lock = None
+        # Batches added before the transaction opened
+        self._spill = None
+
+    def __enter__(self):
+        # On SQLite, wait for our turn to write before the transaction opens
+        self._lock = serialized_writes()
+        self._lock.__enter__()
+        self._atomic = transaction.atomic()
+        try:
+            self._atomic.__enter__()
+        except BaseException:
+            self._atomic = None
+            self._lock.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                try:
+                    self.flush()
+                    self.save_stats()
+                except BaseException as exc:
+                    self._atomic.__exit__(type(exc), exc, exc.__traceback__)
+                    raise
+            return self._atomic.__exit__(exc_type, exc_value, traceback)
+        finally:
+            self._atomic = None
+            self._lock.__exit__(None, None, None)
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+    def _stats_for(self, session):
+        stats = self.stats.get(session.pk)
+        if stats is None:
+            stats = self.stats[session.pk] = SessionStats(session)
+        return stats
+
+    def add_session(self, session):
+        """Register a newly created session."""
+        self._stats_for(session).new = True
+
+    def add(self, session, **fields):
+        """Queue a Step for ``session``; flushes once a full batch is buffered."""
+        content = fields.get('content') or ''
+        if '\x00' in content:
+            # PostgreSQL text columns cannot hold NUL; drop it on every backend
+            content = fields['content'] = content.replace('\x00', '')
+        if len(content) > self.inline_max_chars:
+            # Keep a preview inline and the full body in the blob store
+            raw = content.encode('utf-8')
+            digest = blobs.content_hash(raw)
+            if digest not in self.pending_blobs:
+                self.pending_blobs[digest] = blobs.make_blob(raw, digest)
+            fields['content'] = content[:self.preview_chars]
+            fields['blob_id'] = digest
+        self.pending.append(Step(session=session, **fields))
+        self._stats_for(session).add(fields.get('role'), fields.get('step_type'))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write all buffered steps in one bulk INSERT, or spill them to disk
+        when the transaction is not open yet.
+        """
+        if self._atomic is None:
+            self._spill_pending()
+            return
+        if self._spill is not None:
+            self._spill.seek(0)
+            while True:
+                try:
+                    steps, step_blobs = pickle.load(self._spill)
+                except EOFError:
+                    break
+                self._write(steps, step_blobs)
+            self._spill.close()
+            self._spill = None
+        self._write(self.pending, self.pending_blobs)
+        self.pending = []
+        self.pending_blobs = {}
+
+    def _spill_pending(self):
+        if not self.pending:
+            return
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile()
+        pickle.dump((self.pending, self.pending_blobs), self._spill)
+        self.pending = []
+        self.pending_blobs = {}
+
+    def _write(self, steps, step_blobs):
+        if not steps:
+            return
+        if step_blobs:
+            # Blobs are content-addressed: an existing row already holds the same text
+            StepBlob.objects.bulk_create(step_blobs.values(), ignore_conflicts=True)
+        Step.objects.bulk_create(steps, batch_size=self.batch_size)
+        self.written += len(steps)
+
+    def save_stats(self):
+        """Write the accumulated statistics to every session touched."""
+        sessions = [stats.apply() for stats in self.stats.values()]
+        if sessions:
+            Session.objects.bulk_update(sessions, SessionStats.FIELDS)
+            appended = [stats.session.pk for stats in self.stats.values() if not stats.new]
+            if appended:
+                Session.objects.filter(pk__in=appended).update(
+                    version=F('version') + 1, modified_at=timezone.now(),
+                )
+            rollups.record_ingest(self.stats.values())
@@ -0,0 +1,207 @@
+"""
+DB-polled ingestion queue.
+
+Large uploads are spooled to disk and recorded as IngestionJob rows; the
+``ingest_worker`` management command claims queued jobs one at a time and
+parses them outside the request cycle. No broker is needed: the jobs table
+is the queue, and claiming a job is a conditional UPDATE so several workers
+can poll the same database safely.
+"""
+import itertools
+import logging
+import os
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import IngestionJob
+from .parser import DuplicateContent, TranscriptParser, find_duplicate, iter_chunks
+
+logger = logging.getLogger(__name__)
+
+
+def get_spool_dir():
+    spool_dir = Path(getattr(settings, 'AGEXTRACT_SPOOL_DIR', settings.BASE_DIR / 'var' / 'spool'))
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    return spool_dir
+
+
+def inline_max_bytes():
+    return getattr(settings, 'AGEXTRACT_INLINE_UPLOAD_MAX_BYTES', None)
+
+
+def should_queue(uploaded_file):
+    """Uploads larger than AGEXTRACT_INLINE_UPLOAD_MAX_BYTES are parsed by the worker."""
+    limit = inline_max_bytes()
+    return limit is not None and uploaded_file.size > limit
+
+
+def should_queue_stream(stream):
+    """
+    should_queue() for a stream whose size is only known once it has been
+    read, such as a DecompressingReader. Reads (and keeps) at most
+    AGEXTRACT_INLINE_UPLOAD_MAX_BYTES plus one chunk of it and returns
+    (chunks, queue), where ``chunks`` replays the whole stream.
+    """
+    limit = inline_max_bytes()
+    chunks = iter_chunks(stream)
+    if limit is None:
+        return chunks, False
+    head = []
+    size = 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            break
+    return itertools.chain(head, chunks), size > limit
+
+
+def enqueue_upload(stream, *, title, user=None, source='upload', source_session_id='',
+                   spool_path=None):
+    """
+    Spool a HashingStream of the upload to disk, hashing it on the way, and
+    queue it for the ingest worker. If the upload already sits on local disk
+    at ``spool_path`` it is only read for its hash, and the job takes the
+    file over. Raises DuplicateContent, without queueing anything, if
+    ``user`` already has a session with the same content.
+    """
+    path = spool_path
+    if path is None:
+        path = get_spool_dir() / f"{uuid.uuid4().hex}.upload"
+        with open(path, 'wb') as out:
+            for chunk in iter_chunks(stream):
+                out.write(chunk)
+    content_hash = stream.hexdigest()
+
+    duplicate = find_duplicate(user.pk if user is not None else None, content_hash)
+    if duplicate is not None:
+        if spool_path is None:
+            os.remove(path)
+        raise DuplicateContent(duplicate)
+
+    return enqueue_spooled(
+        path, title=title, user=user, source=source,
+        source_session_id=source_session_id, content_hash=content_hash,
+    )
+
+
+def enqueue_spooled(spool_path, *, title, user=None, source='upload',
+                    source_session_id='', content_hash=''):
+    """Queue a file already on local disk; the job removes it once parsed."""
+    return IngestionJob.objects.create(
+        user=user,
+        title=title,
+        source=source,
+        source_session_id=source_session_id,
+        content_hash=content_hash,
+        spool_path=str(spool_path),
+    )
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to 'running' and return it, or
+    return None when the queue is empty.
+    """
+    while True:
+        job = IngestionJob.objects.filter(status='queued').order_by('created_at').first()
+        if job is None:
+            return None
+        claimed = IngestionJob.objects.filter(pk=job.pk, status='queued').update(
+            status='running', started_at=timezone.now(), attempts=F('attempts') + 1,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+        # Another worker won the race; try the next one
+
+
+def run_job(job):
+    """
+    Parse a claimed job's spooled upload into a Session. Failed jobs are
+    not retried, so the spooled upload is removed either way.
+
+    The job's ``attempts`` count when it was claimed is this run's lease.
+    A slow run may be requeued by requeue_stale_jobs() and claimed again;
+    only the run holding the latest claim records the outcome and removes
+    the spool file, and parse() re-checks for duplicates inside its write
+    transaction, so overlapping runs still save one Session. Anonymous
+    sessions are never deduplicated, so a run that loses its lease deletes
+    the anonymous session it saved instead.
+    """
+    lease = job.attempts
+    parsed = False
+    try:
+        # The same content may have landed while this job was waiting
+        session = find_duplicate(job.user_id, job.content_hash)
+        if session is None:
+            with open(job.spool_path, 'rb') as spooled:
+                session = TranscriptParser(spooled).parse(
+                    title=job.title,
+                    user_id=job.user_id,
+                    source=job.source,
+                    source_session_id=job.source_session_id,
+                    content_hash=job.content_hash,
+                )
+            parsed = True
+    except DuplicateContent as exc:
+        # An overlapping run of this job (or another upload) saved it first
+        session = exc.session
+    except Exception as exc:
+        logger.exception("Ingestion job %s failed", job.pk)
+        if finish_job(job, lease, status='failed', error=str(exc) or exc.__class__.__name__):
+            remove_spool(job)
+        return job
+
+    if finish_job(job, lease, status='done', session=session):
+        remove_spool(job)
+    elif parsed and session.user_id is None:
+        session.delete()
+    return job
+
+
+def finish_job(job, lease, **fields):
+    """
+    Record the outcome of the run that claimed ``job`` as attempt ``lease``.
+    Returns False, leaving the job to the newer run, if it has been claimed
+    again since.
+    """
+    fields['finished_at'] = timezone.now()
+    finished = IngestionJob.objects.filter(pk=job.pk, status='running', attempts=lease).update(**fields)
+    if not finished:
+        logger.warning("Ingestion job %s was claimed again; dropping the outcome of attempt %d", job.pk, lease)
+        job.refresh_from_db()
+        return False
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return True
+
+
+def remove_spool(job):
+    try:
+        os.remove(job.spool_path)
+    except OSError:
+        pass
+
+
+def requeue_stale_jobs(timeout):
+    """Put 'running' jobs whose worker died (started more than ``timeout`` seconds ago) back on the queue."""
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return IngestionJob.objects.filter(status='running', started_at__lt=cutoff).update(status='queued')
+
+
+def run_pending_jobs(limit=None):
+    """Process queued jobs until the queue is empty (or ``limit`` is reached)."""
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.models import StepBlob
+
+
+class Command(BaseCommand):
+    help = "Delete StepBlob rows that are no longer referenced by any step."
+
+    def handle(self, *args, **options):
+        deleted, _ = StepBlob.objects.filter(steps__isnull=True).delete()
+        self.stdout.write(f"Deleted {deleted} unreferenced blob(s)")
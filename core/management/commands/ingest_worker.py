@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import claim_next_job, requeue_stale_jobs, run_job
+from core.uploads import expire_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Process queued transcript uploads (IngestionJob rows) from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Drain the queue and exit instead of polling forever.",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help="Seconds to sleep when the queue is empty (default: 2).",
+        )
+        parser.add_argument(
+            '--stale-after', type=int, default=3600,
+            help="Requeue jobs left 'running' for longer than this many seconds (default: 3600).",
+        )
+        parser.add_argument(
+            '--upload-ttl', type=int, default=7 * 24 * 3600,
+            help="Delete resumable uploads untouched for this many seconds (default: 7 days).",
+        )
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(options['stale_after'])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+        expired = expire_stale_uploads(options['upload_ttl'])
+        if expired:
+            self.stdout.write(f"Deleted {expired} abandoned upload(s)")
+
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+
+            job = run_job(job)
+            if job.status == 'done':
+                self.stdout.write(self.style.SUCCESS(f"Job {job.pk} done → session {job.session_id}"))
+            elif job.status == 'failed':
+                self.stdout.write(self.style.ERROR(f"Job {job.pk} failed: {job.error}"))
+            else:
+                self.stdout.write(self.style.WARNING(f"Job {job.pk} was requeued; left to its newer run"))
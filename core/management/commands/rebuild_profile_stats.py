@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.rollups import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute UserProfileStats and UserDailyActivity rollups from the Session/Step tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help="Only rebuild these users (default: everyone).")
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        for user in users.iterator():
+            rebuild_user_stats(user)
+            self.stdout.write(f"Rebuilt profile stats for {user.username}")
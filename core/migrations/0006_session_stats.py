@@ -0,0 +1,79 @@
+# Generated by Django 6.0.2 on 2026-10-16 20:37
+
+from django.db import migrations, models
+
+FLOW_CHUNK_SIZE = 20
+
+
+def backfill_session_stats(apps, schema_editor):
+    Session = apps.get_model('core', 'Session')
+    Step = apps.get_model('core', 'Step')
+    SteeringTag = apps.get_model('core', 'SteeringTag')
+
+    for session in Session.objects.iterator():
+        steps = Step.objects.filter(session=session).order_by('order').values_list('role', 'step_type')
+        flow = []
+        for position, (role, step_type) in enumerate(steps.iterator()):
+            if position % FLOW_CHUNK_SIZE == 0:
+                flow.append([0, 0, 0, 0])
+            chunk = flow[-1]
+            session.step_count += 1
+            if role == 'user':
+                session.user_step_count += 1
+                chunk[0] += 1
+            elif role == 'agent':
+                session.agent_step_count += 1
+                if step_type != 'tool_call':
+                    chunk[1] += 1
+            elif role == 'system':
+                chunk[3] += 1
+            if step_type == 'tool_call':
+                session.tool_call_count += 1
+                chunk[2] += 1
+        session.conversation_flow = flow
+        session.tag_count = SteeringTag.objects.filter(step__session=session).count()
+        session.save(update_fields=[
+            'step_count', 'user_step_count', 'agent_step_count',
+            'tool_call_count', 'tag_count', 'conversation_flow',
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='agent_step_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='conversation_flow',
+            field=models.JSONField(blank=True, default=list, help_text='Per-chunk [user, agent, tool, system] step counts'),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='step_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='tag_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='tool_call_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='user_step_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_session_stats, migrations.RunPython.noop),
+    ]
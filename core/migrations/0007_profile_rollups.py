@@ -0,0 +1,76 @@
+# Generated by Django 6.0.2 on 2026-10-16 20:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_profile_rollups(apps, schema_editor):
+    Session = apps.get_model('core', 'Session')
+    Step = apps.get_model('core', 'Step')
+    SteeringTag = apps.get_model('core', 'SteeringTag')
+    UserProfileStats = apps.get_model('core', 'UserProfileStats')
+    UserDailyActivity = apps.get_model('core', 'UserDailyActivity')
+
+    user_ids = Session.objects.exclude(user=None).values_list('user_id', flat=True).distinct()
+    for user_id in user_ids:
+        sessions = Session.objects.filter(user_id=user_id)
+        steps = Step.objects.filter(session__user_id=user_id)
+
+        def counts(qs, field):
+            return {row[field]: row['n'] for row in qs.values(field).annotate(n=Count('id')).order_by()}
+
+        role_counts = counts(steps, 'role')
+        UserProfileStats.objects.create(
+            user_id=user_id,
+            session_count=sessions.count(),
+            step_count=sum(role_counts.values()),
+            tag_count=SteeringTag.objects.filter(step__session__user_id=user_id).count(),
+            role_counts=role_counts,
+            step_type_counts=counts(steps, 'step_type'),
+            source_counts=counts(sessions, 'source'),
+        )
+        UserDailyActivity.objects.bulk_create([
+            UserDailyActivity(user_id=user_id, date=day, session_count=n)
+            for day, n in counts(sessions, 'uploaded_at__date').items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0006_session_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserProfileStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='profile_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('session_count', models.IntegerField(default=0)),
+                ('step_count', models.IntegerField(default=0)),
+                ('tag_count', models.IntegerField(default=0)),
+                ('role_counts', models.JSONField(blank=True, default=dict)),
+                ('step_type_counts', models.JSONField(blank=True, default=dict)),
+                ('source_counts', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserDailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('session_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='unique_user_daily_activity')],
+            },
+        ),
+        migrations.RunPython(backfill_profile_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 6.0.2 on 2026-10-16 20:40
+
+import hashlib
+import zlib
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copies of core.blobs as of this migration, so later changes to it
+# do not change what this migration writes.
+INLINE_MAX_CHARS = 4000
+
+
+def blob_codec():
+    codec = getattr(settings, 'AGEXTRACT_BLOB_CODEC', None)
+    if codec is None:
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            return 'zlib'
+        return 'zstd'
+    return codec
+
+
+def compress(data, codec):
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor().compress(data)
+    if codec == 'zlib':
+        return zlib.compress(data)
+    return data
+
+
+def offload_large_steps(apps, schema_editor):
+    Step = apps.get_model('core', 'Step')
+    StepBlob = apps.get_model('core', 'StepBlob')
+    from django.db.models.functions import Length
+
+    limit = getattr(settings, 'AGEXTRACT_STEP_INLINE_MAX_CHARS', INLINE_MAX_CHARS)
+    codec = blob_codec()
+    large = Step.objects.annotate(length=Length('content')).filter(length__gt=limit)
+    for step in large.iterator():
+        raw = step.content.encode('utf-8')
+        digest = hashlib.sha256(raw).hexdigest()
+        StepBlob.objects.get_or_create(hash=digest, defaults={
+            'codec': codec, 'size': len(raw), 'data': compress(raw, codec),
+        })
+        Step.objects.filter(pk=step.pk).update(content=step.content[:limit], blob_id=digest)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_profile_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StepBlob',
+            fields=[
+                ('hash', models.CharField(help_text='SHA-256 of the UTF-8 content', max_length=64, primary_key=True, serialize=False)),
+                ('codec', models.CharField(choices=[('none', 'Uncompressed'), ('zlib', 'zlib'), ('zstd', 'Zstandard')], default='zlib', max_length=10)),
+                ('size', models.IntegerField(help_text='Uncompressed size in bytes')),
+                ('data', models.BinaryField()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='step',
+            name='content',
+            field=models.TextField(help_text='The raw content of the step, or a preview of it when the full body is in blob'),
+        ),
+        migrations.AddField(
+            model_name='step',
+            name='blob',
+            field=models.ForeignKey(blank=True, help_text='Out-of-line storage for bodies longer than AGEXTRACT_STEP_INLINE_MAX_CHARS', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='steps', to='core.stepblob'),
+        ),
+        migrations.RunPython(offload_large_steps, migrations.RunPython.noop),
+    ]
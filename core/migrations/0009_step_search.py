@@ -0,0 +1,78 @@
+import zlib
+
+from django.db import migrations
+
+from ._search_triggers import CONTENT_TRIGGERS
+
+# FTS5 index over step content; see core.search. SQLite only: other
+# databases use core.search's substring fallback.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE core_step_fts USING fts5(
+        content, owner, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    # The owner column only scopes matches; it must not affect ranking
+    "INSERT INTO core_step_fts(core_step_fts, rank) VALUES ('rank', 'bm25(1.0, 0.0)')",
+    *CONTENT_TRIGGERS.values(),
+]
+
+DROP_SQL = [
+    *(f"DROP TRIGGER IF EXISTS {name}" for name in CONTENT_TRIGGERS),
+    "DROP TABLE IF EXISTS core_step_fts",
+]
+
+
+def blob_text(codec, data):
+    """The text of a StepBlob row, as stored by 0008."""
+    data = bytes(data)
+    if codec == 'zstd':
+        import zstandard
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == 'zlib':
+        data = zlib.decompress(data)
+    return data.decode('utf-8')
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+    # Index existing steps, using the full body of offloaded ones
+    schema_editor.execute(
+        """
+        INSERT INTO core_step_fts(rowid, content, owner)
+        SELECT step.id, step.content, 'u' || IFNULL(session.user_id, 0)
+        FROM core_step step JOIN core_session session ON session.id = step.session_id
+        """
+    )
+    Step = apps.get_model('core', 'Step')
+    offloaded = Step.objects.filter(blob__isnull=False).values_list(
+        'id', 'blob__codec', 'blob__data',
+    )
+    with schema_editor.connection.cursor() as cursor:
+        for step_id, codec, data in offloaded.iterator():
+            cursor.execute(
+                "UPDATE core_step_fts SET content = %s WHERE rowid = %s",
+                [blob_text(codec, data), step_id],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_step_blobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
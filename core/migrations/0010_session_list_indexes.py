@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-16 22:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_step_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['user', 'source', 'source_session_id'], name='session_user_source_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['user', 'uploaded_at', 'id'], name='session_user_uploaded_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-16 22:40
+
+from django.db import migrations, models
+
+from ._search_triggers import CONTENT_TRIGGERS, without_search_triggers
+
+# Adding NOT NULL columns makes SQLite rebuild core_session (see
+# _search_triggers).
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_session_list_indexes'),
+    ]
+
+    operations = without_search_triggers(
+        CONTENT_TRIGGERS,
+        migrations.AddField(
+            model_name='session',
+            name='modified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='version',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofilestats',
+            name='version',
+            field=models.IntegerField(default=0),
+        ),
+    )
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:00
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_etag_versions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkedUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('complete', 'Complete')], default='open', max_length=20)),
+                ('title', models.CharField(max_length=255)),
+                ('source', models.CharField(choices=[('claudecode', 'Claude Code'), ('cursor', 'Cursor'), ('windsurf', 'Windsurf'), ('copilot', 'GitHub Copilot'), ('upload', 'Manual Upload')], default='upload', max_length=20)),
+                ('source_session_id', models.CharField(blank=True, default='', max_length=255)),
+                ('spool_path', models.CharField(help_text='Partial upload on local disk', max_length=500)),
+                ('chunk_hashes', models.JSONField(blank=True, default=list)),
+                ('bytes_received', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='chunked_uploads', to='core.ingestionjob')),
+                ('session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='chunked_uploads', to='core.session')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='chunked_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:55
+
+from django.db import migrations, models
+
+from ._search_triggers import CONTENT_TRIGGERS, without_search_triggers
+
+# SQLite rebuilds core_session for the new column (see _search_triggers).
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_chunkedupload'),
+    ]
+
+    operations = without_search_triggers(
+        CONTENT_TRIGGERS,
+        migrations.AddField(
+            model_name='session',
+            name='ingested_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+    )
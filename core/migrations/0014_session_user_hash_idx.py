@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-16 22:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+from ._search_triggers import CONTENT_TRIGGERS, without_search_triggers
+
+# Dropping the content_hash index makes SQLite rebuild core_session (see
+# _search_triggers).
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_session_ingested_bytes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = without_search_triggers(
+        CONTENT_TRIGGERS,
+        migrations.AlterField(
+            model_name='session',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 hash of uploaded content for dedup', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['user', 'content_hash'], name='session_user_hash_idx'),
+        ),
+    )
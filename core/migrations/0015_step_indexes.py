@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_session_user_hash_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingestionjob',
+            index=models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='step',
+            index=models.Index(fields=['session', 'order'], name='step_session_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='step',
+            index=models.Index(fields=['session', 'role', 'step_type'], name='step_session_role_type_idx'),
+        ),
+    ]
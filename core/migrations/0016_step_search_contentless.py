@@ -0,0 +1,57 @@
+from importlib import import_module
+
+from django.db import migrations
+
+from ._search_triggers import CONTENTLESS_TRIGGERS, STEP_TEXT, drop_triggers
+
+# Rebuild core_step_fts as a contentless FTS5 table. The 0009 table kept its
+# own uncompressed copy of every step body, offloaded blobs included; this
+# one stores only the index (see _search_triggers for how it is kept in
+# sync).
+TABLE_SQL = [
+    """
+    CREATE VIRTUAL TABLE core_step_fts USING fts5(
+        content, owner, content = '', tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    # The owner column only scopes matches; it must not affect ranking
+    "INSERT INTO core_step_fts(core_step_fts, rank) VALUES ('rank', 'bm25(1.0, 0.0)')",
+]
+
+
+def drop_search_index(schema_editor):
+    drop_triggers(schema_editor, CONTENTLESS_TRIGGERS)
+    schema_editor.execute("DROP TABLE IF EXISTS core_step_fts")
+
+
+def create_contentless_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    drop_search_index(schema_editor)
+    for sql in TABLE_SQL + list(CONTENTLESS_TRIGGERS.values()):
+        schema_editor.execute(sql)
+    schema_editor.execute(
+        f"""
+        INSERT INTO core_step_fts(rowid, content, owner)
+        SELECT step.id, {STEP_TEXT.format(row='step')}, 'u' || IFNULL(session.user_id, 0)
+        FROM core_step step JOIN core_session session ON session.id = step.session_id
+        """
+    )
+
+
+def restore_content_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    drop_search_index(schema_editor)
+    import_module('core.migrations.0009_step_search').create_search_index(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_step_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_contentless_index, restore_content_index),
+    ]
@@ -0,0 +1,127 @@
+"""
+SQL of the triggers that keep core_step_fts in sync, for the migrations.
+
+Each version is defined once: CONTENT_TRIGGERS for the table of 0009 and
+CONTENTLESS_TRIGGERS for the contentless table of 0016. The triggers sit on
+core_step and core_session and read core_session and core_stepblob, so
+whenever a migration makes SQLite rebuild one of those tables (adding a
+NOT NULL column, altering or dropping an index on it...), they either stop
+the rebuild or are silently dropped with the old table. Such a migration
+wraps its operations in without_search_triggers() with the triggers
+current at that point, which drops all of them first and recreates all of
+them afterwards.
+
+Not loaded as a migration: the loader skips modules starting with ``_``.
+"""
+from django.db import migrations
+
+CONTENT_TRIGGERS = {
+    'core_step_fts_insert': """
+    CREATE TRIGGER core_step_fts_insert AFTER INSERT ON core_step BEGIN
+        INSERT INTO core_step_fts(rowid, content, owner) VALUES (
+            new.id, new.content,
+            'u' || IFNULL((SELECT user_id FROM core_session WHERE id = new.session_id), 0)
+        );
+    END
+    """,
+    'core_step_fts_update': """
+    CREATE TRIGGER core_step_fts_update AFTER UPDATE OF content ON core_step BEGIN
+        UPDATE core_step_fts SET content = new.content WHERE rowid = new.id;
+    END
+    """,
+    'core_step_fts_delete': """
+    CREATE TRIGGER core_step_fts_delete AFTER DELETE ON core_step BEGIN
+        DELETE FROM core_step_fts WHERE rowid = old.id;
+    END
+    """,
+    'core_session_fts_owner': """
+    CREATE TRIGGER core_session_fts_owner AFTER UPDATE OF user_id ON core_session BEGIN
+        UPDATE core_step_fts SET owner = 'u' || IFNULL(new.user_id, 0)
+        WHERE rowid IN (SELECT id FROM core_step WHERE session_id = new.id);
+    END
+    """,
+}
+
+# A contentless table can only drop a row when given the values it was
+# indexed with, so these recompute a step's full body with
+# agextract_step_text() (core.search.step_text, registered on every SQLite
+# connection) and its owner from core_session.
+STEP_TEXT = (
+    "agextract_step_text({row}.content, "
+    "(SELECT codec FROM core_stepblob WHERE hash = {row}.blob_id), "
+    "(SELECT data FROM core_stepblob WHERE hash = {row}.blob_id))"
+)
+STEP_OWNER = "'u' || IFNULL((SELECT user_id FROM core_session WHERE id = {row}.session_id), 0)"
+
+
+def _index_step(row):
+    return (
+        f"INSERT INTO core_step_fts(rowid, content, owner) "
+        f"VALUES ({row}.id, {STEP_TEXT.format(row=row)}, {STEP_OWNER.format(row=row)});"
+    )
+
+
+def _unindex_step(row):
+    return (
+        f"INSERT INTO core_step_fts(core_step_fts, rowid, content, owner) "
+        f"VALUES ('delete', {row}.id, {STEP_TEXT.format(row=row)}, {STEP_OWNER.format(row=row)});"
+    )
+
+
+CONTENTLESS_TRIGGERS = {
+    'core_step_fts_insert': f"""
+    CREATE TRIGGER core_step_fts_insert AFTER INSERT ON core_step BEGIN
+        {_index_step('new')}
+    END
+    """,
+    'core_step_fts_update': f"""
+    CREATE TRIGGER core_step_fts_update AFTER UPDATE OF content, blob_id, session_id ON core_step BEGIN
+        {_unindex_step('old')}
+        {_index_step('new')}
+    END
+    """,
+    'core_step_fts_delete': f"""
+    CREATE TRIGGER core_step_fts_delete AFTER DELETE ON core_step BEGIN
+        {_unindex_step('old')}
+    END
+    """,
+    'core_session_fts_owner': f"""
+    CREATE TRIGGER core_session_fts_owner AFTER UPDATE OF user_id ON core_session BEGIN
+        INSERT INTO core_step_fts(core_step_fts, rowid, content, owner)
+        SELECT 'delete', step.id, {STEP_TEXT.format(row='step')}, 'u' || IFNULL(old.user_id, 0)
+        FROM core_step step WHERE step.session_id = old.id;
+        INSERT INTO core_step_fts(rowid, content, owner)
+        SELECT step.id, {STEP_TEXT.format(row='step')}, 'u' || IFNULL(new.user_id, 0)
+        FROM core_step step WHERE step.session_id = new.id;
+    END
+    """,
+}
+
+
+def drop_triggers(schema_editor, triggers):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in triggers:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def create_triggers(schema_editor, triggers):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in triggers.values():
+        schema_editor.execute(sql)
+
+
+def without_search_triggers(triggers, *operations):
+    """``operations``, run with every search trigger dropped and then recreated."""
+    def drop(apps, schema_editor):
+        drop_triggers(schema_editor, triggers)
+
+    def create(apps, schema_editor):
+        create_triggers(schema_editor, triggers)
+
+    return [
+        migrations.RunPython(drop, create),
+        *operations,
+        migrations.RunPython(create, drop),
+    ]
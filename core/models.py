@@ -1,5 +1,7 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 import uuid
 
 class Session(models.Model):
@@ -27,7 +29,7 @@ class Session(models.Model):
         help_text="Original session ID from the source tool",
     )
     content_hash = models.CharField(
-        max_length=64, blank=True, default='', db_index=True,
+        max_length=64, blank=True, default='',
         help_text="SHA-256 hash of uploaded content for dedup",
     )
 
@@ -39,10 +41,87 @@ class Session(models.Model):
     # v2 Storyboard fields
     summary = models.TextField(blank=True, help_text="AI-generated or user-written summary")
     hero_moment = models.ForeignKey('Step', on_delete=models.SET_NULL, null=True, blank=True, related_name='hero_sessions')
-    
+
+    # Step statistics, computed once at ingest (see core.ingest.SessionStats)
+    step_count = models.IntegerField(default=0)
+    user_step_count = models.IntegerField(default=0)
+    agent_step_count = models.IntegerField(default=0)
+    tool_call_count = models.IntegerField(default=0)
+    tag_count = models.IntegerField(default=0)
+    conversation_flow = models.JSONField(
+        default=list, blank=True,
+        help_text="Per-chunk [user, agent, tool, system] step counts",
+    )
+
+    # Bumped whenever the session changes after ingest (tags, appended
+    # steps, hero moment); part of its ETag, see core.etags, and of its
+    # cached timeline pages, see core.fragments
+    version = models.IntegerField(default=0)
+    modified_at = models.DateTimeField(null=True, blank=True)
+
+    # Bytes of the source file parsed so far by append-mode uploads of a
+    # live session (see TranscriptParser.append); 0 for whole-file ingests
+    ingested_bytes = models.BigIntegerField(default=0)
+
+    # Number of steps per bar in the conversation flow chart
+    FLOW_CHUNK_SIZE = 20
+
+    class Meta:
+        indexes = [
+            # Idempotent pushes and the CLI's delta sync look sessions up by source id
+            models.Index(fields=['user', 'source', 'source_session_id'], name='session_user_source_idx'),
+            # Keyset pagination of GET /api/v1/sessions/
+            models.Index(fields=['user', 'uploaded_at', 'id'], name='session_user_uploaded_idx'),
+            # Upload dedup is always scoped to the user (see parser.find_duplicate)
+            models.Index(fields=['user', 'content_hash'], name='session_user_hash_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored hero moment, to tell in save() whether it changed
+        if 'hero_moment_id' in field_names:
+            instance._saved_hero_moment_id = values[field_names.index('hero_moment_id')]
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Save the session, bumping its version when the hero moment changed."""
+        hero_changed = (
+            not self._state.adding
+            and 'hero_moment_id' in self.__dict__
+            and self.hero_moment_id != getattr(self, '_saved_hero_moment_id', None)
+        )
+        if hero_changed:
+            self.version = F('version') + 1
+            self.modified_at = timezone.now()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version', 'modified_at'}
+        super().save(*args, **kwargs)
+        if hero_changed:
+            self.refresh_from_db(fields=['version'])
+        if 'hero_moment_id' in self.__dict__:
+            self._saved_hero_moment_id = self.hero_moment_id
+
+    @property
+    def steering_ratio(self):
+        """How actively the human guided the AI, as a percentage."""
+        return round(self.user_step_count / max(self.agent_step_count, 1) * 100)
+
+    def conversation_flow_chart(self):
+        """Labelled conversation flow buckets for the session detail chart."""
+        size = self.FLOW_CHUNK_SIZE
+        return [
+            {
+                'chunk': f"{i * size + 1}-{min((i + 1) * size, self.step_count)}",
+                'user': user, 'agent': agent, 'tool': tool, 'system': system,
+            }
+            for i, (user, agent, tool, system) in enumerate(self.conversation_flow)
+        ]
+
 class Step(models.Model):
     """
     A single interaction or event in the session timeline.
@@ -64,7 +143,13 @@ class Step(models.Model):
     session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name='steps')
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
     step_type = models.CharField(max_length=20, choices=STEP_TYPE_CHOICES)
-    content = models.TextField(help_text="The raw content of the step")
+    content = models.TextField(
+        help_text="The raw content of the step, or a preview of it when the full body is in blob",
+    )
+    blob = models.ForeignKey(
+        'StepBlob', on_delete=models.PROTECT, null=True, blank=True, related_name='steps',
+        help_text="Out-of-line storage for bodies longer than AGEXTRACT_STEP_INLINE_MAX_CHARS",
+    )
     
     # Ordering and timing
     timestamp = models.DateTimeField(null=True, blank=True)
@@ -72,10 +157,49 @@ class Step(models.Model):
     
     class Meta:
         ordering = ['order']
+        indexes = [
+            # Session timeline, in order and keyset-paginated on (order, id)
+            # (see core.fragments); the id is the rowid, so it is in the index
+            models.Index(fields=['session', 'order'], name='step_session_order_idx'),
+            # Covers the per-session role and step type counts of core.rollups
+            models.Index(fields=['session', 'role', 'step_type'], name='step_session_role_type_idx'),
+        ]
 
     def __str__(self):
         return f"{self.role} - {self.step_type} ({self.order})"
 
+    @property
+    def full_content(self):
+        """The complete step body, loading it from the blob store if needed."""
+        if self.blob_id is None:
+            return self.content
+        return self.blob.text
+
+
+class StepBlob(models.Model):
+    """
+    Full body of a large step, stored once per distinct content and keyed by
+    its SHA-256, optionally compressed (see core.blobs).
+    """
+    CODEC_CHOICES = [
+        ('none', 'Uncompressed'),
+        ('zlib', 'zlib'),
+        ('zstd', 'Zstandard'),
+    ]
+
+    hash = models.CharField(max_length=64, primary_key=True, help_text="SHA-256 of the UTF-8 content")
+    codec = models.CharField(max_length=10, choices=CODEC_CHOICES, default='zlib')
+    size = models.IntegerField(help_text="Uncompressed size in bytes")
+    data = models.BinaryField()
+
+    def __str__(self):
+        return f"{self.hash[:12]} ({self.codec}, {self.size} bytes)"
+
+    @property
+    def text(self):
+        from .blobs import decompress
+        return decompress(self.codec, self.data)
+
 class SteeringTag(models.Model):
     """
     User annotations to highlight 'human in the loop' moments.
@@ -98,3 +222,135 @@ class SteeringTag(models.Model):
 
     def __str__(self):
         return f"{self.tag_type} on Step {self.step.order}"
+
+class IngestionJob(models.Model):
+    """
+    A transcript upload queued for parsing by the ingest worker
+    (``manage.py ingest_worker``). The raw upload is spooled to disk and the
+    job row acts as the queue entry.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        null=True, blank=True, related_name='ingestion_jobs',
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+
+    # Session fields applied once the transcript is parsed
+    title = models.CharField(max_length=255)
+    source = models.CharField(max_length=20, choices=Session.SOURCE_CHOICES, default='upload')
+    source_session_id = models.CharField(max_length=255, blank=True, default='')
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+
+    spool_path = models.CharField(max_length=500, help_text="Spooled upload on local disk")
+    session = models.ForeignKey(
+        Session, on_delete=models.SET_NULL, null=True, blank=True, related_name='ingestion_jobs',
+    )
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # The ingest worker claims the oldest queued job (see core.jobs)
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.status})"
+
+
+class ChunkedUpload(models.Model):
+    """
+    A resumable upload in progress (see core.uploads). Chunks are spooled to
+    local disk next to ``spool_path`` and joined into it on completion;
+    ``chunk_hashes`` holds the SHA-256 of every acknowledged chunk, so an interrupted client resumes from
+    ``len(chunk_hashes)`` and retrying an acknowledged chunk is harmless.
+    """
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('complete', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        null=True, blank=True, related_name='chunked_uploads',
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+
+    # Session fields applied once the upload is complete
+    title = models.CharField(max_length=255)
+    source = models.CharField(max_length=20, choices=Session.SOURCE_CHOICES, default='upload')
+    source_session_id = models.CharField(max_length=255, blank=True, default='')
+
+    spool_path = models.CharField(max_length=500, help_text="Partial upload on local disk")
+    chunk_hashes = models.JSONField(default=list, blank=True)
+    bytes_received = models.BigIntegerField(default=0)
+
+    # Outcome, once complete: the session, or the job parsing it
+    session = models.ForeignKey(
+        Session, on_delete=models.SET_NULL, null=True, blank=True, related_name='chunked_uploads',
+    )
+    job = models.ForeignKey(
+        IngestionJob, on_delete=models.SET_NULL, null=True, blank=True, related_name='chunked_uploads',
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.title} ({self.status}, {len(self.chunk_hashes)} chunks)"
+
+
+class UserProfileStats(models.Model):
+    """
+    Rollup of everything the public profile shows for one user, maintained
+    incrementally as sessions are ingested, tagged and deleted (see
+    core.rollups) so the profile never has to aggregate the Step table.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        primary_key=True, related_name='profile_stats',
+    )
+    session_count = models.IntegerField(default=0)
+    step_count = models.IntegerField(default=0)
+    tag_count = models.IntegerField(default=0)
+    role_counts = models.JSONField(default=dict, blank=True)
+    step_type_counts = models.JSONField(default=dict, blank=True)
+    source_counts = models.JSONField(default=dict, blank=True)
+    # Bumped on every change; part of the profile ETag, see core.etags
+    version = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Profile stats for {self.user_id}"
+
+
+class UserDailyActivity(models.Model):
+    """Number of sessions a user uploaded on a given day (profile heatmap)."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_activity',
+    )
+    date = models.DateField()
+    session_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_user_daily_activity'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} on {self.date}: {self.session_count}"
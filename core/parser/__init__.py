@@ -0,0 +1,188 @@
+"""
+Transcript parsing. TranscriptParser picks a per-source parser from the
+registry in ``base`` (one module per tool) and streams its steps into the
+database through StepWriter.
+"""
+from ..ingest import StepWriter
+from ..models import Session
+from .base import PARSERS, SNIFF_LINES, SourceParser, register, select_parser
+from .claudecode import ClaudeCodeParser
+from .copilot import CopilotParser
+from .cursor import CursorParser
+from .lines import (
+    CHUNK_SIZE, CompleteLinesReader, HashingStream, iter_chunks, iter_lines, iter_text_blocks,
+    peek_lines,
+)
+from .markdown import MarkdownParser
+from .windsurf import WindsurfParser
+
+__all__ = [
+    'CHUNK_SIZE', 'PARSERS', 'AppendConflict', 'ClaudeCodeParser', 'CompleteLinesReader',
+    'CopilotParser', 'CursorParser', 'DuplicateContent', 'HashingStream', 'MarkdownParser',
+    'SourceParser', 'TranscriptParser', 'WindsurfParser', 'find_duplicate', 'iter_chunks',
+    'iter_lines', 'iter_text_blocks', 'register', 'select_parser',
+]
+
+
+class AppendConflict(Exception):
+    """An append does not line up with what the session has ingested."""
+
+    def __init__(self, message, ingested_bytes):
+        super().__init__(message)
+        self.ingested_bytes = ingested_bytes
+
+
+class DuplicateContent(Exception):
+    """The user already has a session with this content; ``session`` is it."""
+
+    def __init__(self, session):
+        super().__init__(f'Duplicate of session {session.pk}')
+        self.session = session
+
+
+def find_duplicate(user_id, content_hash, exclude=None):
+    """The user's session with this content hash, if any (one indexed lookup)."""
+    if user_id is None or not content_hash:
+        return None
+    sessions = Session.objects.filter(user_id=user_id, content_hash=content_hash)
+    if exclude is not None:
+        sessions = sessions.exclude(pk=exclude)
+    return sessions.first()
+
+
+class TranscriptParser:
+    """
+    Parses an uploaded transcript into a Session and its Steps.
+
+    ``file_content`` may be a str, bytes, or a binary file-like object such
+    as a Django UploadedFile. File-like input is streamed line by line and
+    never loaded into memory as a whole. Wrapped in a HashingStream, it is
+    hashed in the same pass (see parse()).
+    """
+
+    def __init__(self, file_content):
+        self.source = file_content
+        # The SourceParser picked by the last iter_steps() call
+        self.parser = None
+
+    def parse(self, title="Uploaded Session", **session_fields):
+        """
+        Parse the transcript, save it to the database and return the Session.
+        Extra keyword arguments (user, source, content_hash, ...) are set on
+        the new Session. A generic 'upload' source is replaced by the format
+        detected, and the session's duration and token usage are filled in
+        when the transcript records them.
+
+        When ``self.source`` is a HashingStream and no content_hash is given,
+        the session gets the hash of what was parsed. If its user already
+        has a session with the content hash, given or computed, nothing is
+        saved and DuplicateContent is raised.
+        """
+        hashing = isinstance(self.source, HashingStream) and not session_fields.get('content_hash')
+        steps = self.iter_steps(source=session_fields.get('source'))
+        if session_fields.get('source', 'upload') == 'upload':
+            session_fields['source'] = self.parser.source
+
+        # Parse before the transaction opens (see StepWriter); only the
+        # writes happen inside it
+        session = Session(title=title, file_count=1, **session_fields)
+        writer = StepWriter()
+        writer.add_session(session)
+        for step in steps:
+            writer.add(session, **step)
+        if hashing:
+            session.content_hash = self.source.hexdigest()
+        if session.duration_seconds is None:
+            session.duration_seconds = self.parser.duration_seconds
+        if session.token_usage is None:
+            session.token_usage = self.parser.token_usage
+
+        with writer:
+            # Checked under the write lock, so two parses of the same
+            # content can't both save
+            if session.content_hash:
+                duplicate = find_duplicate(session.user_id, session.content_hash)
+                if duplicate is not None:
+                    raise DuplicateContent(duplicate)
+            session.save(force_insert=True)
+        return session
+
+    def append(self, offset=0, title="Uploaded Session", **session_fields):
+        """
+        Append the steps of a still-growing JSONL transcript to the session
+        matching ``session_fields`` (user, source, source_session_id),
+        creating it on the first call. Returns (session, steps_added, created).
+
+        ``self.source`` holds the file from byte ``offset`` on. Bytes the
+        session has already ingested are skipped and a trailing line without
+        its newline is left for the next call, so only new lines are parsed
+        and a client may resend overlapping data. New steps continue the
+        session's ``order`` sequence.
+
+        Raises AppendConflict if ``offset`` is past the ingested bytes (data
+        would be missing), the session was not built from appends, or
+        another append to it committed while this one was being parsed.
+        """
+        session = Session.objects.filter(**session_fields).first()
+        created = session is None
+        ingested = 0 if created else session.ingested_bytes
+        if not created and ingested == 0 and session.step_count:
+            raise AppendConflict('Session was not created in append mode', ingested)
+        if offset > ingested:
+            raise AppendConflict(f'Append offset {offset} is past the {ingested} bytes ingested', ingested)
+
+        # Parse before the transaction opens (see StepWriter), then check
+        # that no concurrent append got in first
+        writer = StepWriter()
+        if created:
+            session = Session(title=title, file_count=1, **session_fields)
+            writer.add_session(session)
+        reader = CompleteLinesReader(self.source, skip=ingested - offset)
+        self.parser = ClaudeCodeParser()
+        for step in self.parser.iter_steps(iter_lines(reader), start_order=session.step_count + 1):
+            writer.add(session, **step)
+
+        with writer:
+            current = Session.objects.select_for_update().filter(**session_fields).values_list(
+                'pk', 'ingested_bytes',
+            ).first()
+            if current != (None if created else (session.pk, ingested)):
+                raise AppendConflict('Session changed during the append', current[1] if current else 0)
+            if created:
+                session.save(force_insert=True)
+            if reader.consumed:
+                session.ingested_bytes += reader.consumed
+                session.token_usage = _sum_or_none(session.token_usage, self.parser.token_usage)
+                first = self.parser.first_timestamp
+                if not created:
+                    first = session.steps.exclude(timestamp=None).values_list('timestamp', flat=True).first() or first
+                if first is not None and self.parser.last_timestamp is not None:
+                    session.duration_seconds = int((self.parser.last_timestamp - first).total_seconds())
+                Session.objects.filter(pk=session.pk).update(
+                    ingested_bytes=session.ingested_bytes,
+                    token_usage=session.token_usage,
+                    duration_seconds=session.duration_seconds,
+                )
+        return session, writer.written, created
+
+    def iter_steps(self, source=None):
+        """
+        Return a generator of step dicts (role, step_type, content, order,
+        and timestamp where the format has one).
+
+        The parser is chosen by ``source`` when the content agrees, else by
+        sniffing the first few non-blank lines. Steps are produced as the
+        input is read, so callers can persist or discard them without
+        buffering the whole session.
+        """
+        sniffed, chunks = peek_lines(self.source, SNIFF_LINES)
+        self.parser = select_parser(sniffed, source=source, default=MarkdownParser)()
+        if self.parser.reads_blocks:
+            return self.parser.iter_block_steps(iter_text_blocks(chunks))
+        return self.parser.iter_steps(iter_lines(chunks))
+
+
+def _sum_or_none(a, b):
+    if a is None and b is None:
+        return None
+    return (a or 0) + (b or 0)
@@ -0,0 +1,138 @@
+"""
+Parser registry and the base class for per-source transcript parsers.
+
+Each supported tool has a SourceParser subclass, registered under its
+Session.source value. TranscriptParser picks one by the upload's ``source``
+or, failing that, by sniffing the first lines of the transcript; anything
+unrecognised falls back to the generic markdown parser.
+"""
+from datetime import datetime, timezone
+
+from django.utils.dateparse import parse_datetime
+
+# source -> parser class, in sniffing order
+PARSERS = {}
+
+# Number of non-blank lines handed to SourceParser.sniff()
+SNIFF_LINES = 5
+
+
+def register(cls):
+    """Class decorator adding a SourceParser to the registry."""
+    PARSERS[cls.source] = cls
+    return cls
+
+
+def select_parser(head, source=None, default=None):
+    """
+    Return the parser class for a transcript whose first non-blank lines are
+    ``head``: the one registered for ``source`` if the content agrees, else
+    the first whose sniff() accepts it, else ``default``.
+    """
+    preferred = PARSERS.get(source)
+    if preferred is not None and preferred.sniff(head):
+        return preferred
+    for cls in PARSERS.values():
+        if cls is not preferred and cls.sniff(head):
+            return cls
+    return default
+
+
+class SourceParser:
+    """
+    Parses one transcript format. An instance handles a single transcript:
+    iter_steps() streams step dicts from its lines in one pass, and notes
+    the session's timing and token usage on the instance as it goes.
+    """
+
+    # Session.source value this parser produces
+    source = None
+
+    # Parsers that set this are fed decoded text blocks (see
+    # lines.iter_text_blocks) through iter_block_steps() instead of lines
+    reads_blocks = False
+
+    def __init__(self):
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.token_usage = None
+
+    @classmethod
+    def sniff(cls, head):
+        """Whether ``head``, the transcript's first non-blank lines, is in this format."""
+        return False
+
+    def iter_steps(self, lines, start_order=1):
+        """Yield step dicts (role, step_type, content, order[, timestamp])."""
+        raise NotImplementedError
+
+    def iter_block_steps(self, blocks, start_order=1):
+        """Like iter_steps(), over blocks of whole lines."""
+        raise NotImplementedError
+
+    def note_timestamp(self, timestamp):
+        if timestamp is None:
+            return
+        if self.first_timestamp is None or timestamp < self.first_timestamp:
+            self.first_timestamp = timestamp
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+
+    def add_tokens(self, count):
+        if count:
+            self.token_usage = (self.token_usage or 0) + count
+
+    @property
+    def duration_seconds(self):
+        if self.first_timestamp is None or self.last_timestamp is None:
+            return None
+        return int((self.last_timestamp - self.first_timestamp).total_seconds())
+
+
+def parse_timestamp(value):
+    """
+    An aware datetime from an ISO 8601 string or epoch milliseconds, or
+    None. Naive values are taken to be UTC.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            return None
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        return None
+    if parsed is not None and parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def build_step(role, content, order, timestamp=None):
+    """A step dict for a markdown-style block, typed from its content."""
+    step_type = 'text' if role == 'agent' else 'prompt'
+
+    # Detect step type based on content
+    if '```diff' in content or '<<<<<<<' in content:
+        step_type = 'diff'
+    elif 'Tool Call' in content or '<function_calls>' in content:
+        step_type = 'tool_call'
+    elif content.startswith('*') and content.endswith('*'):
+        # Handle s.md style tool calls
+        step_type = 'tool_call'
+    elif role == 'user':
+        step_type = 'prompt'
+
+    step = {
+        'role': role,
+        'step_type': step_type,
+        'content': content.strip(),
+        'order': order,
+    }
+    if timestamp is not None:
+        step['timestamp'] = timestamp
+    return step
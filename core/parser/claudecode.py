@@ -0,0 +1,167 @@
+from .base import SourceParser, parse_timestamp, register
+from .jsoncodec import dumps_truncated, get_loads
+
+# Token counters in a Claude message's ``usage``; cache reads and writes
+# are billed input too
+USAGE_FIELDS = (
+    'input_tokens', 'output_tokens',
+    'cache_creation_input_tokens', 'cache_read_input_tokens',
+)
+
+
+@register
+class ClaudeCodeParser(SourceParser):
+    """
+    Claude Code session logs: JSONL, one event per line. Steps get the
+    entry's ``timestamp``; token usage is summed over assistant messages.
+    """
+
+    source = 'claudecode'
+
+    @classmethod
+    def sniff(cls, head):
+        first = head[0].lstrip() if head else ''
+        if not first.startswith('{'):
+            return False
+        try:
+            entry = get_loads()(first)
+        except ValueError:
+            return False
+        return isinstance(entry, dict) and 'type' in entry
+
+    def iter_steps(self, lines, start_order=1):
+        """Parse Claude Code JSONL format."""
+        step_counter = start_order
+        usage_message_id = None
+        loads = get_loads()
+
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict):
+                continue
+
+            timestamp = parse_timestamp(entry.get('timestamp'))
+            self.note_timestamp(timestamp)
+            msg = entry.get('message')
+            if isinstance(msg, dict) and isinstance(msg.get('usage'), dict):
+                # Each content block of a response is logged as its own
+                # entry, repeating the message's usage
+                message_id = msg.get('id')
+                if message_id is None or message_id != usage_message_id:
+                    self.add_tokens(_usage_tokens(msg['usage']))
+                usage_message_id = message_id
+
+            msg_type = entry.get('type', '')
+            role = None
+            step_type = 'text'
+            content = ''
+
+            if msg_type in ('human', 'user'):
+                # Check if this is a tool_result relay (Claude API sends tool
+                # results as role=user, but they aren't real human inputs)
+                if self._is_tool_result_relay(entry):
+                    role = 'system'
+                    step_type = 'text'
+                else:
+                    role = 'user'
+                    step_type = 'prompt'
+                content = self._extract_jsonl_content(entry)
+            elif msg_type in ('assistant', 'agent'):
+                # Detect if the assistant message contains tool_use blocks
+                role = 'agent'
+                step_type = self._detect_assistant_step_type(entry)
+                content = self._extract_jsonl_content(entry)
+            elif msg_type in ('tool_use', 'tool_call'):
+                role = 'agent'
+                step_type = 'tool_call'
+                content = self._extract_jsonl_content(entry)
+            elif msg_type == 'tool_result':
+                role = 'system'
+                step_type = 'text'
+                content = self._extract_jsonl_content(entry)
+            else:
+                continue
+
+            if content and role:
+                step = {
+                    'role': role, 'step_type': step_type,
+                    'content': content.strip(), 'order': step_counter,
+                }
+                if timestamp is not None:
+                    step['timestamp'] = timestamp
+                yield step
+                step_counter += 1
+
+    def _is_tool_result_relay(self, entry):
+        """Check if a 'user' type entry is actually a tool_result relay."""
+        msg = entry.get('message', {})
+        if not isinstance(msg, dict):
+            return False
+        content = msg.get('content', '')
+        if isinstance(content, list):
+            return any(
+                isinstance(b, dict) and b.get('type') == 'tool_result'
+                for b in content
+            )
+        return False
+
+    def _detect_assistant_step_type(self, entry):
+        """Detect if assistant message is text or tool_call."""
+        msg = entry.get('message', {})
+        if not isinstance(msg, dict):
+            return 'text'
+        content = msg.get('content', '')
+        if isinstance(content, list):
+            has_tool = any(
+                isinstance(b, dict) and b.get('type') == 'tool_use'
+                for b in content
+            )
+            if has_tool:
+                return 'tool_call'
+        return 'text'
+
+    def _extract_jsonl_content(self, entry):
+        """Extract text content from a JSONL entry."""
+        # Try 'message' field first (Claude Code format)
+        msg = entry.get('message', {})
+        if isinstance(msg, dict):
+            content = msg.get('content', '')
+            if isinstance(content, list):
+                # Content blocks: [{"type": "text", "text": "..."}, ...]
+                parts = []
+                for block in content:
+                    if isinstance(block, dict):
+                        if block.get('type') == 'text':
+                            parts.append(block.get('text', ''))
+                        elif block.get('type') == 'tool_use':
+                            parts.append(f"Tool: {block.get('name', '')} — {dumps_truncated(block.get('input', {}), 500)}")
+                        elif block.get('type') == 'tool_result':
+                            parts.append(str(block.get('content', ''))[:1000])
+                return '\n'.join(parts)
+            if isinstance(content, str):
+                return content
+        if isinstance(msg, str):
+            return msg
+
+        # Fallback to top-level 'content'
+        content = entry.get('content', '')
+        if isinstance(content, str):
+            return content
+        if isinstance(content, (list, dict)):
+            return dumps_truncated(content, 2000)
+        return str(content) if content else ''
+
+
+def _usage_tokens(usage):
+    total = 0
+    for field in USAGE_FIELDS:
+        value = usage.get(field)
+        if isinstance(value, int):
+            total += value
+    return total
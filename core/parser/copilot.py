@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from .base import SourceParser, parse_timestamp, register
+from .jsoncodec import get_loads
+
+# Response parts of these kinds are tool activity rather than prose
+TOOL_KINDS = ('toolInvocationSerialized', 'toolInvocation')
+
+
+@register
+class CopilotParser(SourceParser):
+    """
+    GitHub Copilot chat, as exported by VS Code ("requests", each with the
+    prompt, the response parts, a start ``timestamp`` in epoch milliseconds
+    and ``result.timings``) or as the CLI's "turns" JSON. The export is a
+    single JSON document, so it is decoded whole before steps are emitted.
+    """
+
+    source = 'copilot'
+
+    @classmethod
+    def sniff(cls, head):
+        first = head[0].strip() if head else ''
+        if first == '{':
+            return any(
+                line.lstrip().startswith(('"requests"', '"requesterUsername"', '"turns"'))
+                for line in head[1:]
+            )
+        if not first.startswith('{'):
+            return False
+        try:
+            doc = get_loads()(first)
+        except ValueError:
+            return False
+        return isinstance(doc, dict) and ('requests' in doc or 'turns' in doc)
+
+    def iter_steps(self, lines, start_order=1):
+        try:
+            doc = get_loads()('\n'.join(lines))
+        except ValueError:
+            return
+        if not isinstance(doc, dict):
+            return
+
+        order = start_order
+        if isinstance(doc.get('requests'), list):
+            turns = (self._request_steps(request) for request in doc['requests'] if isinstance(request, dict))
+        else:
+            turns = (self._turn_steps(turn) for turn in doc.get('turns') or [] if isinstance(turn, dict))
+        for steps in turns:
+            for step in steps:
+                step['order'] = order
+                order += 1
+                yield step
+
+    def _request_steps(self, request):
+        started = parse_timestamp(request.get('timestamp'))
+        finished = started
+        timings = (request.get('result') or {}).get('timings') or {}
+        elapsed = timings.get('totalElapsed')
+        if started is not None and isinstance(elapsed, (int, float)):
+            finished = started + timedelta(milliseconds=elapsed)
+        self.note_timestamp(started)
+        self.note_timestamp(finished)
+
+        steps = []
+        prompt = (request.get('message') or {}).get('text') or ''
+        if prompt.strip():
+            steps.append(_step('user', 'prompt', prompt, started))
+
+        text = []
+        for part in request.get('response') or []:
+            if not isinstance(part, dict):
+                continue
+            if part.get('kind') in TOOL_KINDS:
+                if ''.join(text).strip():
+                    steps.append(_step('agent', 'text', ''.join(text), finished))
+                text = []
+                message = part.get('invocationMessage') or part.get('pastTenseMessage') or ''
+                if isinstance(message, dict):
+                    message = message.get('value', '')
+                if message:
+                    steps.append(_step('agent', 'tool_call', message, finished))
+            elif isinstance(part.get('value'), str):
+                text.append(part['value'])
+        if ''.join(text).strip():
+            steps.append(_step('agent', 'text', ''.join(text), finished))
+        return steps
+
+    def _turn_steps(self, turn):
+        steps = []
+        prompt = (turn.get('request') or {}).get('message') or ''
+        if prompt.strip():
+            steps.append(_step('user', 'prompt', prompt, None))
+        response = (turn.get('response') or {}).get('message') or ''
+        if response.strip():
+            steps.append(_step('agent', 'text', response, None))
+        return steps
+
+
+def _step(role, step_type, content, timestamp):
+    step = {'role': role, 'step_type': step_type, 'content': content.strip()}
+    if timestamp is not None:
+        step['timestamp'] = timestamp
+    return step
@@ -0,0 +1,63 @@
+from .base import SourceParser, build_step, register
+
+ROLE_MARKERS = {
+    '**User**': 'user',
+    '**Cursor**': 'agent',
+}
+
+
+@register
+class CursorParser(SourceParser):
+    """
+    Cursor's markdown chat export: each message starts with a "**User**" or
+    "**Cursor**" line, and messages are separated by "---" rules. Exports
+    carry no per-message times or token counts.
+    """
+
+    source = 'cursor'
+
+    @classmethod
+    def sniff(cls, head):
+        for line in head:
+            line = line.strip()
+            if line in ROLE_MARKERS or (line.startswith('_Exported on') and 'from Cursor' in line):
+                return True
+        return False
+
+    def iter_steps(self, lines, start_order=1):
+        order = start_order
+        role = None
+        buffer = []
+        # A "---" rule, and the blank lines after it, are only a message
+        # separator if a role marker follows; held here until we know
+        rule = []
+        in_fence = False
+
+        for line in lines:
+            stripped = line.strip()
+            if stripped.startswith('```'):
+                in_fence = not in_fence
+            elif not in_fence:
+                next_role = ROLE_MARKERS.get(stripped)
+                if next_role is not None:
+                    rule = []
+                    if role and buffer:
+                        content = '\n'.join(buffer).strip()
+                        if content:
+                            yield build_step(role, content, order)
+                            order += 1
+                    role = next_role
+                    buffer = []
+                    continue
+                if stripped == '---' or (rule and not stripped):
+                    rule.append(line)
+                    continue
+            if rule:
+                buffer.extend(rule)
+                rule = []
+            buffer.append(line)
+
+        if role and buffer:
+            content = '\n'.join(buffer).strip()
+            if content:
+                yield build_step(role, content, order)
@@ -0,0 +1,125 @@
+"""
+JSON decoding and truncated encoding for the transcript parsers.
+
+Decoding is most of the CPU time spent ingesting large JSONL transcripts,
+so get_loads() hands out orjson or msgspec when one is installed (both
+optional) and the standard library otherwise; AGEXTRACT_JSON_BACKEND picks
+one explicitly. Text a fast decoder rejects but json.loads accepts (NaN,
+lone surrogates) is decoded again by the standard library, so results
+match json.loads (except that orjson reads integers beyond 64 bits as
+floats) and errors are always ValueError.
+"""
+import json
+from json.encoder import encode_basestring_ascii
+
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional dependency
+    msgspec = None
+
+# Backends in order of preference
+BACKENDS = ('orjson', 'msgspec', 'json')
+
+
+def _with_fallback(decode, errors):
+    def loads(text):
+        try:
+            return decode(text)
+        except errors:
+            return json.loads(text)
+    return loads
+
+
+_LOADS = {'json': json.loads}
+if orjson is not None:
+    _LOADS['orjson'] = _with_fallback(orjson.loads, orjson.JSONDecodeError)
+if msgspec is not None:
+    _LOADS['msgspec'] = _with_fallback(msgspec.json.decode, msgspec.DecodeError)
+
+
+def backend():
+    name = getattr(settings, 'AGEXTRACT_JSON_BACKEND', None)
+    if name is None:
+        return next(name for name in BACKENDS if name in _LOADS)
+    if name not in BACKENDS:
+        raise RuntimeError(f"AGEXTRACT_JSON_BACKEND must be one of {', '.join(BACKENDS)}, not {name!r}")
+    if name not in _LOADS:
+        raise RuntimeError(f"AGEXTRACT_JSON_BACKEND is {name!r} but the {name} package is not installed")
+    return name
+
+
+def get_loads():
+    """
+    The configured backend's decode function: str or bytes in, Python
+    objects out, like json.loads. Parsers look it up once per transcript.
+    """
+    return _LOADS[backend()]
+
+
+class _Truncated(Exception):
+    pass
+
+
+def dumps_truncated(obj, limit):
+    """
+    ``json.dumps(obj)[:limit]`` for decoded JSON data, without encoding more
+    of ``obj`` than the first ``limit`` characters need: the walk stops at
+    the limit, and long strings are cut before they are escaped.
+    """
+    parts = []
+    budget = limit
+
+    def emit(text):
+        nonlocal budget
+        parts.append(text)
+        budget -= len(text)
+        if budget <= 0:
+            raise _Truncated
+
+    def encode(value):
+        if isinstance(value, str):
+            # Escaping never shortens text, so a prefix of the string
+            # escapes to a prefix of the full encoding
+            emit(encode_basestring_ascii(value[:budget]))
+        elif isinstance(value, dict):
+            emit('{')
+            for i, (key, item) in enumerate(value.items()):
+                if i:
+                    emit(', ')
+                if not isinstance(key, str):
+                    key = _scalar(key)
+                emit(encode_basestring_ascii(key[:budget]))
+                emit(': ')
+                encode(item)
+            emit('}')
+        elif isinstance(value, (list, tuple)):
+            emit('[')
+            for i, item in enumerate(value):
+                if i:
+                    emit(', ')
+                encode(item)
+            emit(']')
+        else:
+            emit(_scalar(value))
+
+    try:
+        encode(obj)
+    except _Truncated:
+        pass
+    return ''.join(parts)[:limit]
+
+
+def _scalar(value):
+    if isinstance(value, float) and value == value and value not in (float('inf'), float('-inf')):
+        return float.__repr__(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return int.__repr__(value)
+    # null, true, false, NaN, Infinity; TypeError for anything that isn't JSON
+    return json.dumps(value)
@@ -0,0 +1,171 @@
+"""Streaming readers shared by the transcript parsers."""
+import hashlib
+import io
+import itertools
+
+# Uploads are read in chunks of this size when streaming from a file.
+CHUNK_SIZE = 64 * 1024
+
+# Approximate size of the text blocks handed to block-based parsers.
+BLOCK_SIZE = 1024 * 1024
+
+
+def iter_chunks(source, chunk_size=CHUNK_SIZE):
+    """
+    Yield raw byte chunks from str, bytes, a Django UploadedFile, any binary
+    file-like object, or an iterable of byte chunks.
+    """
+    if isinstance(source, str):
+        source = source.encode('utf-8')
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    if hasattr(source, 'chunks'):
+        yield from source.chunks(chunk_size)
+        return
+    if not hasattr(source, 'read'):
+        yield from source
+        return
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def iter_lines(source, chunk_size=CHUNK_SIZE):
+    """
+    Yield decoded text lines (without the trailing newline) from ``source``.
+
+    Binary input is split on raw newline bytes and each line is decoded on
+    its own, so only the current line is held in memory no matter how large
+    the upload is. Splitting before decoding is safe for UTF-8 because a
+    newline byte never appears inside a multi-byte sequence.
+    """
+    if isinstance(source, str):
+        for line in io.StringIO(source):
+            yield line[:-1] if line.endswith('\n') else line
+        return
+
+    pending = bytearray()
+    for chunk in iter_chunks(source, chunk_size):
+        start = 0
+        while True:
+            newline = chunk.find(b'\n', start)
+            if newline == -1:
+                pending += chunk[start:]
+                break
+            if pending:
+                pending += chunk[start:newline]
+                line = bytes(pending)
+                pending.clear()
+            else:
+                line = chunk[start:newline]
+            yield line.decode('utf-8')
+            start = newline + 1
+    if pending:
+        yield pending.decode('utf-8')
+
+
+def iter_text_blocks(source, block_size=BLOCK_SIZE):
+    """
+    Yield decoded text from ``source`` in blocks of about ``block_size``
+    bytes. Every block but the last ends with a newline, so no line is
+    split between blocks; as in iter_lines, cutting the bytes at a newline
+    never splits a UTF-8 sequence.
+    """
+    pending = bytearray()
+    for chunk in iter_chunks(source):
+        pending += chunk
+        if len(pending) >= block_size:
+            cut = pending.rfind(b'\n') + 1
+            if cut:
+                yield pending[:cut].decode('utf-8')
+                del pending[:cut]
+    if pending:
+        yield pending.decode('utf-8')
+
+
+def peek_lines(source, count, max_bytes=CHUNK_SIZE):
+    """
+    Read ahead in ``source`` to its first ``count`` non-blank lines. Returns
+    those lines and a chunk iterator that still yields the whole input.
+    Stops early, after at least one whole line, once ``max_bytes`` are read.
+    """
+    chunks = iter_chunks(source)
+    head = bytearray()
+    lines = []
+    for chunk in chunks:
+        head += chunk
+        if b'\n' not in chunk:
+            continue
+        lines = [line for line in head.split(b'\n')[:-1] if line.strip()]
+        if len(lines) >= count or (lines and len(head) >= max_bytes):
+            break
+    else:
+        # End of input: the last line needs no newline
+        lines = [line for line in head.split(b'\n') if line.strip()]
+    head = bytes(head)
+    return [line.decode('utf-8') for line in lines[:count]], itertools.chain([head], chunks)
+
+
+class CompleteLinesReader:
+    """
+    Binary file-like view of ``source`` that ends after its last newline,
+    so a line still being written by the source tool is left for the next
+    append. The first ``skip`` bytes are discarded; ``consumed`` counts the
+    bytes returned so far.
+    """
+
+    def __init__(self, source, skip=0, chunk_size=CHUNK_SIZE):
+        self._chunks = iter_chunks(source, chunk_size)
+        self._skip = skip
+        self._held = bytearray()
+        self.consumed = 0
+
+    def read(self, size=-1):
+        # ``size`` is advisory: whole chunks are returned, cut at a newline
+        for chunk in self._chunks:
+            if self._skip:
+                skipped = min(self._skip, len(chunk))
+                self._skip -= skipped
+                chunk = chunk[skipped:]
+            newline = chunk.rfind(b'\n')
+            if newline == -1:
+                self._held += chunk
+                continue
+            data = bytes(self._held) + chunk[:newline + 1]
+            self._held = bytearray(chunk[newline + 1:])
+            self.consumed += len(data)
+            return data
+        return b''
+
+
+class HashingStream:
+    """
+    Passes the chunks of ``source`` (anything iter_chunks accepts) through
+    while taking their SHA-256, so an upload is hashed in the same pass that
+    parses or spools it. iter_chunks() reads it through chunks(), which
+    picks up where an earlier, abandoned iteration stopped.
+    """
+
+    def __init__(self, source, name=None):
+        self.source = source
+        self.name = name if name is not None else getattr(source, 'name', '')
+        # Bytes passed through so far
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._chunks = None
+
+    def chunks(self, chunk_size=CHUNK_SIZE):
+        if self._chunks is None:
+            self._chunks = iter_chunks(self.source, chunk_size)
+        for chunk in self._chunks:
+            self._digest.update(chunk)
+            self.size += len(chunk)
+            yield chunk
+
+    def hexdigest(self):
+        """The hex digest of the whole source, reading whatever is left."""
+        for _ in self.chunks():
+            pass
+        return self._digest.hexdigest()
@@ -0,0 +1,105 @@
+import re
+
+from .base import SourceParser, build_step
+
+# Every line that starts a new step, found in one pass over a block of text:
+# a role heading ("User:", "## Assistant", "Human Input", ...) or a
+# standalone "*...*" tool line. [^\S\n] is whitespace within the line.
+MARKER_RE = re.compile(
+    r'^[^\S\n]*(?:'
+    r'(?:#+[^\S\n]*)?(?:(?P<user>User|Human)|Agent|Assistant|AI)'
+    r'|(?P<tool>\*[^\n]+\*)[^\S\n]*$'
+    r')',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Lines joined into one block when the parser is fed lines
+LINES_PER_BLOCK = 4096
+
+
+class MarkdownParser(SourceParser):
+    """
+    Fallback for transcripts no registered parser recognises: markdown
+    with "User:"/"Agent:"-style role headings.
+
+    Works on large blocks of text rather than line by line: MARKER_RE finds
+    the headings and tool lines of a whole block, and step bodies are sliced
+    out of the block between them.
+    """
+
+    source = 'upload'
+    reads_blocks = True
+
+    def iter_steps(self, lines, start_order=1):
+        return self.iter_block_steps(join_lines(lines), start_order)
+
+    def iter_block_steps(self, blocks, start_order=1):
+        """
+        Parses markdown transcripts (e.g. Claude chat exports) into steps.
+
+        A role heading line starts a step of that role and is itself
+        dropped; a tool line is a step of its own, and what follows it is
+        the agent's. Text before the first heading or tool line is kept and
+        becomes part of the first step.
+        """
+        order = start_order
+        role = None
+        # Slices of the current step's body, possibly from several blocks
+        pieces = []
+
+        for block in blocks:
+            pos = 0
+            for match in MARKER_RE.finditer(block):
+                start = match.start()
+                if start > pos:
+                    text = block[pos:start]
+                    # Blank lines only matter between other text
+                    if pieces or not text.isspace():
+                        pieces.append(text)
+                if pieces and role:
+                    content = ''.join(pieces).strip()
+                    if content:
+                        yield build_step(role, content, order)
+                        order += 1
+                    pieces = []
+
+                tool = match.group('tool')
+                if tool is not None:
+                    # build_step() inlined for the most common kind of step
+                    yield {
+                        'role': 'agent',
+                        'step_type': 'diff' if '```diff' in tool or '<<<<<<<' in tool else 'tool_call',
+                        'content': tool,
+                        'order': order,
+                    }
+                    order += 1
+                    role = 'agent'
+                    # The match ends at the line's newline
+                    pos = match.end() + 1
+                else:
+                    role = 'user' if match.group('user') else 'agent'
+                    # The rest of a heading line is dropped
+                    line_end = block.find('\n', match.end())
+                    pos = len(block) if line_end == -1 else line_end + 1
+
+            if pos < len(block):
+                text = block[pos:]
+                if pieces or not text.isspace():
+                    pieces.append(text)
+
+        if role and pieces:
+            content = ''.join(pieces).strip()
+            if content:
+                yield build_step(role, content, order)
+
+
+def join_lines(lines):
+    """Group a line iterator into text blocks for iter_block_steps()."""
+    block = []
+    for line in lines:
+        block.append(line)
+        if len(block) == LINES_PER_BLOCK:
+            yield '\n'.join(block) + '\n'
+            block = []
+    if block:
+        yield '\n'.join(block) + '\n'
@@ -0,0 +1,98 @@
+import re
+
+from .base import SourceParser, build_step, register
+from .markdown import join_lines
+
+ROLE_HEADINGS = {
+    '### User Input': 'user',
+    '### Planner Response': 'agent',
+}
+
+EXPORT_NOTE = 'Note: _This is purely the output of the chat conversation'
+
+# Code fences, role headings and "*...*" tool lines, found in one pass over
+# a block of text (see markdown.MARKER_RE)
+MARKER_RE = re.compile(
+    r'^[^\S\n]*(?:'
+    r'(?P<fence>```)'
+    r'|### (?:(?P<user>User Input)|Planner Response)[^\S\n]*$'
+    r'|(?P<tool>\*[^\n]+\*)[^\S\n]*$'
+    r')',
+    re.MULTILINE,
+)
+
+
+@register
+class WindsurfParser(SourceParser):
+    """
+    Windsurf (Cascade) chat export: "### User Input" and "### Planner
+    Response" headings, with each tool action on its own "*Viewed ...*"
+    line. Exports carry no per-message times or token counts.
+    """
+
+    source = 'windsurf'
+    reads_blocks = True
+
+    @classmethod
+    def sniff(cls, head):
+        for line in head:
+            line = line.strip()
+            if line in ROLE_HEADINGS or line.startswith(EXPORT_NOTE):
+                return True
+        return False
+
+    def iter_steps(self, lines, start_order=1):
+        return self.iter_block_steps(join_lines(lines), start_order)
+
+    def iter_block_steps(self, blocks, start_order=1):
+        order = start_order
+        role = None
+        pieces = []
+        in_fence = False
+
+        for block in blocks:
+            pos = 0
+            for match in MARKER_RE.finditer(block):
+                if match.group('fence') is not None:
+                    in_fence = not in_fence
+                    continue
+                if in_fence:
+                    continue
+
+                start = match.start()
+                if start > pos:
+                    text = block[pos:start]
+                    if pieces or not text.isspace():
+                        pieces.append(text)
+                if role and pieces:
+                    content = ''.join(pieces).strip()
+                    if content:
+                        yield build_step(role, content, order)
+                        order += 1
+                pieces = []
+
+                tool = match.group('tool')
+                if tool is not None:
+                    yield {
+                        'role': 'agent',
+                        'step_type': 'diff' if '```diff' in tool or '<<<<<<<' in tool else 'tool_call',
+                        'content': tool,
+                        'order': order,
+                    }
+                    order += 1
+                    # Text after a tool action is the agent's
+                    role = 'agent'
+                else:
+                    role = 'user' if match.group('user') else 'agent'
+                # Both kinds of match end at the line's newline
+                pos = match.end() + 1
+
+            if pos < len(block):
+                text = block[pos:]
+                if pieces or not text.isspace():
+                    pieces.append(text)
+
+        if role and pieces:
+            content = ''.join(pieces).strip()
+            if content:
+                yield build_step(role, content, order)
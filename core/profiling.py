@@ -0,0 +1,307 @@
+"""
+Per-request profiling: SQL query count, database time, template render
+time and (optionally) the process's peak memory.
+
+ProfilingMiddleware measures every request and attaches the result to
+the response as ``response.profile``. Where it goes from there is set in
+settings (AGEXTRACT_PROFILE_*):
+
+- in DEBUG, a ``Server-Timing`` header (shown in the browser's network
+  panel) and an ``X-Query-Count`` header;
+- AGEXTRACT_PROFILE_LOG appends one JSON line per request to a file,
+  which is safe with several workers writing to it;
+- AGEXTRACT_METRICS_ENABLED serves per-view totals at /metrics in the
+  Prometheus text format. The totals are per process, so with several
+  workers scrape each one or use the log instead.
+
+Views declare how many queries they may run with @query_budget, whatever
+the size of the data they show; going over it is logged, and tests check
+it with assert_within_query_budget(). Budgets catch N+1 patterns (a query
+per step or per tag) that a small test fixture would not otherwise show.
+Queries run while a streaming response is consumed are not counted.
+
+Template time is measured by the ProfiledTemplates backend, set as the
+BACKEND in TEMPLATES. The memory peak comes from tracemalloc, which traces
+the whole process: with several requests in flight on threads it includes
+their allocations too, so it is reported as ``process_peak_memory`` and is
+an upper bound for any one request.
+"""
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+_current = threading.local()
+
+
+def query_budget(queries):
+    """Declare the most queries a view may run, middleware included."""
+    def decorator(view):
+        view.query_budget = queries
+        return view
+    return decorator
+
+
+class RequestProfile:
+    __slots__ = ('view', 'queries', 'db_time', 'template_time', 'total_time', 'process_peak_memory',
+                 'budget', '_template_depth')
+
+    def __init__(self):
+        self.view = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.total_time = 0.0
+        # Peak bytes traced in the whole process while this request ran, or
+        # None when memory profiling is off
+        self.process_peak_memory = None
+        self.budget = None
+        self._template_depth = 0
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.queries > self.budget
+
+    def server_timing(self):
+        timings = [
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ]
+        return ', '.join(timings)
+
+    def as_dict(self):
+        return {
+            'view': self.view,
+            'queries': self.queries,
+            'budget': self.budget,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+            'process_peak_memory': self.process_peak_memory,
+        }
+
+    def __call__(self, execute, sql, params, many, context):
+        # Database execute wrapper (see ProfilingMiddleware)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = getattr(_current, 'profile', None)
+        # A template rendered by a tag of another is part of its time
+        if profile is None or profile._template_depth:
+            return super().render(context, request)
+        profile._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_time += time.perf_counter() - start
+            profile._template_depth -= 1
+
+
+class ProfiledTemplates(DjangoTemplates):
+    """The Django template backend, timing renders for profiled requests."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name).template, self)
+
+
+class ViewMetrics:
+    """Per-view request totals of this process, for /metrics."""
+    SUMMARIES = {
+        'queries': ('agextract_request_queries', "SQL queries per request"),
+        'db_time': ('agextract_request_db_seconds', "Database time per request"),
+        'template_time': ('agextract_request_template_seconds', "Template render time per request"),
+        'total_time': ('agextract_request_seconds', "Total time per request"),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, profile):
+        with self._lock:
+            totals = self._views.setdefault(profile.view, dict.fromkeys(self.SUMMARIES, 0))
+            totals['count'] = totals.get('count', 0) + 1
+            for field in self.SUMMARIES:
+                totals[field] += getattr(profile, field)
+            if profile.over_budget:
+                totals['over_budget'] = totals.get('over_budget', 0) + 1
+            if profile.process_peak_memory is not None:
+                totals['process_peak_memory'] = max(totals.get('process_peak_memory', 0), profile.process_peak_memory)
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def exposition(self):
+        """The totals in the Prometheus text format."""
+        with self._lock:
+            views = {view: dict(totals) for view, totals in self._views.items()}
+        lines = []
+        for field, (name, help_text) in self.SUMMARIES.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+            for view, totals in sorted(views.items()):
+                lines.append(f'{name}_sum{{view="{view}"}} {totals[field]}')
+                lines.append(f'{name}_count{{view="{view}"}} {totals["count"]}')
+        lines += [
+            "# HELP agextract_request_over_query_budget_total Requests that ran more queries than their budget",
+            "# TYPE agextract_request_over_query_budget_total counter",
+        ]
+        for view, totals in sorted(views.items()):
+            lines.append(f'agextract_request_over_query_budget_total{{view="{view}"}} {totals.get("over_budget", 0)}')
+        peaks = [
+            (view, totals['process_peak_memory'])
+            for view, totals in sorted(views.items()) if 'process_peak_memory' in totals
+        ]
+        if peaks:
+            lines += [
+                "# HELP agextract_process_peak_memory_bytes Largest traced memory peak of the process "
+                "during a request, concurrent requests included",
+                "# TYPE agextract_process_peak_memory_bytes gauge",
+            ]
+            lines += [f'agextract_process_peak_memory_bytes{{view="{view}"}} {peak}' for view, peak in peaks]
+        return '\n'.join(lines) + '\n'
+
+
+metrics = ViewMetrics()
+_log_lock = threading.Lock()
+
+# Whether tracemalloc was started here (and so may be stopped here), and
+# how many traced requests are in flight
+_tracing_started = False
+_traced_requests = 0
+_tracing_lock = threading.Lock()
+
+
+def _start_memory_trace():
+    """
+    Start or stop tracemalloc to follow AGEXTRACT_PROFILE_MEMORY and return
+    whether this request is traced; if so, _end_memory_trace() must follow.
+    Tracing started elsewhere is left alone.
+
+    The peak is process-wide, so it is only reset when no other traced
+    request is in flight; resetting it under one would lose that
+    request's peak.
+    """
+    global _tracing_started, _traced_requests
+    with _tracing_lock:
+        if getattr(settings, 'AGEXTRACT_PROFILE_MEMORY', False):
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracing_started = True
+            if not _traced_requests:
+                tracemalloc.reset_peak()
+            _traced_requests += 1
+            return True
+        if _tracing_started and not _traced_requests:
+            tracemalloc.stop()
+            _tracing_started = False
+        return False
+
+
+def _end_memory_trace():
+    """The process's peak traced memory since the oldest traced request in flight started."""
+    global _traced_requests
+    with _tracing_lock:
+        _traced_requests -= 1
+        return tracemalloc.get_traced_memory()[1]
+
+
+def _view_name(request):
+    match = request.resolver_match
+    return match.view_name if match is not None else 'unresolved'
+
+
+def _log(profile, request, response):
+    path = getattr(settings, 'AGEXTRACT_PROFILE_LOG', None)
+    if not path:
+        return
+    line = json.dumps({
+        'time': time.time(), 'method': request.method, 'path': request.path,
+        'status': response.status_code, **profile.as_dict(),
+    })
+    with _log_lock, open(path, 'a') as log:
+        log.write(line + '\n')
+
+
+class ProfilingMiddleware:
+    """
+    Profile each request. Goes first in MIDDLEWARE, so queries run by the
+    other middleware (sessions, authentication) count too.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        trace_memory = _start_memory_trace()
+
+        _current.profile = profile
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current.profile = None
+            if trace_memory:
+                profile.process_peak_memory = _end_memory_trace()
+        profile.total_time = time.perf_counter() - start
+
+        profile.view = _view_name(request)
+        if request.resolver_match is not None:
+            profile.budget = getattr(request.resolver_match.func, 'query_budget', None)
+        if profile.over_budget:
+            logger.warning("%s ran %d queries, over its budget of %d", profile.view, profile.queries, profile.budget)
+
+        response.profile = profile
+        if settings.DEBUG:
+            response['Server-Timing'] = profile.server_timing()
+            response['X-Query-Count'] = str(profile.queries)
+            if profile.process_peak_memory is not None:
+                response['X-Process-Peak-Memory'] = str(profile.process_peak_memory)
+        if getattr(settings, 'AGEXTRACT_METRICS_ENABLED', False):
+            metrics.record(profile)
+        _log(profile, request, response)
+        return response
+
+
+def metrics_view(request):
+    if not getattr(settings, 'AGEXTRACT_METRICS_ENABLED', False):
+        raise Http404
+    return HttpResponse(metrics.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def assert_within_query_budget(response):
+    """
+    Fail (AssertionError) when the view behind a test client response ran
+    more queries than its @query_budget, or declares none.
+    """
+    profile = getattr(response, 'profile', None)
+    if profile is None:
+        raise AssertionError("Response was not profiled; is ProfilingMiddleware installed?")
+    if profile.budget is None:
+        raise AssertionError(f"{profile.view} declares no query budget")
+    if profile.over_budget:
+        raise AssertionError(f"{profile.view} ran {profile.queries} queries, over its budget of {profile.budget}")
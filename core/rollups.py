@@ -0,0 +1,124 @@
+"""
+Incremental maintenance of the per-user profile rollups
+(UserProfileStats and UserDailyActivity).
+
+Ingest adds each session's counts once (via StepWriter), deleting a
+session subtracts them again, and tagging bumps the tag counter. The
+profile view then renders from one stats row and a one-year range of
+daily buckets, however much history the user has.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Session, SteeringTag, Step, UserDailyActivity, UserProfileStats
+
+
+def _bump(counts, key, delta):
+    counts[key] = counts.get(key, 0) + delta
+    if not counts[key]:
+        del counts[key]
+
+
+def _apply(user_id, delta):
+    """Add a rollup delta (see _empty_delta) to ``user_id``'s rows."""
+    with transaction.atomic():
+        stats, _ = UserProfileStats.objects.select_for_update().get_or_create(user_id=user_id)
+        stats.session_count += delta['sessions']
+        stats.step_count += sum(delta['roles'].values())
+        stats.tag_count += delta['tags']
+        stats.version += 1
+        for field, key in (('role_counts', 'roles'), ('step_type_counts', 'step_types'), ('source_counts', 'sources')):
+            counts = getattr(stats, field)
+            for name, value in delta[key].items():
+                _bump(counts, name, value)
+        stats.save()
+
+        for day, sessions in delta['days'].items():
+            if not sessions:
+                continue
+            updated = UserDailyActivity.objects.filter(user_id=user_id, date=day).update(
+                session_count=F('session_count') + sessions,
+            )
+            if not updated:
+                UserDailyActivity.objects.create(user_id=user_id, date=day, session_count=sessions)
+
+
+def _empty_delta():
+    return {
+        'sessions': 0, 'tags': 0, 'days': Counter(),
+        'roles': Counter(), 'step_types': Counter(), 'sources': Counter(),
+    }
+
+
+def record_ingest(stats_list):
+    """
+    Add freshly written steps (and newly created sessions) to their owners'
+    rollups. ``stats_list`` holds core.ingest.SessionStats objects; deltas
+    are merged per user so a batch costs one update per user.
+    """
+    deltas = defaultdict(_empty_delta)
+    for stats in stats_list:
+        session = stats.session
+        if session.user_id is None:
+            continue
+        delta = deltas[session.user_id]
+        if stats.new:
+            delta['sessions'] += 1
+            delta['sources'][session.source] += 1
+            delta['days'][timezone.localdate(session.uploaded_at)] += 1
+        delta['roles'].update(stats.role_counts)
+        delta['step_types'].update(stats.step_type_counts)
+
+    for user_id, delta in deltas.items():
+        _apply(user_id, delta)
+
+
+def record_session_deleted(session):
+    """Subtract a session that is about to be deleted from its owner's rollups."""
+    if session.user_id is None:
+        return
+    steps = Step.objects.filter(session=session)
+    delta = _empty_delta()
+    delta['sessions'] = -1
+    delta['tags'] = -SteeringTag.objects.filter(step__session=session).count()
+    delta['sources'][session.source] = -1
+    delta['days'][timezone.localdate(session.uploaded_at)] = -1
+    for row in steps.values('role').annotate(n=Count('id')).order_by():
+        delta['roles'][row['role']] = -row['n']
+    for row in steps.values('step_type').annotate(n=Count('id')).order_by():
+        delta['step_types'][row['step_type']] = -row['n']
+    _apply(session.user_id, delta)
+
+
+def record_tag_added(session):
+    if session.user_id is not None:
+        UserProfileStats.objects.filter(user_id=session.user_id).update(
+            tag_count=F('tag_count') + 1, version=F('version') + 1, updated_at=timezone.now(),
+        )
+
+
+def rebuild_user_stats(user):
+    """Recompute a user's rollups from scratch (used for backfills and repair)."""
+    with transaction.atomic():
+        UserProfileStats.objects.filter(user=user).delete()
+        UserDailyActivity.objects.filter(user=user).delete()
+
+        sessions = Session.objects.filter(user=user)
+        steps = Step.objects.filter(session__user=user)
+        delta = _empty_delta()
+        delta['sessions'] = sessions.count()
+        delta['tags'] = SteeringTag.objects.filter(step__session__user=user).count()
+        for row in sessions.values('source').annotate(n=Count('id')).order_by():
+            delta['sources'][row['source']] = row['n']
+        # Days in the current time zone, as timezone.localdate() gives for new sessions
+        for row in sessions.annotate(day=TruncDate('uploaded_at')).values('day').annotate(n=Count('id')).order_by():
+            delta['days'][row['day']] = row['n']
+        for row in steps.values('role').annotate(n=Count('id')).order_by():
+            delta['roles'][row['role']] = row['n']
+        for row in steps.values('step_type').annotate(n=Count('id')).order_by():
+            delta['step_types'][row['step_type']] = row['n']
+        _apply(user.pk, delta)
@@ -0,0 +1,210 @@
+"""
+Full-text search over step content.
+
+On SQLite every step is indexed in the ``core_step_fts`` FTS5 table (see
+migrations 0009 and 0016). Triggers keep it in sync with inserts, updates
+and deletes on core_step, indexing offloaded steps with the full body from
+their blob rather than the inline preview. The table's ``owner`` column
+holds a ``u<user_id>`` token so that scoping a search to one user is part
+of the full-text match instead of a filter over every hit.
+
+The table is contentless: it holds only the index, not a copy of every
+body, so compressed blobs stay compressed. Snippets are cut from the steps
+themselves, and the triggers read step bodies through the
+``agextract_step_text()`` SQL function, which CoreConfig registers on every
+SQLite connection. Writes to core_step therefore have to go through Django.
+
+Other databases fall back to a case-insensitive substring scan.
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from . import blobs
+from .models import Step
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'core_step_fts'
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# By default only the most recent matches are ranked (see rank_window()).
+# Ranking dominates query time for very common terms; below this many
+# matches results are fully ranked.
+DEFAULT_RANK_WINDOW = 1000
+
+# Control characters (NUL ends an FTS5 string early) separate terms like spaces
+_CONTROL_CHARS = re.compile(r'[\x00-\x1f\x7f]')
+
+# SQLite errors that mean FTS5 could not parse the MATCH expression
+_FTS_QUERY_ERRORS = ('fts5: syntax error', 'unterminated string', 'unknown special query')
+
+# SQL function the FTS triggers read a step's full body with
+STEP_TEXT_FUNCTION = 'agextract_step_text'
+
+# Characters used to delimit matches in raw snippets. They are swapped for
+# <mark> tags only after the snippet has been HTML-escaped.
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def step_text(content, codec, data):
+    """A step's full body from its row and its blob's (codec, data), if any."""
+    if data is None:
+        return content
+    return blobs.decompress(codec, data)
+
+
+def register_step_text(sender, connection, **kwargs):
+    """connection_created receiver: define agextract_step_text() on SQLite."""
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function(STEP_TEXT_FUNCTION, 3, step_text, deterministic=True)
+
+
+def rank_window():
+    """How many of the newest matches are ranked; None ranks every match."""
+    return getattr(settings, 'AGEXTRACT_SEARCH_RANK_WINDOW', DEFAULT_RANK_WINDOW)
+
+
+def owner_token(user_id):
+    """The token stored in the FTS owner column for ``user_id``."""
+    return f"u{user_id or 0}"
+
+
+def parse_terms(query):
+    """Split a search box query into terms; a trailing ``*`` marks a prefix."""
+    return [term for term in _CONTROL_CHARS.sub(' ', query).split() if term.strip('*')]
+
+
+def build_match_query(terms, user_id):
+    """
+    FTS5 MATCH expression requiring every term in the content column and the
+    owner token in the owner column. Terms are quoted so user input can't
+    inject FTS5 syntax.
+    """
+    phrases = []
+    for term in terms:
+        prefix = term.endswith('*')
+        phrase = '"%s"' % term.rstrip('*').replace('"', '""')
+        phrases.append(phrase + '*' if prefix else phrase)
+    return 'owner : "%s" AND content : (%s)' % (owner_token(user_id), ' '.join(phrases))
+
+
+def highlight(snippet):
+    """Escape a raw snippet and turn its match delimiters into <mark> tags."""
+    html = escape(snippet).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+    return mark_safe(html)
+
+
+def search_steps(query, user, limit=DEFAULT_LIMIT):
+    """
+    Search the steps of ``user``'s sessions, best match first.
+
+    Returns a list of dicts with the step, its session and an HTML-safe
+    snippet in which matches are wrapped in <mark>.
+    """
+    terms = parse_terms(query)
+    if not terms or user is None:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+    if fts_enabled():
+        ranked = _fts_search(terms, user.pk, limit)
+    else:
+        ranked = _scan_search(terms, user.pk, limit)
+
+    steps = Step.objects.select_related('session').only(
+        'id', 'role', 'step_type', 'order',
+        'session__id', 'session__title', 'session__source',
+    ).in_bulk([step_id for step_id, _, _ in ranked])
+    return [
+        {
+            'step': steps[step_id],
+            'session': steps[step_id].session,
+            'snippet': highlight(snippet),
+            'rank': rank,
+        }
+        for step_id, snippet, rank in ranked
+        if step_id in steps
+    ]
+
+
+def _fts_search(terms, user_id, limit):
+    """
+    (step_id, raw snippet, bm25 rank) for the best FTS matches; none if
+    FTS5 rejects the query.
+    """
+    match = build_match_query(terms, user_id)
+    try:
+        return _fts_ranked(terms, match, limit)
+    except OperationalError as exc:
+        if not str(exc).startswith(_FTS_QUERY_ERRORS):
+            raise
+        logger.warning("Search query %r rejected by FTS5: %s", match, exc)
+        return []
+
+
+def _fts_ranked(terms, match, limit):
+    window = rank_window()
+    with connection.cursor() as cursor:
+        if window is None:
+            cursor.execute(
+                f"SELECT rowid, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s",
+                [match, limit],
+            )
+        else:
+            cursor.execute(
+                f"SELECT rowid, rank FROM ("
+                f"SELECT rowid, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY rowid DESC LIMIT %s"
+                f") ORDER BY rank LIMIT %s",
+                [match, max(window, limit), limit],
+            )
+        ranks = dict(cursor.fetchall())
+    if not ranks:
+        return []
+    # The index holds no content; snippets come from the matching steps only
+    texts = {
+        step_id: step_text(content, codec, data)
+        for step_id, content, codec, data in Step.objects.filter(pk__in=ranks).values_list(
+            'id', 'content', 'blob__codec', 'blob__data',
+        )
+    }
+    return [
+        (step_id, make_snippet(texts.get(step_id, ''), terms), rank)
+        for step_id, rank in sorted(ranks.items(), key=lambda item: item[1])
+    ]
+
+
+def _scan_search(terms, user_id, limit):
+    """Substring fallback for databases without FTS5; newest sessions first."""
+    steps = Step.objects.filter(session__user_id=user_id)
+    for term in terms:
+        steps = steps.filter(content__icontains=term.rstrip('*'))
+    steps = steps.order_by('-session__uploaded_at', 'order').values_list('id', 'content')
+    return [
+        (step_id, make_snippet(content, terms), 0.0)
+        for step_id, content in steps[:limit]
+    ]
+
+
+def make_snippet(content, terms, width=160):
+    """A raw snippet of ``content`` around the first match of any term."""
+    pattern = re.compile('|'.join(re.escape(term.rstrip('*')) for term in terms), re.IGNORECASE)
+    first = pattern.search(content)
+    start = max(0, first.start() - width // 2) if first else 0
+    window = content[start:start + width]
+    snippet = pattern.sub(lambda m: _MARK_START + m.group(0) + _MARK_END, window)
+    if start > 0:
+        snippet = '…' + snippet
+    if start + width < len(content):
+        snippet += '…'
+    return snippet
@@ -0,0 +1,11 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from . import rollups
+from .models import Session
+
+
+@receiver(pre_delete, sender=Session)
+def remove_session_from_rollups(sender, instance, **kwargs):
+    # pre_delete: the session's steps are still there to be counted
+    rollups.record_session_deleted(instance)
@@ -1,6 +1,10 @@
+from unittest import skipUnless
+
+from django.db import connection
 from django.test import TestCase, Client
 from django.urls import reverse
 from core.models import Session
+import json
 import os
 
 class AgExtractFlowTest(TestCase):
@@ -73,3 +77,949 @@ class AgExtractFlowTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "Card Content")
         self.assertContains(response, "Human") # Check for role label in card
+
+
+class StreamingParserTest(TestCase):
+    def test_iter_lines_splits_across_chunks(self):
+        import io
+        from core.parser import iter_lines
+        data = "first\nsecond — ünïcode\n\nlast".encode('utf-8')
+        # A tiny chunk size forces lines and multi-byte characters to span chunks
+        lines = list(iter_lines(io.BytesIO(data), chunk_size=3))
+        self.assertEqual(lines, ["first", "second — ünïcode", "", "last"])
+
+    def test_complete_lines_reader_holds_back_partial_line(self):
+        import io
+        from core.parser import CompleteLinesReader, iter_lines
+        reader = CompleteLinesReader(io.BytesIO(b"seen\nnew one\nnew two\nhalf"), skip=5, chunk_size=4)
+        self.assertEqual(list(iter_lines(reader)), ["new one", "new two"])
+        self.assertEqual(reader.consumed, len(b"new one\nnew two\n"))
+
+    def test_iter_steps_is_lazy(self):
+        import io
+        from core.parser import TranscriptParser
+        data = b'{"type": "user", "message": {"content": "hi"}}\n' * 3
+        steps = TranscriptParser(io.BytesIO(data)).iter_steps()
+        first = next(steps)
+        self.assertEqual(first['role'], 'user')
+        self.assertEqual(first['order'], 1)
+        self.assertEqual(len(list(steps)), 2)
+
+    def test_parse_jsonl_from_file_object(self):
+        import io
+        from core.parser import TranscriptParser
+        data = (
+            b'\n{"type": "user", "message": {"content": "Build it"}}\n'
+            b'{"type": "assistant", "message": {"content": [{"type": "tool_use", "name": "Edit", "input": {}}]}}\n'
+        )
+        session = TranscriptParser(io.BytesIO(data)).parse(title="Streamed")
+        steps = list(session.steps.values_list('role', 'step_type'))
+        self.assertEqual(steps, [('user', 'prompt'), ('agent', 'tool_call')])
+
+
+class SourceParserTest(TestCase):
+    TESTDATA = os.path.join(os.path.dirname(__file__), 'testdata')
+    FIXTURES = {
+        'claudecode.jsonl': ('claudecode', 5),
+        'cursor.md': ('cursor', 4),
+        'windsurf.md': ('windsurf', 8),
+        'copilot.json': ('copilot', 5),
+    }
+
+    def _read(self, name, copies=1):
+        import json
+        with open(os.path.join(self.TESTDATA, name), 'rb') as f:
+            data = f.read()
+        if name.endswith('.json'):
+            doc = json.loads(data)
+            doc['requests'] = doc['requests'] * copies
+            return json.dumps(doc).encode('utf-8')
+        return data * copies
+
+    def test_fixtures_pick_their_parser(self):
+        from core.parser import TranscriptParser
+        for name, (source, step_count) in self.FIXTURES.items():
+            with self.subTest(name):
+                parser = TranscriptParser(self._read(name))
+                steps = list(parser.iter_steps())
+                self.assertEqual(parser.parser.source, source)
+                self.assertEqual(len(steps), step_count)
+                self.assertEqual([step['order'] for step in steps], list(range(1, step_count + 1)))
+
+    def test_claude_code_metadata(self):
+        from core.parser import TranscriptParser
+        session = TranscriptParser(self._read('claudecode.jsonl')).parse(title="health")
+        self.assertEqual(session.source, 'claudecode')
+        # msg_01's usage is logged on both of its entries but counted once
+        self.assertEqual(session.token_usage, 120 + 300 + 40 + 200 + 50 + 30)
+        self.assertEqual(session.duration_seconds, 90)
+        first = session.steps.first()
+        self.assertEqual(first.timestamp.isoformat(), '2025-06-01T09:00:00+00:00')
+
+    def test_copilot_timings(self):
+        from core.parser import TranscriptParser
+        session = TranscriptParser(self._read('copilot.json')).parse(title="copilot")
+        self.assertEqual(session.duration_seconds, 64)
+        self.assertEqual(
+            list(session.steps.values_list('role', 'step_type')),
+            [('user', 'prompt'), ('agent', 'tool_call'), ('agent', 'text'),
+             ('user', 'prompt'), ('agent', 'text')],
+        )
+
+    def test_cursor_rules_inside_messages_are_kept(self):
+        from core.parser import TranscriptParser
+        steps = list(TranscriptParser(self._read('cursor.md')).iter_steps())
+        self.assertEqual(steps[1]['step_type'], 'diff')
+        self.assertIn('---\n\nOnly the test fixture changed.', steps[3]['content'])
+
+    def test_source_hint_is_checked_against_content(self):
+        from core.parser import TranscriptParser
+        parser = TranscriptParser(self._read('windsurf.md'))
+        parser.iter_steps(source='cursor')
+        self.assertEqual(parser.parser.source, 'windsurf')
+
+        parser = TranscriptParser(b"# User\nHi\n")
+        parser.iter_steps(source='claudecode')
+        self.assertEqual(parser.parser.source, 'upload')
+
+    def test_json_backends_agree(self):
+        from django.test import override_settings
+        from core.parser import ClaudeCodeParser, iter_lines
+        from core.parser.jsoncodec import BACKENDS, _LOADS
+        data = self._read('claudecode.jsonl') + b'{"type": "user", "message": {"content": NaN}}\n{broken\n'
+        with override_settings(AGEXTRACT_JSON_BACKEND='json'):
+            expected = list(ClaudeCodeParser().iter_steps(iter_lines(data)))
+        for name in BACKENDS:
+            if name in _LOADS:
+                with self.subTest(name), override_settings(AGEXTRACT_JSON_BACKEND=name):
+                    self.assertEqual(list(ClaudeCodeParser().iter_steps(iter_lines(data))), expected)
+
+    def test_dumps_truncated_matches_json_dumps(self):
+        import json
+        from core.parser.jsoncodec import dumps_truncated
+        doc = {
+            'file_path': 'ünï/"quoted".py', 'content': 'x = 1\n' * 10000,
+            'flags': [True, None, 1.5, float('nan'), 10 ** 30], 1: {'nested': []},
+        }
+        encoded = json.dumps(doc)
+        for limit in (0, 1, 30, 500, len(encoded), len(encoded) + 1):
+            self.assertEqual(dumps_truncated(doc, limit), encoded[:limit])
+
+    def test_block_parsers_ignore_block_boundaries(self):
+        from core.parser import MarkdownParser, WindsurfParser, iter_lines, iter_text_blocks
+        markdown = (
+            b"Preamble\n\n## User:\nFix it\n\n*Edited app.py*\n\n"
+            b"Assistant\nDone:\n```diff\n- a\n+ b\n```\nHuman Input\nThanks\n"
+        )
+        for cls, data in ((MarkdownParser, markdown), (WindsurfParser, self._read('windsurf.md'))):
+            with self.subTest(cls.__name__):
+                by_line = list(cls().iter_steps(iter_lines(data)))
+                self.assertTrue(by_line)
+                # Blocks as small as a few bytes still split on whole lines
+                for block_size in (1, 7, 1 << 20):
+                    blocks = iter_text_blocks(data, block_size=block_size)
+                    self.assertEqual(list(cls().iter_block_steps(blocks)), by_line)
+
+    def test_repeated_fixtures_parse_every_copy(self):
+        # Throughput is measured by benchmarks/bench_parsers.py on the same input
+        from core.parser import TranscriptParser
+        for name, (source, step_count) in self.FIXTURES.items():
+            with self.subTest(name):
+                data = self._read(name, copies=50)
+                self.assertEqual(sum(1 for _ in TranscriptParser(data).iter_steps()), step_count * 50)
+
+
+class StepWriterTest(TestCase):
+    def test_flushes_in_batches(self):
+        from core.ingest import StepWriter
+        from core.models import Step
+        with StepWriter(batch_size=2) as writer:
+            session = Session.objects.create(title="Batched")
+            for i in range(5):
+                writer.add(session, role='user', step_type='prompt', content=f"s{i}", order=i + 1)
+            self.assertEqual(Step.objects.filter(session=session).count(), 4)
+        self.assertEqual(writer.written, 5)
+        self.assertEqual(list(session.steps.values_list('order', flat=True)), [1, 2, 3, 4, 5])
+
+    def test_rolls_back_on_error(self):
+        from core.ingest import StepWriter
+        with self.assertRaises(RuntimeError):
+            with StepWriter() as writer:
+                session = Session.objects.create(title="Doomed")
+                writer.add(session, role='user', step_type='prompt', content="x", order=1)
+                raise RuntimeError("boom")
+        self.assertFalse(Session.objects.filter(title="Doomed").exists())
+
+    def test_drops_nul_characters(self):
+        from core.ingest import StepWriter
+        with StepWriter() as writer:
+            session = Session.objects.create(title="Binary")
+            writer.add(session, role='agent', step_type='text', content="before\x00after", order=1)
+        self.assertEqual(session.steps.get().content, "beforeafter")
+
+
+class DatabaseURLTest(TestCase):
+    def test_postgres_url_with_pool(self):
+        from agextract.database import database_from_url
+        config = database_from_url('postgres://agx:p%40ss@db:5433/agextract?sslmode=require', 60, 8)
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(
+            (config['NAME'], config['USER'], config['PASSWORD'], config['HOST'], config['PORT']),
+            ('agextract', 'agx', 'p@ss', 'db', '5433'),
+        )
+        self.assertEqual(config['OPTIONS'], {'sslmode': 'require', 'pool': {'min_size': 1, 'max_size': 8}})
+        # Django refuses persistent connections together with a pool
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+
+    def test_sqlite_paths_and_errors(self):
+        from django.core.exceptions import ImproperlyConfigured
+        from agextract.database import database_from_url
+        self.assertEqual(database_from_url('sqlite:////var/db.sqlite3')['NAME'], '/var/db.sqlite3')
+        config = database_from_url('sqlite:///db.sqlite3?timeout=5', conn_max_age=60)
+        self.assertEqual(config['NAME'], 'db.sqlite3')
+        self.assertEqual(config['OPTIONS']['timeout'], 5)
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertIn('journal_mode=WAL', config['OPTIONS']['init_command'])
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        with self.assertRaises(ImproperlyConfigured):
+            database_from_url('mysql://db/agextract')
+        with self.assertRaises(ImproperlyConfigured):
+            database_from_url('sqlite:///db.sqlite3', pool_max_size=4)
+
+
+class WriteLockTest(TestCase):
+    def test_writers_take_turns(self):
+        import threading
+        import time
+        from core.writelock import serialized_writes
+        inside = []
+        overlaps = []
+
+        def write():
+            with serialized_writes():
+                # Nested use (StepWriter inside StepWriter) must not deadlock
+                with serialized_writes():
+                    inside.append(1)
+                    if len(inside) > 1:
+                        overlaps.append(1)
+                    time.sleep(0.01)
+                    inside.pop()
+
+        threads = [threading.Thread(target=write) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(overlaps, [])
+
+    def test_lock_file_sits_next_to_the_database(self):
+        from types import SimpleNamespace
+        from core import writelock
+        connection = SimpleNamespace(is_in_memory_db=lambda: False, settings_dict={'NAME': '/srv/db.sqlite3'})
+        if writelock.fcntl is not None:
+            self.assertEqual(writelock.lock_path(connection), '/srv/db.sqlite3-writelock')
+        connection.is_in_memory_db = lambda: True
+        self.assertIsNone(writelock.lock_path(connection))
+
+
+class DeferredWriteTest(TestCase):
+    def test_steps_added_before_the_transaction_are_spilled_then_written(self):
+        from django.test import override_settings
+        from core.ingest import StepWriter
+        big = "diff line\n" * 50
+        session = Session(title="Deferred")
+        with override_settings(AGEXTRACT_STEP_INLINE_MAX_CHARS=100):
+            writer = StepWriter(batch_size=2)
+        writer.add_session(session)
+        with self.assertNumQueries(0):
+            for order in range(1, 6):
+                writer.add(session, role='agent', step_type='diff', content=big if order == 3 else f"step {order}", order=order)
+        with writer:
+            session.save()
+
+        session.refresh_from_db()
+        self.assertEqual(writer.written, 5)
+        self.assertEqual(session.step_count, 5)
+        self.assertEqual(list(session.steps.values_list('order', flat=True)), [1, 2, 3, 4, 5])
+        self.assertEqual(session.steps.get(order=3).full_content, big)
+
+    def test_uploads_are_parsed_outside_the_transaction(self):
+        import io
+        from core.parser import TranscriptParser
+        depth = len(connection.atomic_blocks)
+        depths = []
+
+        class Upload(io.BytesIO):
+            def read(self, *args):
+                depths.append(len(connection.atomic_blocks))
+                return super().read(*args)
+
+        session = TranscriptParser(Upload(b"# User\nHello\n\n# Agent\nHi\n")).parse(title="Parsed")
+        self.assertEqual(session.step_count, 2)
+        self.assertTrue(depths)
+        self.assertEqual(set(depths), {depth})
+
+
+class IngestionJobTest(TestCase):
+    def setUp(self):
+        import tempfile
+        self.spool = tempfile.TemporaryDirectory()
+        self.addCleanup(self.spool.cleanup)
+
+    def test_large_upload_is_queued_and_processed(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.test import override_settings
+        from core.jobs import run_pending_jobs
+        from core.models import IngestionJob
+
+        upload = SimpleUploadedFile("big.md", b"# User\nHello\n# Agent\nHi there\n")
+        with override_settings(AGEXTRACT_INLINE_UPLOAD_MAX_BYTES=0, AGEXTRACT_SPOOL_DIR=self.spool.name):
+            response = self.client.post(reverse('upload'), {'file': upload})
+
+        job = IngestionJob.objects.get()
+        self.assertRedirects(response, reverse('job_status', args=[job.id]))
+        self.assertEqual(job.status, 'queued')
+        self.assertFalse(Session.objects.exists())
+
+        # Pending page polls until the worker has run
+        response = self.client.get(reverse('job_status', args=[job.id]))
+        self.assertContains(response, 'hx-trigger="every 2s"')
+
+        self.assertEqual(run_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.session.steps.count(), 2)
+        self.assertEqual(job.attempts, 1)
+        self.assertFalse(os.path.exists(job.spool_path))
+
+        response = self.client.get(reverse('job_status', args=[job.id]), HTTP_HX_REQUEST='true')
+        self.assertEqual(response['HX-Redirect'], reverse('session_detail', args=[job.session_id]))
+
+    def test_failed_job_records_error(self):
+        from core.jobs import run_pending_jobs
+        from core.models import IngestionJob
+
+        job = IngestionJob.objects.create(title="gone.md", spool_path=os.path.join(self.spool.name, "missing"))
+        with self.assertLogs('core.jobs', level='ERROR'):
+            run_pending_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertTrue(job.error)
+
+    def test_failed_job_removes_spooled_upload(self):
+        from unittest import mock
+        from core.jobs import run_pending_jobs
+        from core.models import IngestionJob
+
+        spool_path = os.path.join(self.spool.name, "binary.upload")
+        with open(spool_path, 'wb') as f:
+            f.write(b"\x00\x01 not a transcript\n")
+        job = IngestionJob.objects.create(title="binary.bin", spool_path=spool_path)
+        with mock.patch('core.jobs.TranscriptParser.parse', side_effect=ValueError("unparseable")):
+            with self.assertLogs('core.jobs', level='ERROR'):
+                run_pending_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.error, "unparseable")
+        self.assertFalse(os.path.exists(spool_path))
+
+    def _claim_twice(self, **job_fields):
+        """A job whose first claim was taken for dead, requeued and claimed again."""
+        from core.jobs import claim_next_job, requeue_stale_jobs
+        from core.models import IngestionJob
+
+        spool_path = os.path.join(self.spool.name, "slow.upload")
+        with open(spool_path, 'wb') as f:
+            f.write(b"# User\nHello\n# Agent\nHi there\n")
+        IngestionJob.objects.create(title="slow.md", spool_path=spool_path, content_hash='ab' * 32, **job_fields)
+        stale = claim_next_job()
+        self.assertEqual(requeue_stale_jobs(-1), 1)
+        current = claim_next_job()
+        self.assertEqual(current.attempts, 2)
+        return stale, current
+
+    def test_requeued_job_overlapping_its_first_run_saves_one_session(self):
+        from unittest import mock
+        from django.contrib.auth.models import User
+        from core.jobs import run_job
+
+        user = User.objects.create_user('worker', password='pw')
+        stale, current = self._claim_twice(user=user)
+
+        with self.assertLogs('core.jobs', level='WARNING'):
+            run_job(stale)
+        self.assertEqual(stale.status, 'running')
+        self.assertTrue(os.path.exists(stale.spool_path))
+        session = Session.objects.get()
+
+        # Both runs got past the early duplicate check before either saved
+        with mock.patch('core.jobs.find_duplicate', return_value=None):
+            run_job(current)
+        current.refresh_from_db()
+        self.assertEqual(current.status, 'done')
+        self.assertEqual(current.session, session)
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertFalse(os.path.exists(current.spool_path))
+
+    def test_requeued_anonymous_job_keeps_the_latest_runs_session(self):
+        from core.jobs import run_job
+
+        stale, current = self._claim_twice()
+        # Anonymous sessions aren't deduplicated, so the stale run drops its own
+        with self.assertLogs('core.jobs', level='WARNING'):
+            run_job(stale)
+        self.assertFalse(Session.objects.exists())
+
+        run_job(current)
+        current.refresh_from_db()
+        self.assertEqual(current.status, 'done')
+        self.assertEqual(list(Session.objects.all()), [current.session])
+
+
+class SessionStatsTest(TestCase):
+    def _parse_sample(self):
+        from core.parser import TranscriptParser
+        with open(os.path.join(os.path.dirname(os.path.dirname(__file__)), 's.md'), 'rb') as f:
+            return TranscriptParser(f).parse(title="s.md")
+
+    def test_stats_match_step_table(self):
+        session = self._parse_sample()
+        steps = session.steps.all()
+        self.assertEqual(session.step_count, steps.count())
+        self.assertEqual(session.user_step_count, steps.filter(role='user').count())
+        self.assertEqual(session.agent_step_count, steps.filter(role='agent').count())
+        self.assertEqual(session.tool_call_count, steps.filter(step_type='tool_call').count())
+
+        # Flow chart buckets are recomputed from the Step table the slow way
+        rows = list(steps.values('role', 'step_type'))
+        expected = []
+        for i in range(0, len(rows), Session.FLOW_CHUNK_SIZE):
+            chunk = rows[i:i + Session.FLOW_CHUNK_SIZE]
+            expected.append({
+                'chunk': f"{i + 1}-{min(i + Session.FLOW_CHUNK_SIZE, len(rows))}",
+                'user': sum(1 for s in chunk if s['role'] == 'user'),
+                'agent': sum(1 for s in chunk if s['role'] == 'agent' and s['step_type'] != 'tool_call'),
+                'tool': sum(1 for s in chunk if s['step_type'] == 'tool_call'),
+                'system': sum(1 for s in chunk if s['role'] == 'system'),
+            })
+        session.refresh_from_db()
+        self.assertEqual(session.conversation_flow_chart(), expected)
+
+    def test_add_tag_bumps_tag_count(self):
+        session = self._parse_sample()
+        step = session.steps.first()
+        self.client.post(reverse('add_tag', args=[step.id]), {'tag_type': 'pivot'})
+        session.refresh_from_db()
+        self.assertEqual(session.tag_count, 1)
+
+    def test_detail_does_not_count_steps(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        session = self._parse_sample()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('session_detail', args=[session.id]))
+        self.assertContains(response, f'>{session.step_count}<')
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql']])
+
+
+class ProfileRollupTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        self.user = User.objects.create_user('ada', password='pw')
+        self.client.login(username='ada', password='pw')
+
+    def _upload(self, name, content):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        self.client.post(reverse('upload'), {'file': SimpleUploadedFile(name, content)})
+        return Session.objects.get(title=name)
+
+    def _snapshot(self):
+        from core.models import UserDailyActivity, UserProfileStats
+        stats = UserProfileStats.objects.get(user=self.user)
+        return (
+            stats.session_count, stats.step_count, stats.tag_count,
+            stats.role_counts, stats.step_type_counts, stats.source_counts,
+            list(UserDailyActivity.objects.filter(user=self.user).values_list('date', 'session_count')),
+        )
+
+    def test_rollups_track_create_tag_and_delete(self):
+        from core.rollups import rebuild_user_stats
+        first = self._upload("a.md", b"# User\nHi\n# Agent\nHello\n*Edited relevant file*\n")
+        self._upload("b.md", b"# User\nAgain\n")
+        self.client.post(reverse('add_tag', args=[first.steps.first().id]), {'tag_type': 'pivot'})
+
+        incremental = self._snapshot()
+        self.assertEqual(incremental[:4], (2, 4, 1, {'user': 2, 'agent': 2}))
+        self.assertEqual(incremental[4], {'prompt': 2, 'text': 1, 'tool_call': 1})
+        rebuild_user_stats(self.user)
+        self.assertEqual(self._snapshot(), incremental)
+
+        first.delete()
+        self.assertEqual(self._snapshot()[:6], (1, 1, 0, {'user': 1}, {'prompt': 1}, {'upload': 1}))
+
+    def test_profile_renders_from_rollups(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self._upload("a.md", b"# User\nHi\n# Agent\nHello\n")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('public_profile', args=['ada']))
+        self.assertContains(response, '1 session recorded')
+        self.assertFalse([q for q in queries if 'core_step' in q['sql']])
+
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from core.parser import TranscriptParser
+        self.user = User.objects.create_user('ada', password='pw')
+        self.session = TranscriptParser(b"# User\nHi\n# Agent\nHello\n").parse(
+            title="s", user=self.user, content_hash='abc',
+        )
+
+    def _revalidate(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.has_header('Last-Modified'))
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertFalse([q for q in queries if 'core_step' in q['sql']])
+        return first['ETag']
+
+    def test_session_page_revalidates_until_tagged(self):
+        url = reverse('session_detail', args=[self.session.id])
+        etag = self._revalidate(url)
+        self.client.post(reverse('add_tag', args=[self.session.steps.first().id]), {'tag_type': 'pivot'})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_profile_revalidates_until_tagged(self):
+        url = reverse('public_profile', args=['ada'])
+        etag = self._revalidate(url)
+        self.client.post(reverse('add_tag', args=[self.session.steps.first().id]), {'tag_type': 'pivot'})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # Signing in changes the page (navigation, CSRF token), so the ETag too
+        etag = self.client.get(url)['ETag']
+        self.client.login(username='ada', password='pw')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class TimelinePaginationTest(TestCase):
+    def setUp(self):
+        from core.ingest import StepWriter
+        from core.models import SteeringTag
+        with StepWriter() as writer:
+            self.session = Session.objects.create(title="Long")
+            for i in range(1, 8):
+                writer.add(self.session, role='user', step_type='prompt', content=f"step-{i}-body", order=i)
+        for step in self.session.steps.all():
+            SteeringTag.objects.create(step=step, tag_type='pivot')
+
+    def test_pages_follow_keyset_cursor(self):
+        from django.test import override_settings
+        with override_settings(AGEXTRACT_TIMELINE_PAGE_SIZE=3):
+            response = self.client.get(reverse('session_detail', args=[self.session.id]))
+            self.assertContains(response, "step-3-body")
+            self.assertNotContains(response, "step-4-body")
+            cursor = response.context['next_cursor']
+            self.assertEqual(cursor[0], 3)
+
+            url = reverse('session_steps', args=[self.session.id])
+            response = self.client.get(url, {'after_order': cursor[0], 'after_id': cursor[1]})
+            self.assertContains(response, "step-4-body")
+            self.assertContains(response, "step-6-body")
+            self.assertContains(response, 'hx-trigger="revealed"')
+
+            cursor = response.context['next_cursor']
+            response = self.client.get(url, {'after_order': cursor[0], 'after_id': cursor[1]})
+            self.assertContains(response, "step-7-body")
+            self.assertIsNone(response.context['next_cursor'])
+            self.assertNotContains(response, 'hx-trigger="revealed"')
+
+    def test_page_queries_do_not_grow_with_steps(self):
+        from django.test import override_settings
+        url = reverse('session_steps', args=[self.session.id])
+        with override_settings(AGEXTRACT_TIMELINE_PAGE_SIZE=5):
+            # Session lookup, one page of steps, one prefetch of their tags
+            with self.assertNumQueries(3):
+                self.client.get(url, {'after_order': 0, 'after_id': 0})
+
+    def test_rendered_pages_are_cached_until_the_session_changes(self):
+        from django.test import override_settings
+        url = reverse('session_steps', args=[self.session.id])
+        first = self.session.steps.order_by('order').first()
+        params = {'after_order': first.order, 'after_id': first.id}
+        with override_settings(AGEXTRACT_TIMELINE_PAGE_SIZE=5):
+            self.client.get(url, params)
+            with self.assertNumQueries(1):
+                response = self.client.get(url, params)
+            self.assertContains(response, "step-2-body")
+            self.assertContains(response, 'name="csrfmiddlewaretoken" value="')
+            self.assertNotContains(response, '__agextract_csrf_token__')
+            self.assertNotContains(response, 'bg-red-500/20')
+
+            self.client.post(reverse('add_tag', args=[self.session.steps.get(order=2).id]), {'tag_type': 'correction'})
+            response = self.client.get(url, params)
+            self.assertContains(response, 'bg-red-500/20')
+
+    def test_hero_moment_change_invalidates_cached_pages(self):
+        from django.test import override_settings
+        url = reverse('session_steps', args=[self.session.id])
+        first = self.session.steps.order_by('order').first()
+        params = {'after_order': first.order, 'after_id': first.id}
+        with override_settings(AGEXTRACT_TIMELINE_PAGE_SIZE=5):
+            self.client.get(url, params)
+            with self.assertNumQueries(1):
+                self.client.get(url, params)
+
+            session = Session.objects.get(pk=self.session.pk)
+            version = session.version
+            session.hero_moment = self.session.steps.get(order=3)
+            session.save(update_fields=['hero_moment'])
+            self.assertEqual(session.version, version + 1)
+            self.assertIsNotNone(session.modified_at)
+            # A new version: the page is rendered again (steps and their tags)
+            with self.assertNumQueries(3):
+                self.client.get(url, params)
+
+            # Saving without a change keeps the version
+            session.title = "Renamed"
+            session.save()
+            self.assertEqual(Session.objects.get(pk=session.pk).version, version + 1)
+
+
+class StepBlobTest(TestCase):
+    def test_large_bodies_are_stored_once_out_of_line(self):
+        from django.test import override_settings
+        from core.ingest import StepWriter
+        from core.models import StepBlob
+        big = "diff line\n" * 500
+        with override_settings(AGEXTRACT_STEP_INLINE_MAX_CHARS=100, AGEXTRACT_STEP_PREVIEW_CHARS=60):
+            with StepWriter() as writer:
+                session = Session.objects.create(title="Blobs")
+                writer.add(session, role='agent', step_type='diff', content=big, order=1)
+                writer.add(session, role='agent', step_type='diff', content=big, order=2)
+                writer.add(session, role='user', step_type='prompt', content="short", order=3)
+
+        first, second, short = session.steps.select_related('blob')
+        self.assertEqual(StepBlob.objects.count(), 1)
+        self.assertEqual(first.content, big[:60])
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertLess(len(first.blob.data), len(big))
+        self.assertEqual(first.full_content, big)
+        self.assertIsNone(short.blob_id)
+        self.assertEqual(short.full_content, "short")
+
+    def test_offloaded_preview_is_shorter_than_the_threshold(self):
+        from core.ingest import StepWriter
+        with StepWriter() as writer:
+            session = Session.objects.create(title="Previews")
+            writer.add(session, role='agent', step_type='diff', content="a" * 3500, order=1)
+            writer.add(session, role='agent', step_type='diff', content="b" * 4500, order=2)
+
+        inline, offloaded = session.steps.all()
+        self.assertIsNone(inline.blob_id)
+        self.assertEqual(len(offloaded.content), 3000)
+        self.assertEqual(len(offloaded.full_content), 4500)
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from core.ingest import StepWriter
+        self.user = User.objects.create_user(username='searcher', password='password')
+        self.other = User.objects.create_user(username='other', password='password')
+        with StepWriter() as writer:
+            self.session = Session.objects.create(title="Mine", user=self.user)
+            writer.add(self.session, role='user', step_type='prompt', content="Fix the <flaky> websocket reconnect", order=1)
+            writer.add(self.session, role='agent', step_type='text', content="The reconnect loop never backs off", order=2)
+            theirs = Session.objects.create(title="Theirs", user=self.other)
+            writer.add(theirs, role='user', step_type='prompt', content="websocket reconnect too", order=1)
+
+    def test_search_is_scoped_ranked_and_highlighted(self):
+        from core.search import search_steps
+        results = search_steps("websocket reconnect", self.user)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['session'], self.session)
+        self.assertIn("<mark>websocket</mark>", results[0]['snippet'])
+        self.assertIn("&lt;flaky&gt;", results[0]['snippet'])
+
+        self.assertEqual(len(search_steps("reconnect", self.user)), 2)
+        self.assertEqual(len(search_steps("reconn*", self.user)), 2)
+        # FTS5 operators in user input are treated as plain terms
+        self.assertEqual(search_steps('"reconnect OR NEAR(', self.user), [])
+        # Control characters separate terms instead of breaking the query
+        self.assertEqual(len(search_steps("websocket\x00reconnect", self.user)), 1)
+        self.assertEqual(search_steps("\x00", self.user), [])
+
+    @skipUnless(connection.vendor == 'sqlite', "offloaded bodies are only searchable through the FTS5 index")
+    def test_index_follows_deletes_and_offloaded_bodies(self):
+        from django.test import override_settings
+        from core.ingest import StepWriter
+        from core.search import search_steps
+        self.session.delete()
+        self.assertEqual(search_steps("reconnect", self.user), [])
+
+        body = "x " * 200 + "needle"
+        with override_settings(AGEXTRACT_STEP_INLINE_MAX_CHARS=100):
+            with StepWriter() as writer:
+                session = Session.objects.create(title="Large", user=self.user)
+                writer.add(session, role='agent', step_type='diff', content=body, order=1)
+        self.assertEqual(len(search_steps("needle", self.user)), 1)
+        self.assertIn("<mark>needle</mark>", search_steps("needle", self.user)[0]['snippet'])
+
+        # Moving a session re-indexes its steps under the new owner
+        session.user = self.other
+        session.save()
+        self.assertEqual(search_steps("needle", self.user), [])
+        self.assertEqual(len(search_steps("needle", self.other)), 1)
+
+    @skipUnless(connection.vendor == 'sqlite', "the rank window only applies to the FTS5 index")
+    def test_rank_window(self):
+        from django.test import override_settings
+        from core.ingest import StepWriter
+        from core.search import search_steps
+        with StepWriter() as writer:
+            session = Session.objects.create(title="Window", user=self.user)
+            writer.add(session, role='user', step_type='prompt', content="needle needle", order=1)
+            for order in range(2, 5):
+                writer.add(session, role='agent', step_type='text', content="hay " * 50 + "needle", order=order)
+        best = session.steps.get(order=1)
+
+        with override_settings(AGEXTRACT_SEARCH_RANK_WINDOW=None):
+            self.assertEqual(search_steps("needle", self.user, limit=1)[0]['step'], best)
+        with override_settings(AGEXTRACT_SEARCH_RANK_WINDOW=2):
+            # Only the two newest matches are ranked; the window never shrinks below limit
+            self.assertNotEqual(search_steps("needle", self.user, limit=1)[0]['step'], best)
+            self.assertEqual(len(search_steps("needle", self.user, limit=3)), 3)
+        self.assertEqual(search_steps("needle", self.user, limit=1)[0]['step'], best)
+
+    @skipUnless(connection.vendor == 'sqlite', "the FTS5 index only exists on SQLite")
+    def test_index_stores_no_copy_of_the_content(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE name = 'core_step_fts_content'")
+            self.assertIsNone(cursor.fetchone())
+
+    @skipUnless(connection.vendor == 'sqlite', "the FTS5 index only exists on SQLite")
+    def test_every_trigger_survives_the_migrations(self):
+        from importlib import import_module
+        triggers = import_module('core.migrations._search_triggers').CONTENTLESS_TRIGGERS
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'core_%%fts%%'")
+            self.assertEqual({name for name, in cursor.fetchall()}, set(triggers))
+
+    def test_search_pages(self):
+        self.client.login(username='searcher', password='password')
+        response = self.client.get(reverse('search'), {'q': 'backs'})
+        self.assertContains(response, "<mark>backs</mark>")
+        self.assertNotContains(response, "Theirs")
+        self.assertEqual(self.client.get(reverse('search'), {'q': 'a\x00b'}).status_code, 200)
+
+        response = self.client.get(reverse('profile_search', args=['other']), {'q': 'websocket'})
+        self.assertContains(response, "Theirs")
+        self.assertNotContains(response, "Mine")
+
+
+@skipUnless(connection.vendor == 'sqlite', "plans are read from SQLite's EXPLAIN QUERY PLAN")
+class QueryPlanTest(TestCase):
+    """
+    Every query the hot paths issue against the app's tables must search
+    an index: no full table scans, and no sorting for ORDER BY except in
+    single-row lookups (.first() sorts the few rows an equality search
+    matches). The queries are captured from the real code paths, so new
+    ones are covered too.
+    """
+    def setUp(self):
+        from datetime import timedelta
+        from django.contrib.auth.models import User
+        from django.utils import timezone
+        from api.models import APIToken
+        from core.ingest import StepWriter
+        self.user = User.objects.create_user(username='planner', password='password')
+        self.token = APIToken.objects.create(user=self.user, expires_at=timezone.now() + timedelta(days=1))
+        with StepWriter() as writer:
+            self.session = Session.objects.create(title="Plans", user=self.user, source='claudecode',
+                                                  source_session_id='abc', content_hash='f' * 64)
+            for order in range(1, 4):
+                writer.add(self.session, role='user', step_type='prompt', content=f"step {order}", order=order)
+
+    def assertIndexedPlans(self, run):
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as captured:
+            run()
+        checked = 0
+        for query in captured:
+            sql = query['sql']
+            if not sql.startswith(('SELECT', 'UPDATE', 'DELETE')) or '"core_' not in sql:
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = [row[-1] for row in cursor.fetchall()]
+            checked += 1
+            for step in plan:
+                with self.subTest(sql=sql, plan=plan):
+                    self.assertFalse(step.startswith('SCAN core_'), "full table scan")
+                    if not sql.endswith('LIMIT 1'):
+                        self.assertNotIn('TEMP B-TREE FOR ORDER BY', step)
+        self.assertGreater(checked, 0)
+
+    def test_dashboard_and_profile(self):
+        self.client.login(username='planner', password='password')
+        self.assertIndexedPlans(lambda: self.client.get(reverse('dashboard')))
+        self.assertIndexedPlans(lambda: self.client.get(reverse('public_profile', args=['planner'])))
+
+    def test_session_timeline(self):
+        self.client.login(username='planner', password='password')
+        self.assertIndexedPlans(lambda: self.client.get(reverse('session_detail', args=[self.session.id])))
+        self.assertIndexedPlans(lambda: self.client.get(reverse('session_steps', args=[self.session.id])))
+
+    def test_api_listing_and_idempotent_push(self):
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {self.token.access_token}'}
+        self.assertIndexedPlans(lambda: self.client.get('/api/v1/sessions/', {'since': '2020-01-01T00:00:00Z'}, **auth))
+        self.assertIndexedPlans(lambda: self.client.get(f'/api/v1/sessions/{self.session.id}/', **auth))
+        body = {'title': "Plans", 'source': 'claudecode', 'source_session_id': 'abc', 'steps': []}
+        self.assertIndexedPlans(lambda: self.client.post(
+            '/api/v1/sessions/', json.dumps(body), content_type='application/json', **auth))
+
+    def test_dedup_job_claim_and_delete(self):
+        from core.jobs import claim_next_job
+        from core.parser import find_duplicate
+        from core.rollups import record_session_deleted
+        self.assertIndexedPlans(lambda: find_duplicate(self.user.pk, 'f' * 64))
+        self.assertIndexedPlans(claim_next_job)
+        self.assertIndexedPlans(lambda: record_session_deleted(self.session))
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Views stay within their @query_budget on a fixture with enough steps
+    and tags that a query per step or per tag would go over it.
+    """
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from core.ingest import StepWriter
+        from core.models import SteeringTag
+        self.user = User.objects.create_user(username='budget', password='password')
+        with StepWriter() as writer:
+            for index in range(3):
+                session = Session.objects.create(title=f"Session {index}", user=self.user)
+                for order in range(1, 31):
+                    writer.add(session, role='user' if order % 2 else 'agent',
+                               step_type='prompt' if order % 2 else 'text', content=f"step {order}", order=order)
+        self.session = session
+        self.steps = list(session.steps.all())
+        SteeringTag.objects.bulk_create(
+            SteeringTag(step=step, tag_type='pivot') for step in self.steps[::2]
+        )
+        self.client.login(username='budget', password='password')
+
+    def test_views_stay_within_budget(self):
+        from core.jobs import enqueue_spooled
+        from core.profiling import assert_within_query_budget
+        job = enqueue_spooled('unused', title="Queued", user=self.user)
+        first = self.steps[0]
+        requests = [
+            ('get', reverse('dashboard'), {}),
+            ('get', reverse('public_profile', args=['budget']), {}),
+            ('get', reverse('session_detail', args=[self.session.id]), {}),
+            ('get', reverse('session_steps', args=[self.session.id]), {'after_order': 1, 'after_id': first.id}),
+            ('get', reverse('step_card', args=[first.id]), {}),
+            ('post', reverse('add_tag', args=[first.id]), {'tag_type': 'correction'}),
+            ('get', reverse('search'), {'q': 'step'}),
+            ('get', reverse('profile_search', args=['budget']), {'q': 'step'}),
+            ('get', reverse('job_status', args=[job.id]), {}),
+        ]
+        for method, url, data in requests:
+            with self.subTest(url=url):
+                response = getattr(self.client, method)(url, data)
+                self.assertLess(response.status_code, 400)
+                assert_within_query_budget(response)
+
+    def test_over_budget_fails(self):
+        from core.profiling import assert_within_query_budget
+        response = self.client.get(reverse('dashboard'))
+        response.profile.budget = response.profile.queries - 1
+        with self.assertRaisesMessage(AssertionError, "over its budget"):
+            assert_within_query_budget(response)
+
+        response = self.client.get(reverse('web_login'))
+        with self.assertRaisesMessage(AssertionError, "declares no query budget"):
+            assert_within_query_budget(response)
+
+
+class ProfilingTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        User.objects.create_user(username='profiled', password='password')
+        self.client.login(username='profiled', password='password')
+
+    def test_debug_headers(self):
+        from django.test import override_settings
+        response = self.client.get(reverse('dashboard'))
+        self.assertNotIn('Server-Timing', response)
+
+        with override_settings(DEBUG=True):
+            response = self.client.get(reverse('dashboard'))
+        profile = response.profile
+        self.assertEqual(response['X-Query-Count'], str(profile.queries))
+        self.assertIn(f'desc="{profile.queries} queries"', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+        self.assertGreater(profile.queries, 0)
+        self.assertGreater(profile.template_time, 0)
+        self.assertGreaterEqual(profile.total_time, profile.db_time + profile.template_time)
+
+    def test_log_and_metrics(self):
+        import tempfile
+        import tracemalloc
+        from django.test import override_settings
+        from core.profiling import metrics
+        self.addCleanup(tracemalloc.stop)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+        metrics.reset()
+        with tempfile.TemporaryDirectory() as tmp, override_settings(
+            AGEXTRACT_PROFILE_LOG=os.path.join(tmp, 'requests.jsonl'),
+            AGEXTRACT_METRICS_ENABLED=True, AGEXTRACT_PROFILE_MEMORY=True,
+        ):
+            self.client.get(reverse('dashboard'))
+            self.client.get(reverse('dashboard'))
+            response = self.client.get(reverse('metrics'))
+            with open(os.path.join(tmp, 'requests.jsonl')) as log:
+                lines = [json.loads(line) for line in log]
+        metrics.reset()
+
+        self.assertEqual([line['view'] for line in lines], ['dashboard', 'dashboard', 'metrics'])
+        self.assertEqual(lines[0]['status'], 200)
+        self.assertEqual(lines[0]['budget'], 5)
+        self.assertGreater(lines[0]['process_peak_memory'], 0)
+
+        body = response.content.decode()
+        self.assertIn('agextract_request_queries_count{view="dashboard"} 2', body)
+        self.assertIn(f'agextract_request_queries_sum{{view="dashboard"}} {lines[0]["queries"] * 2}', body)
+        self.assertIn('agextract_request_over_query_budget_total{view="dashboard"} 0', body)
+        self.assertIn('agextract_process_peak_memory_bytes{view="dashboard"}', body)
+
+        # Memory tracing stops with the setting
+        self.assertTrue(tracemalloc.is_tracing())
+        self.client.get(reverse('dashboard'))
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_memory_peak_is_not_reset_under_a_request_in_flight(self):
+        import tracemalloc
+        from django.test import override_settings
+        from core.profiling import _end_memory_trace, _start_memory_trace
+        self.addCleanup(tracemalloc.stop)
+
+        with override_settings(AGEXTRACT_PROFILE_MEMORY=True):
+            self.assertTrue(_start_memory_trace())
+            allocated = bytearray(4 * 1024 * 1024)
+            del allocated
+            # A second request starting now must keep the first one's peak
+            self.assertTrue(_start_memory_trace())
+            second = _end_memory_trace()
+            first = _end_memory_trace()
+        self.assertGreaterEqual(second, 4 * 1024 * 1024)
+        self.assertGreaterEqual(first, second)
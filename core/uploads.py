@@ -0,0 +1,189 @@
+"""
+Resumable chunked uploads.
+
+Very large transcripts are sent as a series of numbered chunks instead of
+one multipart request:
+
+1. ``create_upload`` records a ChunkedUpload and an empty spool file.
+2. Each chunk is streamed by ``write_chunk`` to a file of its own next to
+   the spool file and checked against the SHA-256 the client sent with
+   it. Chunks must arrive in order; a chunk is acknowledged only once its
+   checksum matches and the row is updated, so after an interruption the
+   client asks for the upload's state and resumes from ``next_chunk``.
+   Once acknowledged, the chunk is written into the spool file at its
+   offset and its own file is removed (``settle_chunks``).
+3. Completing the upload hands the spool file to the normal upload path
+   (hash, dedup, parse inline or queue), which reads it from disk.
+
+Nothing is ever held in memory whole, and the upload is on disk once,
+plus at most the chunks in flight. Reading a chunk waits on the network,
+so it happens outside any transaction; acknowledging it is a rename and a
+row update in a short one, which on SQLite holds the write lock only that
+long. The acknowledged chunk file's name records its offset, so writing
+it into the spool file can happen after the commit and be repeated: a
+chunk left behind by a crash is settled on the next chunk or on
+completion.
+"""
+import glob
+import hashlib
+import os
+import re
+import shutil
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ChunkedUpload
+from .jobs import get_spool_dir
+from .parser import iter_chunks
+
+DEFAULT_CHUNK_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_UPLOAD_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+class ChunkError(ValueError):
+    """A chunk was rejected; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def chunk_max_bytes():
+    return getattr(settings, 'AGEXTRACT_UPLOAD_CHUNK_MAX_BYTES', DEFAULT_CHUNK_MAX_BYTES)
+
+
+def upload_max_bytes():
+    return getattr(settings, 'AGEXTRACT_CHUNKED_UPLOAD_MAX_BYTES', DEFAULT_UPLOAD_MAX_BYTES)
+
+
+def create_upload(*, title, user=None, source='upload', source_session_id=''):
+    spool_path = get_spool_dir() / f"{uuid.uuid4().hex}.partial"
+    spool_path.touch()
+    return ChunkedUpload.objects.create(
+        user=user,
+        title=title,
+        source=source,
+        source_session_id=source_session_id,
+        spool_path=str(spool_path),
+    )
+
+
+def chunk_path(upload, index, offset):
+    """Where acknowledged chunk ``index`` waits to be written at ``offset``."""
+    return f"{upload.spool_path}.{index}.{offset}"
+
+
+def _acknowledged(upload, index, sha256):
+    """
+    Whether chunk ``index`` is already acknowledged with this checksum;
+    raises ChunkError when it cannot be accepted at all.
+    """
+    if upload.status != 'open':
+        raise ChunkError('Upload is already complete', status=409)
+    acknowledged = len(upload.chunk_hashes)
+    if index < acknowledged:
+        if upload.chunk_hashes[index] != sha256:
+            raise ChunkError(f'Chunk {index} was already received with a different checksum', status=409)
+        return True
+    if index > acknowledged:
+        raise ChunkError(f'Expected chunk {acknowledged}, got {index}', status=409)
+    return False
+
+
+def write_chunk(upload, index, stream, sha256):
+    """
+    Append chunk ``index`` read from ``stream`` to the upload, verifying it
+    against the hex ``sha256``. Re-sending an already acknowledged chunk
+    with the same checksum is a no-op. Returns the updated upload.
+    """
+    sha256 = (sha256 or '').strip().lower()
+    if not sha256:
+        raise ChunkError('X-Chunk-SHA256 header is required')
+    if _acknowledged(upload, index, sha256):
+        return upload
+
+    # A concurrent attempt at the same chunk spools to a file of its own
+    partial = f"{upload.spool_path}.{index}.{uuid.uuid4().hex}.partial"
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with open(partial, 'wb') as spooled:
+            for data in iter_chunks(stream):
+                size += len(data)
+                if size > chunk_max_bytes():
+                    raise ChunkError(f'Chunk exceeds {chunk_max_bytes()} bytes', status=413)
+                if upload.bytes_received + size > upload_max_bytes():
+                    raise ChunkError(f'Upload exceeds {upload_max_bytes()} bytes', status=413)
+                digest.update(data)
+                spooled.write(data)
+            spooled.flush()
+            os.fsync(spooled.fileno())
+
+        if digest.hexdigest() != sha256:
+            raise ChunkError(f'Checksum mismatch for chunk {index}', status=422)
+
+        with transaction.atomic():
+            upload = ChunkedUpload.objects.select_for_update().get(pk=upload.pk)
+            if _acknowledged(upload, index, sha256):
+                return upload
+            os.replace(partial, chunk_path(upload, index, upload.bytes_received))
+            upload.chunk_hashes.append(sha256)
+            upload.bytes_received += size
+            upload.save(update_fields=['chunk_hashes', 'bytes_received', 'updated_at'])
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    settle_chunks(upload)
+    return upload
+
+
+def settle_chunks(upload):
+    """
+    Write acknowledged chunks still in files of their own into the spool
+    file at their offsets, then remove them. Safe to repeat or to run
+    concurrently: a chunk always lands at the same offset.
+    """
+    pattern = re.compile(re.escape(os.path.basename(upload.spool_path)) + r'\.\d+\.(\d+)$')
+    for path in glob.glob(f"{glob.escape(upload.spool_path)}.*"):
+        match = pattern.match(os.path.basename(path))
+        if match is None:
+            continue
+        try:
+            with open(path, 'rb') as chunk, open(upload.spool_path, 'r+b') as spooled:
+                spooled.seek(int(match.group(1)))
+                shutil.copyfileobj(chunk, spooled)
+                spooled.flush()
+                os.fsync(spooled.fileno())
+            os.remove(path)
+        except FileNotFoundError:
+            # Settled by a concurrent call
+            pass
+
+
+def remove_chunks(upload):
+    """Delete the upload's chunk files, including abandoned partial ones."""
+    for path in glob.glob(f"{glob.escape(upload.spool_path)}.*"):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def expire_stale_uploads(max_age):
+    """Delete open uploads untouched for ``max_age`` seconds, and their spool files."""
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    stale = ChunkedUpload.objects.filter(status='open', updated_at__lt=cutoff)
+    count = 0
+    for upload in stale:
+        try:
+            os.remove(upload.spool_path)
+        except OSError:
+            pass
+        remove_chunks(upload)
+        upload.delete()
+        count += 1
+    return count
@@ -6,8 +6,12 @@ urlpatterns = [
     path('login/', views.web_login, name='web_login'),
     path('logout/', views.web_logout, name='web_logout'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('search/', views.search_view, name='search'),
     path('@<str:username>/', views.public_profile, name='public_profile'),
+    path('@<str:username>/search/', views.profile_search, name='profile_search'),
     path('session/<uuid:session_id>/', views.session_detail, name='session_detail'),
+    path('session/<uuid:session_id>/steps/', views.session_steps, name='session_steps'),
+    path('job/<uuid:job_id>/', views.job_status, name='job_status'),
     path('step/<int:step_id>/tag/', views.add_tag, name='add_tag'),
     path('step/<int:step_id>/card/', views.step_card, name='step_card'),
 ]
@@ -1,4 +1,3 @@
-import hashlib
 import json
 from collections import Counter
 from datetime import date, timedelta
@@ -6,12 +5,20 @@ from datetime import date, timedelta
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.db.models import Count, Sum, Q
+from django.db.models import F, Sum
+from django.http import Http404, HttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.utils import timezone
+from django.views.decorators.http import condition
+from . import etags, fragments, rollups, search
 from .forms import UploadSessionForm
-from .models import Session, Step, SteeringTag
-from .parser import TranscriptParser
+from .jobs import enqueue_upload, should_queue
+from .models import (
+    IngestionJob, Session, Step, SteeringTag, UserDailyActivity, UserProfileStats,
+)
+from .parser import DuplicateContent, HashingStream, TranscriptParser
+from .profiling import query_budget
 
 
 def upload_view(request):
@@ -19,26 +26,23 @@ def upload_view(request):
         form = UploadSessionForm(request.POST, request.FILES)
         if form.is_valid():
             uploaded_file = request.FILES['file']
-            content = uploaded_file.read()
-            content_hash = hashlib.sha256(content).hexdigest()
-
-            # Dedup: return existing session if same content already uploaded
-            if request.user.is_authenticated:
-                existing = Session.objects.filter(
-                    user=request.user,
-                    content_hash=content_hash,
-                ).first()
-                if existing:
-                    return redirect('session_detail', session_id=existing.id)
-
-            parser = TranscriptParser(content)
-            session = parser.parse(title=uploaded_file.name)
-
-            # Associate session with logged-in user and store hash
-            if request.user.is_authenticated:
-                session.user = request.user
-            session.content_hash = content_hash
-            session.save()
+            # Hashed while it is parsed or spooled; no separate read pass
+            stream = HashingStream(uploaded_file)
+
+            # Associate session with logged-in user; the content hash is
+            # stored on it for dedup
+            user = request.user if request.user.is_authenticated else None
+
+            try:
+                # Large uploads are parsed by the ingest worker
+                if should_queue(uploaded_file):
+                    job = enqueue_upload(stream, title=uploaded_file.name, user=user)
+                    return redirect('job_status', job_id=job.id)
+
+                session = TranscriptParser(stream).parse(title=uploaded_file.name, user=user)
+            except DuplicateContent as exc:
+                # Dedup: return existing session if same content already uploaded
+                session = exc.session
 
             return redirect('session_detail', session_id=session.id)
     else:
@@ -47,6 +51,24 @@ def upload_view(request):
     return render(request, 'core/upload.html', {'form': form})
 
 
+@query_budget(3)
+def job_status(request, job_id):
+    """Progress page for a queued upload; HTMX polls it until the session is ready."""
+    job = get_object_or_404(IngestionJob, id=job_id)
+    if job.user_id is not None and job.user_id != request.user.id:
+        raise Http404
+
+    if job.status == 'done' and job.session_id:
+        if request.headers.get('HX-Request'):
+            response = HttpResponse(status=204)
+            response['HX-Redirect'] = reverse('session_detail', args=[job.session_id])
+            return response
+        return redirect('session_detail', session_id=job.session_id)
+
+    template = 'core/partials/job_status.html' if request.headers.get('HX-Request') else 'core/job_status.html'
+    return render(request, template, {'job': job})
+
+
 def web_login(request):
     if request.user.is_authenticated:
         return redirect('dashboard')
@@ -74,56 +96,94 @@ def web_logout(request):
 
 
 @login_required(login_url='/login/')
+@query_budget(5)
 def dashboard(request):
     sessions = Session.objects.filter(user=request.user).order_by('-uploaded_at')
+    stats = UserProfileStats.objects.filter(user=request.user).first() or UserProfileStats()
 
-    # Dashboard summary stats
-    total_sessions = sessions.count()
-    total_steps = Step.objects.filter(session__user=request.user).count()
-    now = timezone.now()
-    sessions_this_month = sessions.filter(
-        uploaded_at__year=now.year, uploaded_at__month=now.month
-    ).count()
+    # Dashboard summary stats, read from the user's rollups
+    now = timezone.localdate()
+    sessions_this_month = UserDailyActivity.objects.filter(
+        user=request.user, date__gte=now.replace(day=1),
+    ).aggregate(total=Sum('session_count'))['total'] or 0
 
     return render(request, 'core/dashboard.html', {
         'sessions': sessions,
-        'total_sessions': total_sessions,
-        'total_steps': total_steps,
+        'total_sessions': stats.session_count,
+        'total_steps': stats.step_count,
         'sessions_this_month': sessions_this_month,
     })
 
 
-def public_profile(request, username):
+@login_required(login_url='/login/')
+@query_budget(5)
+def search_view(request):
+    """Full-text search over the signed-in user's own sessions."""
+    return _render_search(request, request.user, reverse('search'))
+
+
+@query_budget(6)
+def profile_search(request, username):
+    """Full-text search over the sessions on a public profile."""
     profile_user = get_object_or_404(User, username=username)
-    sessions = Session.objects.filter(user=profile_user).order_by('-uploaded_at')
+    return _render_search(request, profile_user, reverse('profile_search', args=[username]))
+
+
+def _render_search(request, owner, action):
+    query = request.GET.get('q', '').strip()
+    results = search.search_steps(query, owner) if query else []
+    context = {
+        'query': query,
+        'results': results,
+        'owner': owner,
+        'search_url': action,
+    }
+    # HTMX search-as-you-type only swaps the result list
+    if request.headers.get('HX-Request'):
+        return render(request, 'core/partials/search_results.html', context)
+    return render(request, 'core/search.html', context)
+
+
+# Number of sessions listed on a public profile
+PROFILE_SESSION_LIMIT = 50
 
-    # Compute profile stats
-    total_steps = Step.objects.filter(session__user=profile_user).count()
-    user_steps = Step.objects.filter(session__user=profile_user, role='user').count()
-    agent_steps = Step.objects.filter(session__user=profile_user, role='agent').count()
-    system_steps = Step.objects.filter(session__user=profile_user, role='system').count()
-    tool_calls = Step.objects.filter(session__user=profile_user, step_type='tool_call').count()
-    tags_count = SteeringTag.objects.filter(step__session__user=profile_user).count()
+
+@condition(etag_func=etags.profile_etag, last_modified_func=etags.profile_last_modified)
+@query_budget(7)
+def public_profile(request, username):
+    profile_user = get_object_or_404(User, username=username)
+    sessions = Session.objects.filter(user=profile_user).order_by('-uploaded_at')[:PROFILE_SESSION_LIMIT]
+
+    # Profile stats come from the incrementally maintained rollup row
+    stats = UserProfileStats.objects.filter(user=profile_user).first() or UserProfileStats()
+    role_counts = stats.role_counts
+    total_steps = stats.step_count
+    user_steps = role_counts.get('user', 0)
+    agent_steps = role_counts.get('agent', 0)
+    system_steps = role_counts.get('system', 0)
+    tool_calls = stats.step_type_counts.get('tool_call', 0)
+    tags_count = stats.tag_count
 
     # Source breakdown
-    source_counts = dict(
-        sessions.values_list('source').annotate(c=Count('id')).values_list('source', 'c')
-    )
+    source_counts = stats.source_counts
 
     # Steering ratio (how actively the person guides the AI)
     steering_ratio = round(user_steps / max(agent_steps, 1) * 100)
 
     # --- Chart data ---
 
-    # Activity heatmap: session counts per day for last 365 days
+    # Daily session buckets for the last year feed both the heatmap and the
+    # monthly series
     today = date.today()
     year_ago = today - timedelta(days=364)
-    activity_qs = (
-        sessions.filter(uploaded_at__date__gte=year_ago)
-        .values('uploaded_at__date')
-        .annotate(count=Count('id'))
+    twelve_months_ago = today - timedelta(days=365)
+    daily = list(
+        UserDailyActivity.objects.filter(user=profile_user, date__gte=twelve_months_ago)
+        .values_list('date', 'session_count')
     )
-    activity_data = {str(row['uploaded_at__date']): row['count'] for row in activity_qs}
+
+    # Activity heatmap: session counts per day for last 365 days
+    activity_data = {str(day): count for day, count in daily if day >= year_ago and count}
 
     # Role distribution for donut chart
     role_distribution = {
@@ -143,35 +203,25 @@ def public_profile(request, username):
     source_distribution = {source_display.get(k, k): v for k, v in source_counts.items()}
 
     # Sessions over time: last 12 months
-    twelve_months_ago = today - timedelta(days=365)
-    sessions_by_month = (
-        sessions.filter(uploaded_at__date__gte=twelve_months_ago)
-        .extra(select={'month': "strftime('%%Y-%%m', uploaded_at)"})
-        .values('month')
-        .annotate(count=Count('id'))
-        .order_by('month')
-    )
+    month_counts = Counter()
+    for day, count in daily:
+        month_counts[day.strftime('%Y-%m')] += count
     # Build full 12-month series
     months_list = []
     for i in range(12):
         m = (today.replace(day=1) - timedelta(days=30 * (11 - i)))
         months_list.append(m.strftime('%Y-%m'))
-    month_counts = {row['month']: row['count'] for row in sessions_by_month}
     sessions_over_time = [
         {'month': m, 'count': month_counts.get(m, 0)} for m in months_list
     ]
 
     # Step type distribution for donut
-    step_type_qs = (
-        Step.objects.filter(session__user=profile_user)
-        .values('step_type')
-        .annotate(count=Count('id'))
-    )
-    step_type_distribution = {row['step_type']: row['count'] for row in step_type_qs}
+    step_type_distribution = stats.step_type_counts
 
     return render(request, 'core/public_profile.html', {
         'profile_user': profile_user,
         'sessions': sessions,
+        'session_count': stats.session_count,
         'total_steps': total_steps,
         'user_steps': user_steps,
         'agent_steps': agent_steps,
@@ -187,46 +237,47 @@ def public_profile(request, username):
     })
 
 
+def _session_page_etag(request, session_id):
+    return etags.session_etag(request, session_id, 'html')
+
+
+@condition(etag_func=_session_page_etag, last_modified_func=etags.session_last_modified)
+@query_budget(7)
 def session_detail(request, session_id):
     session = get_object_or_404(Session, id=session_id)
-    steps = session.steps.all().prefetch_related('tags')
-
-    # Session-level stats
-    total = steps.count()
-    user_count = steps.filter(role='user').count()
-    agent_count = steps.filter(role='agent').count()
-    tool_count = steps.filter(step_type='tool_call').count()
-    tag_count = SteeringTag.objects.filter(step__session=session).count()
-    steering_ratio = round(user_count / max(agent_count, 1) * 100)
-
-    # Conversation flow: group steps in chunks of 20
-    chunk_size = 20
-    steps_list = list(steps.values('role', 'step_type', 'order'))
-    conversation_flow = []
-    for i in range(0, max(len(steps_list), 1), chunk_size):
-        chunk = steps_list[i:i + chunk_size]
-        chunk_num = i // chunk_size + 1
-        label = f"{i + 1}-{min(i + chunk_size, len(steps_list))}"
-        conversation_flow.append({
-            'chunk': label,
-            'user': sum(1 for s in chunk if s['role'] == 'user'),
-            'agent': sum(1 for s in chunk if s['role'] == 'agent' and s['step_type'] != 'tool_call'),
-            'tool': sum(1 for s in chunk if s['step_type'] == 'tool_call'),
-            'system': sum(1 for s in chunk if s['role'] == 'system'),
-        })
+    timeline_html, next_cursor = fragments.render_timeline_page(request, session)
 
+    # Session-level stats and the conversation flow chart (steps grouped in
+    # chunks of 20) are precomputed at ingest, so no Step scans are needed
     return render(request, 'core/session_detail.html', {
         'session': session,
-        'steps': steps,
-        'total_steps': total,
-        'user_count': user_count,
-        'agent_count': agent_count,
-        'tool_count': tool_count,
-        'tag_count': tag_count,
-        'steering_ratio': steering_ratio,
-        'conversation_flow_json': json.dumps(conversation_flow),
+        'timeline_html': timeline_html,
+        'next_cursor': next_cursor,
+        'total_steps': session.step_count,
+        'user_count': session.user_step_count,
+        'agent_count': session.agent_step_count,
+        'tool_count': session.tool_call_count,
+        'tag_count': session.tag_count,
+        'steering_ratio': session.steering_ratio,
+        'conversation_flow_json': json.dumps(session.conversation_flow_chart()),
+    })
+
+@query_budget(3)
+def session_steps(request, session_id):
+    """HTMX endpoint: the next page of a session timeline (infinite scroll)."""
+    session = get_object_or_404(Session, id=session_id)
+    try:
+        after = (int(request.GET['after_order']), int(request.GET['after_id']))
+    except (KeyError, ValueError):
+        return HttpResponse('after_order and after_id are required', status=400)
+
+    timeline_html, next_cursor = fragments.render_timeline_page(request, session, after=after)
+    return render(request, 'core/partials/timeline.html', {
+        'timeline_html': timeline_html,
+        'next_cursor': next_cursor,
     })
 
+@query_budget(6)
 def add_tag(request, step_id):
     # HTMX view to add a tag
     # Simplified for MVP: Just adds a "Pivot" tag for now or toggles
@@ -234,9 +285,14 @@ def add_tag(request, step_id):
     if request.method == 'POST':
         tag_type = request.POST.get('tag_type', 'pivot')
         SteeringTag.objects.create(step=step, tag_type=tag_type)
+        Session.objects.filter(pk=step.session_id).update(
+            tag_count=F('tag_count') + 1, version=F('version') + 1, modified_at=timezone.now(),
+        )
+        rollups.record_tag_added(step.session)
         return render(request, 'core/partials/step_tags.html', {'step': step})
     return HttpResponse(status=405)
 
+@query_budget(2)
 def step_card(request, step_id):
     step = get_object_or_404(Step, id=step_id)
     return render(request, 'core/partials/step_card.html', {'step': step})
@@ -0,0 +1,65 @@
+"""
+One ingest writer at a time on SQLite.
+
+SQLite has a single write lock. In WAL mode (see agextract.database)
+readers never wait for it, but concurrent writers do: each one polls until
+the busy timeout and can still fail with "database is locked". Ingest
+transactions (StepWriter) therefore take turns on a lock before they
+begin: threads of a process on a threading lock, and processes on the
+same host (web workers, the ingest worker) on an flock()ed file next to
+the database.
+
+Other backends are left alone, as is everything when
+AGEXTRACT_SQLITE_WRITE_LOCK is False.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads are serialized
+    fcntl = None
+
+_thread_lock = threading.Lock()
+_held = threading.local()
+
+
+def lock_path(connection):
+    """The file processes lock, or None for an in-memory database."""
+    if fcntl is None or connection.is_in_memory_db():
+        return None
+    return f"{connection.settings_dict['NAME']}-writelock"
+
+
+@contextmanager
+def serialized_writes(using=DEFAULT_DB_ALIAS):
+    """
+    Hold the write lock for the block. Take it before opening the
+    transaction, so no database lock is held while waiting. Nested use in
+    the same thread is a no-op.
+    """
+    connection = connections[using]
+    if (
+        getattr(_held, 'active', False)
+        or connection.vendor != 'sqlite'
+        or not getattr(settings, 'AGEXTRACT_SQLITE_WRITE_LOCK', True)
+    ):
+        yield
+        return
+
+    with _thread_lock:
+        path = lock_path(connection)
+        lock_file = open(path, 'a') if path else None
+        try:
+            if lock_file is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            _held.active = True
+            yield
+        finally:
+            _held.active = False
+            if lock_file is not None:
+                # Closing the file releases the flock
+                lock_file.close()